@@ -0,0 +1,105 @@
+"""
+后端服务入口
+
+--profile-imports 在新进程中以 python -X importtime 导入 app.main，并计时启动钩子中的路网加载，
+输出各模块的导入耗时；导入总耗时超过 --budget-ms 时以非零状态退出，可用于发现启动时间的退化。
+
+用法: python -m app [--host 0.0.0.0] [--port 8000] [--workers 1]
+      python -m app --profile-imports [--top 25] [--budget-ms 2000]
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import List, NamedTuple
+
+# 导入 app.main 后在同一进程中计时 build_data_generator()，耗时 (秒) 输出到 stdout 的最后一行
+PROFILE_CODE = (
+    "import time, app.main; start = time.perf_counter(); app.main.build_data_generator(); "
+    "print(time.perf_counter() - start)"
+)
+
+
+class ImportTime(NamedTuple):
+    """-X importtime 输出的一行：模块自身和包含子模块的导入耗时 (微秒)，depth 为嵌套层数"""
+
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(stderr: str) -> List[ImportTime]:
+    """解析 -X importtime 的输出，按导入完成的顺序排列"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # 表头
+        name = fields[2].rstrip()
+        module = name.lstrip()
+        entries.append(
+            ImportTime(module, int(fields[0]), int(fields[1]), (len(name) - len(module) - 1) // 2)
+        )
+    return entries
+
+
+def _print_table(title: str, entries: List[ImportTime], top: int):
+    print(f"\n{title}")
+    print(f"{'self (ms)':>10} {'cumulative (ms)':>16}  module")
+    for entry in sorted(entries, key=lambda entry: -entry.self_us)[:top]:
+        print(f"{entry.self_us / 1000:>10.1f} {entry.cumulative_us / 1000:>16.1f}  {entry.module}")
+
+
+def profile_imports(top: int, budget_ms: float = None) -> int:
+    """输出 app.main 和启动钩子的导入耗时报告，返回进程退出状态"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROFILE_CODE], capture_output=True, text=True
+    )
+    if result.returncode:
+        print(result.stderr, file=sys.stderr)
+        return result.returncode
+
+    entries = parse_importtime(result.stderr)
+    # app.main 完成导入之后记录的模块由启动钩子 (build_data_generator) 导入
+    split = next(i for i, entry in enumerate(entries) if entry.module == "app.main" and entry.depth == 0) + 1
+    import_ms = entries[split - 1].cumulative_us / 1000
+    build_ms = float(result.stdout.strip().splitlines()[-1]) * 1000
+
+    print(f"导入 app.main: {import_ms:.1f} ms ({split} 个模块)")
+    print(f"启动钩子 build_data_generator(): {build_ms:.1f} ms (其中导入 {len(entries) - split} 个模块)")
+    _print_table(f"导入 app.main 耗时最多的 {top} 个模块", entries[:split], top)
+    if len(entries) > split:
+        _print_table("启动钩子中导入的模块", entries[split:], top)
+
+    if budget_ms is not None and import_ms > budget_ms:
+        print(f"\n导入耗时 {import_ms:.1f} ms 超过预算 {budget_ms:.1f} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")))
+    parser.add_argument("--profile-imports", action="store_true", help="输出启动时各模块的导入耗时后退出")
+    parser.add_argument("--top", type=int, default=25, help="报告中列出的模块数")
+    parser.add_argument("--budget-ms", type=float, help="导入 app.main 的耗时预算 (毫秒)")
+    args = parser.parse_args()
+
+    if args.profile_imports:
+        sys.exit(profile_imports(args.top, args.budget_ms))
+
+    import uvicorn
+
+    # worker 进程按服务进程数分配密码哈希进程 (见 app.config.WEB_CONCURRENCY)
+    os.environ["WEB_CONCURRENCY"] = str(args.workers)
+
+    uvicorn.run("app.main:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import os
+import tempfile
+
+
+# 道路流量增量推送阈值：流量或速度的变化超过阈值、或拥堵等级变化的道路才会被推送
+FLOW_DELTA_FLOW_THRESHOLD = int(os.getenv("FLOW_DELTA_FLOW_THRESHOLD", "200"))
+FLOW_DELTA_SPEED_THRESHOLD = float(os.getenv("FLOW_DELTA_SPEED_THRESHOLD", "5.0"))
+
+# WebSocket 发送队列：每个连接最多缓存的消息数、队列满时的策略 (drop_oldest/latest)，
+# 以及连续丢弃多少条消息后断开慢速客户端
+SEND_QUEUE_MAX_SIZE = int(os.getenv("SEND_QUEUE_MAX_SIZE", "8"))
+SEND_QUEUE_POLICY = os.getenv("SEND_QUEUE_POLICY", "drop_oldest")
+SEND_QUEUE_MAX_DROPPED = int(os.getenv("SEND_QUEUE_MAX_DROPPED", "32"))
+
+# 道路流量矢量瓦片缓存：缓存裁剪几何的瓦片数、缓存编码结果的瓦片数
+TILE_GEOMETRY_CACHE_SIZE = int(os.getenv("TILE_GEOMETRY_CACHE_SIZE", "4096"))
+TILE_CACHE_SIZE = int(os.getenv("TILE_CACHE_SIZE", "1024"))
+
+# 响应压缩：gzip 压缩级别 (1-9)、brotli 压缩质量 (0-11)，
+# 以及小于多少字节的 HTTP 响应不压缩
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+
+# 事件循环延迟的测量间隔 (秒)
+EVENT_LOOP_LAG_INTERVAL = float(os.getenv("EVENT_LOOP_LAG_INTERVAL", "0.5"))
+
+# 多进程共享状态：off 为每个进程独立模拟；auto 时由一个进程运行模拟并写入共享内存，
+# 其余进程只读取。槽位的初始大小 (MB)，一个 tick 的数据超过时生产者自动扩大槽位，读者随之重新映射
+SHARED_STATE_MODE = os.getenv("SHARED_STATE_MODE", "off")
+SHARED_STATE_PATH = os.getenv(
+    "SHARED_STATE_PATH",
+    os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "traffic_state.ring"),
+)
+SHARED_STATE_SLOTS = int(os.getenv("SHARED_STATE_SLOTS", "4"))
+SHARED_STATE_SLOT_MB = int(os.getenv("SHARED_STATE_SLOT_MB", "64"))
+SHARED_STATE_POLL_INTERVAL = float(os.getenv("SHARED_STATE_POLL_INTERVAL", "0.05"))
+
+# 交通状态历史：保存目录、道路历史保存的 tick 数 (默认按60秒一个 tick 约一天)，
+# 全网汇总历史保存的 tick 数 (约两周，用于与上周同期比较)。同一目录只有一个进程写入：共享状态下为生产者，
+# 否则为最先启动的进程，其余进程只读
+HISTORY_DIR = os.getenv("HISTORY_DIR", "cache/history")
+HISTORY_ROAD_CAPACITY = int(os.getenv("HISTORY_ROAD_CAPACITY", "1440"))
+HISTORY_NETWORK_CAPACITY = int(os.getenv("HISTORY_NETWORK_CAPACITY", "20160"))
+# 历史查询：单次最多返回的点数、单次最多查询的道路数
+HISTORY_MAX_POINTS = int(os.getenv("HISTORY_MAX_POINTS", "2000"))
+HISTORY_MAX_ROADS = int(os.getenv("HISTORY_MAX_ROADS", "200"))
+
+# 交通预测：基线重新拟合 (累加新历史) 的间隔秒数、实时偏差每小时的衰减系数
+FORECAST_REFIT_INTERVAL = float(os.getenv("FORECAST_REFIT_INTERVAL", "300"))
+FORECAST_DECAY = float(os.getenv("FORECAST_DECAY", "0.7"))
+
+# 路网静态数据 (各细节层级的几何JSON、道路所在区域) 的二进制缓存目录，按输入文件内容区分
+NETWORK_CACHE_DIR = os.getenv("NETWORK_CACHE_DIR", "cache/network")
+
+# 拥堵热点：聚类网格边长 (度，约0.01度为1公里)、最多输出的热点数
+HOTSPOT_CELL_SIZE = float(os.getenv("HOTSPOT_CELL_SIZE", "0.01"))
+HOTSPOT_MAX = int(os.getenv("HOTSPOT_MAX", "10"))
+
+# 道路速度历史分析：原始CSV、路段信息 (提供所属区域)、Parquet 数据集和数据立方的存储目录
+ROAD_SPEED_CSV = os.getenv("ROAD_SPEED_CSV", "public/road_speed.csv")
+ROAD_INFO_CSV = os.getenv("ROAD_INFO_CSV", "public/road_info.csv")
+ROAD_SPEED_STORE_DIR = os.getenv("ROAD_SPEED_STORE_DIR", "cache/road_speed")
+
+# 服务进程数 (uvicorn --workers)。uvicorn 以同名环境变量作为 --workers 的默认值，python -m app --workers N 时自动设置
+WEB_CONCURRENCY = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+
+# 密码哈希 (bcrypt) 进程池：工作进程数 (0 为 CPU 核数 / WEB_CONCURRENCY，各服务进程的哈希进程合计不超过 CPU 核数)，
+# 以及最多等待的任务数 (0 为工作进程数的4倍)，超过时登录、注册和修改密码直接返回503。两者都是每个服务进程的值，
+# 整个服务的上限为其 WEB_CONCURRENCY 倍。等待任务的请求会占用线程池的线程，上限应小于线程池大小 (默认40)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "0"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "0"))
+
+# 数据库连接 URL。没有 MariaDB 时可使用 SQLite (如 sqlite:///cache/app.db)，启动时自动建表
+DATABASE_URL = os.getenv("DATABASE_URL", "mysql+pymysql://root:1@localhost:3306/TRANSIPORT")
+# 用户路由使用的异步连接 URL (如 mysql+aiomysql://...、sqlite+aiosqlite:///cache/app.db，需安装对应驱动)，
+# 为空时用户路由在线程池中使用同步连接。SQLite 的异步连接同样在启动时自动建表
+DATABASE_ASYNC_URL = os.getenv("DATABASE_ASYNC_URL", "")
+# 连接池：常驻连接数、超出后最多临时创建的连接数、等待空闲连接的超时秒数、
+# 连接最长使用秒数 (应小于 MySQL 的 wait_timeout)、取用连接前是否检测连接可用
+DATABASE_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", "10"))
+DATABASE_MAX_OVERFLOW = int(os.getenv("DATABASE_MAX_OVERFLOW", "20"))
+DATABASE_POOL_TIMEOUT = float(os.getenv("DATABASE_POOL_TIMEOUT", "30"))
+DATABASE_POOL_RECYCLE = int(os.getenv("DATABASE_POOL_RECYCLE", "1800"))
+DATABASE_POOL_PRE_PING = os.getenv("DATABASE_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# 用户缓存：最多缓存的用户数、有效秒数，以及多进程共享的版本号文件和槽位数 (修改用户后使各进程的缓存失效)
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+USER_CACHE_VERSION_PATH = os.getenv(
+    "USER_CACHE_VERSION_PATH",
+    os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "traffic_user_versions"),
+)
+USER_CACHE_VERSION_SLOTS = int(os.getenv("USER_CACHE_VERSION_SLOTS", "65536"))
@@ -2,28 +2,82 @@ from jose import jwt
 from fastapi import HTTPException
 from sqlmodel import Session, select
 from datetime import timedelta, datetime
-from passlib.context import CryptContext
+from typing import TYPE_CHECKING
 
+from app.config import (
+    PASSWORD_HASH_MAX_PENDING,
+    PASSWORD_HASH_WORKERS,
+    USER_CACHE_SIZE,
+    USER_CACHE_TTL,
+    USER_CACHE_VERSION_PATH,
+    USER_CACHE_VERSION_SLOTS,
+    WEB_CONCURRENCY,
+)
 from app.models import User
 from app.schemas import RegisterUser
+from services.auth.password_pool import PasswordHashPool, PasswordPoolBusy
+from services.auth.user_cache import CachedUser, UserCache
+from services.shared.versions import VersionSlots
+
+if TYPE_CHECKING:
+    from sqlmodel.ext.asyncio.session import AsyncSession
 
 # JWT 配置
 SECRET_KEY = "your-secret-key"  # 替换为一个安全的密钥
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-# 密码哈希配置
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# 密码哈希配置：bcrypt 在独立的进程池中计算，等待的任务过多或工作进程异常退出时直接返回503
+password_pool = PasswordHashPool(
+    workers=PASSWORD_HASH_WORKERS,
+    max_pending=PASSWORD_HASH_MAX_PENDING,
+    schemes=["bcrypt"],
+    processes=WEB_CONCURRENCY,
+)
+
+
+def _password_pool_busy():
+    return HTTPException(
+        status_code=503, detail="Password service is busy, please retry later", headers={"Retry-After": "1"}
+    )
 
 
 # 哈希密码
 def getHashedPassword(password: str):
-    return pwd_context.hash(password)
+    try:
+        return password_pool.hash(password)
+    except PasswordPoolBusy:
+        raise _password_pool_busy()
 
 
 # 验证函数
 def verifyPassword(plainPassword: str, hashedPassword: str):
-    return pwd_context.verify(plainPassword, hashedPassword)
+    try:
+        return password_pool.verify(plainPassword, hashedPassword)
+    except PasswordPoolBusy:
+        raise _password_pool_busy()
+
+
+async def getHashedPasswordAsync(password: str):
+    try:
+        return await password_pool.hash_async(password)
+    except PasswordPoolBusy:
+        raise _password_pool_busy()
+
+
+async def verifyPasswordAsync(plainPassword: str, hashedPassword: str):
+    try:
+        return await password_pool.verify_async(plainPassword, hashedPassword)
+    except PasswordPoolBusy:
+        raise _password_pool_busy()
+
+
+# 用户缓存：登录、查询和存在性检查优先读取缓存，修改用户后调用 user_cache.invalidate()
+user_cache = UserCache(
+    maxsize=USER_CACHE_SIZE,
+    ttl=USER_CACHE_TTL,
+    versions=VersionSlots(USER_CACHE_VERSION_PATH, slots=USER_CACHE_VERSION_SLOTS),
+)
 
 
 # 创建JWT
@@ -41,22 +95,36 @@ def getUserByUsername(db: Session, username: str):
     dbUser = db.exec(statement).first()
     return dbUser
 
+# 查询数据库并缓存用户的只读副本，用户不存在时返回 None (同样缓存)
+def loadCachedUser(db: Session, username: str):
+    version = user_cache.version(username)
+    dbUser = getUserByUsername(db, username)
+    user = CachedUser.from_model(dbUser) if dbUser else None
+    user_cache.put(username, user, version)
+    return user
+
+# 从缓存查找用户，未命中时查询数据库
+def getCachedUser(db: Session, username: str):
+    hit, user = user_cache.get(username)
+    return user if hit else loadCachedUser(db, username)
+
 # 创建用户
 def createUser(db: Session, user: RegisterUser):
     # 检查用户是否存在
-    if getUserByUsername(db, user.username):
+    if getCachedUser(db, user.username):
         raise HTTPException(status_code=400, detail="User has registered")
     dbUser = User(**user.model_dump())
     dbUser.hashedPassword = getHashedPassword(user.password)
     db.add(dbUser)
     db.commit()
     db.refresh(dbUser)
+    user_cache.invalidate(dbUser.username)
     return dbUser
 
 # 更新用户名
 def updateUsername(db: Session, current_username: str, new_username: str):
     # 检查新用户名是否已存在
-    if getUserByUsername(db, new_username):
+    if getCachedUser(db, new_username):
         raise HTTPException(status_code=400, detail="Username already exists")
     
     # 获取当前用户
@@ -68,6 +136,8 @@ def updateUsername(db: Session, current_username: str, new_username: str):
     user.username = new_username
     db.commit()
     db.refresh(user)
+    user_cache.invalidate(current_username)
+    user_cache.invalidate(new_username)
     return user
 
 # 更新用户密码
@@ -85,4 +155,63 @@ def updatePassword(db: Session, username: str, current_password: str, new_passwo
     user.hashedPassword = getHashedPassword(new_password)
     db.commit()
     db.refresh(user)
+    user_cache.invalidate(username)
+    return user
+
+
+# 以下为使用异步引擎 (DATABASE_ASYNC_URL) 时的对应函数，逻辑与同步版本相同
+async def getUserByUsernameAsync(db: "AsyncSession", username: str):
+    statement = select(User).where(User.username == username)
+    return (await db.exec(statement)).first()
+
+
+async def loadCachedUserAsync(db: "AsyncSession", username: str):
+    version = user_cache.version(username)
+    dbUser = await getUserByUsernameAsync(db, username)
+    user = CachedUser.from_model(dbUser) if dbUser else None
+    user_cache.put(username, user, version)
+    return user
+
+
+async def getCachedUserAsync(db: "AsyncSession", username: str):
+    hit, user = user_cache.get(username)
+    return user if hit else await loadCachedUserAsync(db, username)
+
+
+async def createUserAsync(db: "AsyncSession", user: RegisterUser):
+    if await getCachedUserAsync(db, user.username):
+        raise HTTPException(status_code=400, detail="User has registered")
+    dbUser = User(**user.model_dump())
+    dbUser.hashedPassword = await getHashedPasswordAsync(user.password)
+    db.add(dbUser)
+    await db.commit()
+    await db.refresh(dbUser)
+    user_cache.invalidate(dbUser.username)
+    return dbUser
+
+
+async def updateUsernameAsync(db: "AsyncSession", current_username: str, new_username: str):
+    if await getCachedUserAsync(db, new_username):
+        raise HTTPException(status_code=400, detail="Username already exists")
+    user = await getUserByUsernameAsync(db, current_username)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    user.username = new_username
+    await db.commit()
+    await db.refresh(user)
+    user_cache.invalidate(current_username)
+    user_cache.invalidate(new_username)
+    return user
+
+
+async def updatePasswordAsync(db: "AsyncSession", username: str, current_password: str, new_password: str):
+    user = await getUserByUsernameAsync(db, username)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    if not await verifyPasswordAsync(current_password, user.hashedPassword):
+        raise HTTPException(status_code=400, detail="Incorrect current password")
+    user.hashedPassword = await getHashedPasswordAsync(new_password)
+    await db.commit()
+    await db.refresh(user)
+    user_cache.invalidate(username)
     return user
@@ -1,12 +1,154 @@
-from sqlmodel import Session, create_engine
+import time
+from contextlib import asynccontextmanager, contextmanager
 
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+from starlette.concurrency import run_in_threadpool
+
+from app.config import (
+    DATABASE_ASYNC_URL,
+    DATABASE_MAX_OVERFLOW,
+    DATABASE_POOL_PRE_PING,
+    DATABASE_POOL_RECYCLE,
+    DATABASE_POOL_SIZE,
+    DATABASE_POOL_TIMEOUT,
+    DATABASE_URL,
+)
+from services.monitoring.metrics import metrics
+
+
+def _engine_options(url: str, is_async: bool = False) -> dict:
+    """按数据库类型生成 create_engine 的参数"""
+    url = make_url(url)
+    if url.get_backend_name() != "sqlite":
+        return {
+            "pool_size": DATABASE_POOL_SIZE,
+            "max_overflow": DATABASE_MAX_OVERFLOW,
+            "pool_timeout": DATABASE_POOL_TIMEOUT,
+            "pool_recycle": DATABASE_POOL_RECYCLE,
+            "pool_pre_ping": DATABASE_POOL_PRE_PING,
+        }
+    # 内存数据库只存在于单个连接中，所有线程共用一个连接
+    if url.database in (None, "", ":memory:"):
+        return {"poolclass": StaticPool, "connect_args": {"check_same_thread": False}}
+    # SQLite 文件库：连接可以跨线程使用，不需要回收和检测
+    return {
+        "poolclass": AsyncAdaptedQueuePool if is_async else QueuePool,
+        "pool_size": DATABASE_POOL_SIZE,
+        "max_overflow": DATABASE_MAX_OVERFLOW,
+        "pool_timeout": DATABASE_POOL_TIMEOUT,
+        "connect_args": {"check_same_thread": False},
+    }
+
+
+def _configure_sqlite(engine):
+    """SQLite 使用 WAL 日志 (读写互不阻塞)，写锁冲突时等待而不是立即报错"""
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, _record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.close()
+
+
+def is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
 
-# MariaDB 连接 URL
-SQLALCHEMY_DATABASE_URL = "mysql+pymysql://root:1@localhost:3306/TRANSIPORT"
 
 # 创建数据库引擎
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
+if is_sqlite(DATABASE_URL):
+    _configure_sqlite(engine)
+
+# 可选的异步引擎，用户路由优先使用
+async_engine = None
+if DATABASE_ASYNC_URL:
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    async_engine = create_async_engine(DATABASE_ASYNC_URL, **_engine_options(DATABASE_ASYNC_URL, is_async=True))
+    if is_sqlite(DATABASE_ASYNC_URL):
+        _configure_sqlite(async_engine.sync_engine)
+
+
+async def init_database():
+    """SQLite 数据库在启动时创建缺少的表 (MariaDB 的表结构由外部维护)，同步和异步引擎各自建表"""
+    import app.models  # noqa: F401  注册表结构
+
+    if is_sqlite(DATABASE_URL):
+        await run_in_threadpool(SQLModel.metadata.create_all, engine)
+    # 异步引擎可能指向另一个库 (如内存库只存在于自己的连接中)，在其连接上建表
+    if async_engine is not None and is_sqlite(DATABASE_ASYNC_URL):
+        async with async_engine.begin() as connection:
+            await connection.run_sync(SQLModel.metadata.create_all)
+
+
+async def close_database():
+    """关闭时释放两个引擎的全部连接 (异步驱动的后台线程随连接关闭，进程才能退出)"""
+    if async_engine is not None:
+        await async_engine.dispose()
+    engine.dispose()
+
+
+@contextmanager
+def _timed_connection():
+    """从连接池取得连接，记录等待时间 (含新建连接)，等待超时计入 db.pool.timeout"""
+    start = time.perf_counter()
+    try:
+        connection = engine.connect()
+    except PoolTimeoutError:
+        metrics.increment("db.pool.timeout")
+        raise
+    finally:
+        metrics.observe("db.pool.checkout_wait", time.perf_counter() - start)
+    with connection:
+        yield connection
+
+
+@asynccontextmanager
+async def _timed_async_connection():
+    """异步引擎的 _timed_connection()"""
+    start = time.perf_counter()
+    try:
+        connection = await async_engine.connect()
+    except PoolTimeoutError:
+        metrics.increment("db.pool.timeout")
+        raise
+    finally:
+        metrics.observe("db.pool.async_checkout_wait", time.perf_counter() - start)
+    try:
+        yield connection
+    finally:
+        await connection.close()
+
 
 def getSession():
-    with Session(engine) as session:
+    with _timed_connection() as connection, Session(bind=connection) as session:
         yield session
+
+
+def _call_with_session(func, *args):
+    with _timed_connection() as connection, Session(bind=connection) as session:
+        return func(session, *args)
+
+
+async def run_with_session(func, async_func, *args):
+    """
+    在数据库会话中执行 crud 函数：配置了异步引擎时等待 async_func，否则在线程池中执行 func
+
+    Args:
+        func: 同步函数，第一个参数为 Session
+        async_func: 对应的异步函数，第一个参数为 AsyncSession
+        args: 其余参数
+    """
+    if async_engine is not None:
+        from sqlmodel.ext.asyncio.session import AsyncSession
+
+        async with _timed_async_connection() as connection:
+            async with AsyncSession(bind=connection, expire_on_commit=False) as session:
+                return await async_func(session, *args)
+    return await run_in_threadpool(_call_with_session, func, *args)
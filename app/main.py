@@ -1,18 +1,81 @@
-from sqlmodel import Session
 from datetime import timedelta
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi import Depends, FastAPI, HTTPException, status, WebSocket, WebSocketDisconnect, BackgroundTasks
-from app.database import getSession
-from app.crud import createUser, updateUsername, updatePassword, getUserByUsername
+from fastapi import FastAPI, HTTPException, status, WebSocket, WebSocketDisconnect, WebSocketException, BackgroundTasks, Request, Response
+from app.database import close_database, init_database, run_with_session
+from app.crud import (
+    createUser,
+    createUserAsync,
+    loadCachedUser,
+    loadCachedUserAsync,
+    password_pool,
+    updatePassword,
+    updatePasswordAsync,
+    updateUsername,
+    updateUsernameAsync,
+    user_cache,
+)
 from app.schemas import LoginUser, PasswordUpdateRequest, RegisterUser, UsernameUpdateRequest
-from services.auth.login import authenticateUser
+from services.auth.login import authenticateUser, authenticateUserAsync
 from app.crud import ACCESS_TOKEN_EXPIRE_MINUTES, createAccessToken
 from services.websocket.flow_update import start_flow_updates, stop_flow_updates
 import asyncio
+import json
 import logging
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Tuple, Union
 import time
+import numpy as np
+from starlette.concurrency import run_in_threadpool
 from services.data.TrafficDataGenerate import TrafficDataGenerator
+from services.data.flow_binary import MEDIA_TYPE as FLOW_BINARY_MEDIA_TYPE, encode_flow_binary
+from services.data.flow_delta import FlowDeltaTracker
+from services.data.history import ROAD_CLASS_NAMES
+from services.data.snapshot import SNAPSHOT_KEYS, SnapshotStore, TrafficSnapshot, build_snapshot, channel_key
+from services.data.lod import resolve_lod
+from services.data.spatial_index import BBox, parse_bbox
+from services.tiles.road_tiles import RoadTileCache, is_valid_tile
+from services.shared.state import SharedState
+from services.websocket.client_queue import ClientSender
+from services.websocket.compression import SUPPORTED_ENCODINGS, CompressionCache, choose_encoding
+from services.websocket.encoding import encode_json
+from services.monitoring.loop_lag import monitor_event_loop_lag
+from services.monitoring.metrics import metrics
+
+if TYPE_CHECKING:
+    # pandas/pyarrow 导入较慢，只在首次查询速度数据立方时导入
+    from services.road.speed_store import RoadSpeedStore
+
+from app.config import (
+    COMPRESSION_BROTLI_QUALITY,
+    COMPRESSION_GZIP_LEVEL,
+    COMPRESSION_MIN_SIZE,
+    EVENT_LOOP_LAG_INTERVAL,
+    FORECAST_DECAY,
+    FORECAST_REFIT_INTERVAL,
+    HISTORY_DIR,
+    HISTORY_MAX_POINTS,
+    HISTORY_MAX_ROADS,
+    HISTORY_NETWORK_CAPACITY,
+    HISTORY_ROAD_CAPACITY,
+    HOTSPOT_CELL_SIZE,
+    HOTSPOT_MAX,
+    NETWORK_CACHE_DIR,
+    ROAD_INFO_CSV,
+    ROAD_SPEED_CSV,
+    ROAD_SPEED_STORE_DIR,
+    SHARED_STATE_MODE,
+    SHARED_STATE_PATH,
+    SHARED_STATE_POLL_INTERVAL,
+    SHARED_STATE_SLOT_MB,
+    SHARED_STATE_SLOTS,
+    FLOW_DELTA_FLOW_THRESHOLD,
+    FLOW_DELTA_SPEED_THRESHOLD,
+    SEND_QUEUE_MAX_DROPPED,
+    SEND_QUEUE_MAX_SIZE,
+    SEND_QUEUE_POLICY,
+    TILE_CACHE_SIZE,
+    TILE_GEOMETRY_CACHE_SIZE,
+)
 
 # 配置日志
 logging.basicConfig(
@@ -42,14 +105,18 @@ app.add_middleware(
 
 # 全局变量用于控制定时更新任务
 update_interval = 60  # 默认10秒更新一次
+process_start_time = time.time()
 background_task = None
 is_updating = False
+lag_monitor_task = None
+forecast_task = None
 
 # 注册路由
+# 用户路由的数据库访问由 run_with_session 执行：配置了异步引擎时直接在事件循环中等待，否则在线程池中执行
 @app.post("/user/register")
-def createNewUser(user: RegisterUser, db: Session = Depends(getSession)):
+async def createNewUser(user: RegisterUser):
     try:
-        result = createUser(db, user)
+        result = await run_with_session(createUser, createUserAsync, user)
         return {
             "message": "User registered successfully", 
             "username": result.username,
@@ -67,8 +134,10 @@ def createNewUser(user: RegisterUser, db: Session = Depends(getSession)):
 
 # 登录路由
 @app.post("/user/login")
-def login(loginUser: LoginUser, db: Session = Depends(getSession)):
-    user = authenticateUser(db, loginUser.username, loginUser.password)
+async def login(loginUser: LoginUser):
+    user = await run_with_session(
+        authenticateUser, authenticateUserAsync, loginUser.username, loginUser.password
+    )
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -84,9 +153,11 @@ def login(loginUser: LoginUser, db: Session = Depends(getSession)):
 
 # 修改用户名路由
 @app.post("/user/update-username")
-def update_username(request: UsernameUpdateRequest, db: Session = Depends(getSession)):
+async def update_username(request: UsernameUpdateRequest):
     try:
-        result = updateUsername(db, request.current_username, request.new_username)
+        result = await run_with_session(
+            updateUsername, updateUsernameAsync, request.current_username, request.new_username
+        )
         return {
             "message": "Username updated successfully",
             "username": result.username,
@@ -103,9 +174,11 @@ def update_username(request: UsernameUpdateRequest, db: Session = Depends(getSes
 
 # 修改密码路由
 @app.post("/user/update-password")
-def update_password(request: PasswordUpdateRequest, db: Session = Depends(getSession)):
+async def update_password(request: PasswordUpdateRequest):
     try:
-        result = updatePassword(db, request.username, request.current_password, request.new_password)
+        result = await run_with_session(
+            updatePassword, updatePasswordAsync, request.username, request.current_password, request.new_password
+        )
         return {
             "message": "Password updated successfully",
             "username": result.username,
@@ -122,9 +195,12 @@ def update_password(request: PasswordUpdateRequest, db: Session = Depends(getSes
 
 # 获取用户信息路由
 @app.get("/user/info")
-def get_user_info(username: str, db: Session = Depends(getSession)):
+async def get_user_info(username: str):
     try:
-        user = getUserByUsername(db, username)
+        # 缓存命中时直接返回，不访问数据库
+        hit, user = user_cache.get(username)
+        if not hit:
+            user = await run_with_session(loadCachedUser, loadCachedUserAsync, username)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -152,8 +228,8 @@ async def start_updates(interval_seconds: int = 10):
     
     if not is_updating:
         # 启动后台任务
-        background_task = asyncio.create_task(periodic_data_update())
         is_updating = True
+        start_data_task()
         logging.info(f"流量更新任务已启动，更新间隔为 {interval_seconds} 秒")
     else:
         logging.info(f"更新间隔已修改为 {interval_seconds} 秒")
@@ -171,64 +247,341 @@ async def stop_updates():
     
     return {"message": "流量更新任务已停止"}
 
-# 初始化数据生成器
-data_generator = TrafficDataGenerator(
-    road_network_file="public/road_network/shenzhen_road.geojson",
-    district_file="public/distriction/440300.json"
+# 数据生成器、道路流量矢量瓦片和道路流量增量推送 (/ws/road_flow?mode=delta) 在启动时由
+# build_data_generator() 创建，导入本模块时不加载路网
+data_generator: Optional[TrafficDataGenerator] = None
+road_tiles: Optional[RoadTileCache] = None
+flow_delta: Optional[FlowDeltaTracker] = None
+
+def build_data_generator():
+    """加载路网并创建数据生成器及依赖它的对象 (道路数组、各细节层级的几何和道路所在区域从 NETWORK_CACHE_DIR 的缓存读取)"""
+    global data_generator, road_tiles, flow_delta
+    # 共享状态下只有生产者运行模拟和写入历史，读者只构建查询需要的路网数据并只读打开历史
+    producer = shared_state is None or shared_state.try_become_producer()
+    generator = TrafficDataGenerator(
+        road_network_file="public/road_network/shenzhen_road.geojson",
+        district_file="public/distriction/440300.json",
+        history_dir=HISTORY_DIR,
+        history_writable=producer,
+        history_road_capacity=HISTORY_ROAD_CAPACITY,
+        history_network_capacity=HISTORY_NETWORK_CAPACITY,
+        forecast_decay=FORECAST_DECAY,
+        hotspot_cell_size=HOTSPOT_CELL_SIZE,
+        max_hotspots=HOTSPOT_MAX,
+        cache_dir=NETWORK_CACHE_DIR,
+        simulate=producer,
+    )
+    road_tiles = RoadTileCache(
+        generator.road_state,
+        generator.road_index,
+        max_geometry_tiles=TILE_GEOMETRY_CACHE_SIZE,
+        max_tiles=TILE_CACHE_SIZE,
+    )
+    flow_delta = FlowDeltaTracker(
+        generator.road_state,
+        generator.flow_encoder,
+        flow_threshold=FLOW_DELTA_FLOW_THRESHOLD,
+        speed_threshold=FLOW_DELTA_SPEED_THRESHOLD,
+    )
+    data_generator = generator
+
+# 每个 tick 的响应和推送消息只压缩一次
+compression_cache = CompressionCache(
+    gzip_level=COMPRESSION_GZIP_LEVEL,
+    brotli_quality=COMPRESSION_BROTLI_QUALITY,
+    min_size=COMPRESSION_MIN_SIZE,
 )
 
+# 每个 tick 从快照推送的客户端类型：快照中的键 (含细节层级，如 "road_flow@2") 以及二进制推送
+SNAPSHOT_CLIENT_TYPES = SNAPSHOT_KEYS + ["road_flow_binary"]
+
+def compressed_client_type(client_type: str, encoding: str) -> str:
+    """订阅压缩消息的客户端类型，如 "road_flow@2+gzip" """
+    return f"{client_type}+{encoding}"
+
 # WebSocket连接管理器
 class ConnectionManager:
     def __init__(self):
+        # 客户端类型为快照推送的类型及其压缩版本，以及增量推送
         self.active_connections: Dict[str, List[WebSocket]] = {
-            "road_flow": [],
-            "traffic_events": [],
-            "district_data": [],
-            "statistics": [],
-            "trend_data": [],
-            "prediction_data": [],
-            "hotspots_data": [],
-            "all_data": []
+            client_type: []
+            for client_type in SNAPSHOT_CLIENT_TYPES
+            + [
+                compressed_client_type(client_type, encoding)
+                for client_type in SNAPSHOT_CLIENT_TYPES
+                for encoding in SUPPORTED_ENCODINGS
+            ]
+            + ["road_flow_delta"]
         }
+        # 每个连接的发送队列
+        self.senders: Dict[WebSocket, ClientSender] = {}
     
     async def connect(self, websocket: WebSocket, client_type: str):
         await websocket.accept()
         if (client_type in self.active_connections):
             self.active_connections[client_type].append(websocket)
+            self.senders[websocket] = ClientSender(
+                websocket,
+                policy=SEND_QUEUE_POLICY,
+                max_queue_size=SEND_QUEUE_MAX_SIZE,
+                max_dropped=SEND_QUEUE_MAX_DROPPED,
+                on_close=lambda sender: self.disconnect(sender.websocket, client_type),
+            )
             logging.info(f"{client_type} 客户端连接成功，当前连接数: {len(self.active_connections[client_type])}")
         else:
             logging.warning(f"未知的客户端类型: {client_type}")
     
     def disconnect(self, websocket: WebSocket, client_type: str):
+        sender = self.senders.pop(websocket, None)
+        if sender is not None:
+            sender.close()
         if client_type in self.active_connections and websocket in self.active_connections[client_type]:
             self.active_connections[client_type].remove(websocket)
             logging.info(f"{client_type} 客户端断开连接，当前连接数: {len(self.active_connections[client_type])}")
     
-    async def broadcast(self, client_type: str, message: Dict[str, Any]):
-        """向特定类型的所有连接客户端广播消息"""
+    def send(self, websocket: WebSocket, message: Union[str, bytes]):
+        """把消息放入单个连接的发送队列"""
+        sender = self.senders.get(websocket)
+        if sender is not None:
+            sender.send(message)
+    
+    def broadcast(self, client_type: str, message: Union[str, bytes, Dict[str, Any]]):
+        """
+        向特定类型的所有连接客户端广播消息
+
+        消息只序列化一次，之后放入每个连接的发送队列，不等待网络发送；bytes 以二进制帧发送
+        """
         if client_type not in self.active_connections:
             logging.warning(f"未知的客户端类型: {client_type}")
             return
         
-        disconnected = []
-        for connection in self.active_connections[client_type]:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                logging.error(f"发送消息失败: {e}")
-                disconnected.append(connection)
+        connections = list(self.active_connections[client_type])
+        if not connections:
+            return
         
-        # 移除断开的连接
-        for conn in disconnected:
-            self.disconnect(conn, client_type)
+        # 序列化一次
+        encode_start = time.perf_counter()
+        text = message if isinstance(message, (str, bytes)) else encode_json(message)
+        metrics.observe(f"broadcast.{client_type}.encode", time.perf_counter() - encode_start)
+        
+        enqueue_start = time.perf_counter()
+        for connection in connections:
+            self.send(connection, text)
+        metrics.observe(f"broadcast.{client_type}.enqueue", time.perf_counter() - enqueue_start)
+        metrics.increment(f"broadcast.{client_type}.frames", len(connections))
+        metrics.increment(f"broadcast.{client_type}.bytes", len(text) * len(connections))
 
 # 只定义一次manager实例
 manager = ConnectionManager()
 
+# 每个 tick 发布的只读快照，HTTP 和 WebSocket 读者都从这里读取
+snapshots = SnapshotStore()
+tick_counter = 0
+
+# 多进程部署时 (SHARED_STATE_MODE=auto) 只有一个进程运行模拟，其余进程读取共享内存中的快照
+shared_state = (
+    SharedState(SHARED_STATE_PATH, slots=SHARED_STATE_SLOTS, slot_size=SHARED_STATE_SLOT_MB * 1024 * 1024)
+    if SHARED_STATE_MODE == "auto"
+    else None
+)
+shared_seq = 0  # 读者已读取的共享记录序号
+
+# 模拟推进和快照构建在单独的线程中执行，不阻塞事件循环；
+# 只有一个线程，访问 data_generator 和 flow_delta 的任务按提交顺序依次执行
+tick_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tick")
+
+async def run_in_tick_thread(func, *args):
+    """在 tick 线程中执行函数并等待结果"""
+    return await asyncio.get_running_loop().run_in_executor(tick_executor, func, *args)
+
+def generate_tick(tick: int) -> Tuple[TrafficSnapshot, str]:
+    """推进一次模拟，返回本 tick 的快照和道路流量增量消息 (在 tick 线程中执行)"""
+    with metrics.timer("tick.generate"):
+        data_generator.update_data()
+        snapshot = build_snapshot(data_generator, tick)
+        # 道路流量增量数据，每个tick都推进序号以保证基线与客户端一致
+        delta_data = flow_delta.update(data_generator.road_state, snapshot.timestamp)
+    
+    if shared_state is not None and shared_state.is_producer:
+        try:
+            shared_state.publish(snapshot, delta_data, flow_delta.get_state())
+        except Exception:
+            # 读者会一直读到旧的快照，由 /health 报告为 stale
+            metrics.increment("shared_state.publish_errors")
+            logging.exception("写入共享状态失败")
+    return snapshot, delta_data
+
+def shared_state_stale() -> bool:
+    """共享状态的读者超过3个更新间隔 (至少10秒) 没有读到新快照时返回 True"""
+    if shared_state is None or shared_state.is_producer:
+        return False
+    snapshot = snapshots.current
+    age = time.time() - (snapshot.timestamp if snapshot is not None else process_start_time)
+    return age > max(3 * update_interval, 10)
+
+def read_shared_tick() -> Optional[Tuple[int, TrafficSnapshot, str]]:
+    """读取生产者发布的最新记录并同步增量推送状态，没有新记录时返回 None (在 tick 线程中执行)"""
+    record = shared_state.read(shared_seq)
+    if record is None:
+        return None
+    seq, snapshot, delta_data, delta_state = record
+    flow_delta.set_state(*delta_state)
+    # 读者不运行模拟，以快照中的道路状态生成本进程的道路预测
+    data_generator.forecaster.update(
+        snapshot.timestamp,
+        snapshot.road_flow,
+        snapshot.road_speed,
+        utc_offset=time.localtime(snapshot.timestamp).tm_gmtoff,
+    )
+    return seq, snapshot, delta_data
+
+def restore_road_state(snapshot: Optional[TrafficSnapshot]):
+    """
+    接替生产者时，从最新快照恢复道路状态、接替历史写入并构建模拟需要的状态，
+    使模拟从共享状态继续 (在 tick 线程中执行)
+    """
+    if data_generator.history is not None and not data_generator.history.try_become_writer():
+        logging.warning("历史目录仍被其他进程写入，本进程不记录历史")
+    if snapshot is not None:
+        road_state = data_generator.road_state
+        road_state.flow = snapshot.road_flow.copy()
+        road_state.speed = snapshot.road_speed.copy()
+        road_state.congestion = snapshot.road_congestion.copy()
+    data_generator.start_simulation()
+
+async def _build_current_snapshot() -> TrafficSnapshot:
+    """尚无快照时，以生成器当前状态构建快照 (不推进模拟)"""
+    global shared_seq
+    if shared_state is not None and not shared_state.is_producer:
+        # 读者先等待生产者发布快照，超时后才使用本进程的初始状态
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            record = await run_in_tick_thread(read_shared_tick)
+            if record is not None:
+                shared_seq, snapshot, _ = record
+                return snapshot
+            await asyncio.sleep(SHARED_STATE_POLL_INTERVAL)
+        logging.warning("等待共享快照超时，使用本进程的初始状态")
+        await run_in_tick_thread(data_generator.start_simulation)
+    return await run_in_tick_thread(build_snapshot, data_generator, tick_counter)
+
+async def get_snapshot() -> TrafficSnapshot:
+    """获取当前快照"""
+    return await snapshots.get(_build_current_snapshot)
+
+def ws_client_type(client_type: str, compression: Optional[str]) -> str:
+    """
+    根据 compression 参数选择客户端类型
+
+    compression=gzip/br 时订阅压缩后的二进制帧
+
+    Raises:
+        WebSocketException: 不支持的压缩格式，拒绝连接 (1008)
+    """
+    if compression is None:
+        return client_type
+    if compression not in SUPPORTED_ENCODINGS:
+        raise WebSocketException(
+            code=status.WS_1008_POLICY_VIOLATION,
+            reason=f"不支持的压缩格式: {compression}，可选 {', '.join(SUPPORTED_ENCODINGS)}",
+        )
+    return compressed_client_type(client_type, compression)
+
+def snapshot_message(snapshot: TrafficSnapshot, client_type: str) -> Union[str, bytes]:
+    """快照中对应客户端类型的推送消息，压缩类型返回该 tick 缓存的压缩结果"""
+    key, _, encoding = client_type.partition("+")
+    message = snapshot.road_flow_binary if key == "road_flow_binary" else snapshot.messages[key]
+    if not encoding:
+        return message
+    return compression_cache.get(snapshot.tick, f"ws:{key}", message, encoding)
+
 # 定期更新和广播数据的后台任务
+async def broadcast_tick(snapshot: TrafficSnapshot, delta_data: str):
+    """向各频道广播本 tick 的数据"""
+    # 压缩消息只在有订阅者时压缩一次 (在 tick 线程中完成)
+    client_types = [
+        client_type
+        for client_type, connections in manager.active_connections.items()
+        if connections and client_type != "road_flow_delta"
+    ]
+    messages = await run_in_tick_thread(
+        lambda: [snapshot_message(snapshot, client_type) for client_type in client_types]
+    )
+    for client_type, message in zip(client_types, messages):
+        manager.broadcast(client_type, message)
+    
+    if manager.active_connections["road_flow_delta"]:
+        manager.broadcast("road_flow_delta", delta_data)
+
+def start_data_task():
+    """启动数据更新任务：未启用共享状态或成为生产者时运行模拟，否则读取共享状态"""
+    if shared_state is None or shared_state.try_become_producer():
+        asyncio.create_task(periodic_data_update())
+    else:
+        asyncio.create_task(periodic_shared_read())
+
+async def periodic_shared_read():
+    """读者进程：轮询生产者发布的快照并广播，生产者退出后接替模拟"""
+    global tick_counter, shared_seq
+    
+    logging.info(f"进程以共享状态读者身份运行，轮询间隔：{SHARED_STATE_POLL_INTERVAL}秒")
+    stale = False
+    
+    while is_updating:
+        try:
+            if shared_state.try_become_producer():
+                await run_in_tick_thread(restore_road_state, snapshots.current)
+                asyncio.create_task(periodic_data_update())
+                return
+            
+            record = await run_in_tick_thread(read_shared_tick)
+            if record is not None:
+                shared_seq, snapshot, delta_data = record
+                tick_counter = snapshot.tick
+                snapshots.publish(snapshot)
+                await broadcast_tick(snapshot, delta_data)
+            
+            # 生产者写入失败或停止更新时，读者一直提供旧的快照，只在状态变化时记录一次
+            if shared_state_stale() != stale:
+                stale = not stale
+                if stale:
+                    logging.error("共享状态长时间没有新快照，当前提供的是旧数据")
+                else:
+                    logging.info("共享状态已恢复更新")
+            
+            await asyncio.sleep(SHARED_STATE_POLL_INTERVAL)
+            
+        except Exception as e:
+            logging.error(f"读取共享状态时出错: {e}")
+            await asyncio.sleep(5)
+
+async def periodic_forecast_refit():
+    """
+    定期把新的道路历史累加到预测基线 (在线程池中执行，不占用 tick 线程)
+
+    共享状态的读者进程从生产者写入的历史文件拟合，结果与生产者一致
+    """
+    # 道路名称经 road_info.csv 匹配到路段时，以 road_speed.csv 中该路段的小时速度作为基线的先验
+    try:
+        store = await get_speed_store()
+        data_generator.forecaster.set_speed_prior(
+            await run_in_threadpool(store.road_hourly_speed, data_generator.road_state.names, ROAD_INFO_CSV)
+        )
+    except Exception as e:
+        logging.warning(f"加载预测速度先验失败: {e}")
+    
+    while True:
+        try:
+            with metrics.timer("forecast.refit"):
+                added = await run_in_threadpool(data_generator.refit_forecast)
+            logging.info(f"预测基线已更新，累加 {added} 条道路历史")
+        except Exception as e:
+            logging.error(f"更新预测基线时出错: {e}")
+        await asyncio.sleep(FORECAST_REFIT_INTERVAL)
+
 async def periodic_data_update():
     """定期更新和广播交通数据"""
-    global is_updating, update_interval
+    global is_updating, update_interval, tick_counter
     
     logging.info(f"开始定期更新数据，间隔：{update_interval}秒")
     
@@ -237,69 +590,11 @@ async def periodic_data_update():
             start_time = time.time()
             logging.info(f"正在更新交通数据...")
             
-            # 更新所有数据
-            all_data = data_generator.update_all_data()
-            timestamp = int(time.time())
-            
-            # 广播道路流量数据
-            if manager.active_connections["road_flow"]:
-                flow_data = {
-                    "timestamp": timestamp,
-                    "data": data_generator.generate_flow_geojson()
-                }
-                await manager.broadcast("road_flow", flow_data)
-            
-            # 广播交通事件数据
-            if manager.active_connections["traffic_events"]:
-                events_data = {
-                    "timestamp": timestamp,
-                    "data": data_generator.generate_events_geojson()
-                }
-                await manager.broadcast("traffic_events", events_data)
-            
-            # 广播区域数据
-            if manager.active_connections["district_data"]:
-                district_data = {
-                    "timestamp": timestamp,
-                    "data": data_generator.generate_district_geojson()
-                }
-                await manager.broadcast("district_data", district_data)
-            
-            # 广播统计数据
-            if manager.active_connections["statistics"]:
-                statistics_data = {
-                    "timestamp": timestamp,
-                    "data": data_generator.generate_traffic_statistics()
-                }
-                await manager.broadcast("statistics", statistics_data)
-            
-            # 广播趋势数据
-            if manager.active_connections["trend_data"]:
-                trend_data = {
-                    "timestamp": timestamp,
-                    "data": data_generator.generate_traffic_trend_data()
-                }
-                await manager.broadcast("trend_data", trend_data)
-            
-            # 广播预测数据
-            if manager.active_connections["prediction_data"]:
-                prediction_data = {
-                    "timestamp": timestamp,
-                    "data": data_generator.generate_prediction_data()
-                }
-                await manager.broadcast("prediction_data", prediction_data)
-            
-            # 广播热点数据
-            if manager.active_connections["hotspots_data"]:
-                hotspots_data = {
-                    "timestamp": timestamp,
-                    "data": data_generator.generate_hotspots_data()
-                }
-                await manager.broadcast("hotspots_data", hotspots_data)
-            
-            # 广播所有数据
-            if manager.active_connections["all_data"]:
-                await manager.broadcast("all_data", all_data)
+            # 在 tick 线程中推进模拟，完成后发布本 tick 的快照
+            tick_counter += 1
+            snapshot, delta_data = await run_in_tick_thread(generate_tick, tick_counter)
+            snapshots.publish(snapshot)
+            await broadcast_tick(snapshot, delta_data)
             
             # 计算处理时间
             processing_time = time.time() - start_time
@@ -317,15 +612,31 @@ async def periodic_data_update():
 
 # WebSocket路由
 @app.websocket("/ws/road_flow")
-async def websocket_road_flow(websocket: WebSocket):
-    await manager.connect(websocket, "road_flow")
+async def websocket_road_flow(
+    websocket: WebSocket,
+    mode: str = "full",
+    format: str = "json",
+    zoom: Optional[float] = None,
+    lod: Optional[int] = None,
+    compression: Optional[str] = None,
+):
+    # format=binary 时以二进制列式帧推送流量，几何需通过 /get_road_flow 单独获取
+    if format == "binary":
+        await websocket_road_flow_binary(websocket, ws_client_type("road_flow_binary", compression))
+        return
+
+    # mode=delta 时先下发带序号的快照，之后只推送变化的道路
+    if mode == "delta":
+        await websocket_road_flow_delta(websocket)
+        return
+
+    # 按缩放级别或指定的细节层级订阅简化几何，compression=gzip/br 时推送压缩后的二进制帧
+    client_type = ws_client_type(channel_key("road_flow", resolve_lod(zoom, lod)), compression)
+    await manager.connect(websocket, client_type)
     try:
         # 发送初始数据
-        initial_data = {
-            "timestamp": int(time.time()),
-            "data": data_generator.generate_flow_geojson()
-        }
-        await websocket.send_json(initial_data)
+        snapshot = await get_snapshot()
+        manager.send(websocket, snapshot_message(snapshot, client_type))
         
         # 保持连接
         while True:
@@ -334,211 +645,574 @@ async def websocket_road_flow(websocket: WebSocket):
             # 这里可以处理客户端发送的消息
             
     except WebSocketDisconnect:
-        manager.disconnect(websocket, "road_flow")
+        manager.disconnect(websocket, client_type)
+
+async def websocket_road_flow_delta(websocket: WebSocket):
+    await manager.connect(websocket, "road_flow_delta")
+    try:
+        # 发送初始快照
+        manager.send(websocket, await run_in_tick_thread(flow_delta.encode_snapshot, int(time.time())))
+        
+        while True:
+            # 客户端发现序号不连续时请求重新下发快照
+            data = await websocket.receive_text()
+            try:
+                message = json.loads(data)
+            except ValueError:
+                continue
+            if isinstance(message, dict) and message.get("type") == "resync":
+                manager.send(websocket, await run_in_tick_thread(flow_delta.encode_snapshot, int(time.time())))
+            
+    except WebSocketDisconnect:
+        manager.disconnect(websocket, "road_flow_delta")
+
+async def websocket_road_flow_binary(websocket: WebSocket, client_type: str):
+    await manager.connect(websocket, client_type)
+    try:
+        # 发送初始数据
+        snapshot = await get_snapshot()
+        manager.send(websocket, snapshot_message(snapshot, client_type))
+        
+        # 保持连接
+        while True:
+            await websocket.receive_text()
+            
+    except WebSocketDisconnect:
+        manager.disconnect(websocket, client_type)
 
 @app.websocket("/ws/traffic_events")
-async def websocket_traffic_events(websocket: WebSocket):
-    await manager.connect(websocket, "traffic_events")
+async def websocket_traffic_events(websocket: WebSocket, compression: Optional[str] = None):
+    client_type = ws_client_type("traffic_events", compression)
+    await manager.connect(websocket, client_type)
     try:
         # 发送初始数据
-        initial_data = {
-            "timestamp": int(time.time()),
-            "data": data_generator.generate_events_geojson()
-        }
-        await websocket.send_json(initial_data)
+        snapshot = await get_snapshot()
+        manager.send(websocket, snapshot_message(snapshot, client_type))
         
         # 保持连接
         while True:
             await websocket.receive_text()
             
     except WebSocketDisconnect:
-        manager.disconnect(websocket, "traffic_events")
+        manager.disconnect(websocket, client_type)
 
 @app.websocket("/ws/district_data")
-async def websocket_district_data(websocket: WebSocket):
-    await manager.connect(websocket, "district_data")
+async def websocket_district_data(
+    websocket: WebSocket,
+    zoom: Optional[float] = None,
+    lod: Optional[int] = None,
+    compression: Optional[str] = None,
+):
+    client_type = ws_client_type(channel_key("district_data", resolve_lod(zoom, lod)), compression)
+    await manager.connect(websocket, client_type)
     try:
         # 发送初始数据
-        initial_data = {
-            "timestamp": int(time.time()),
-            "data": data_generator.generate_district_geojson()
-        }
-        await websocket.send_json(initial_data)
+        snapshot = await get_snapshot()
+        manager.send(websocket, snapshot_message(snapshot, client_type))
         
         # 保持连接
         while True:
             await websocket.receive_text()
             
     except WebSocketDisconnect:
-        manager.disconnect(websocket, "district_data")
+        manager.disconnect(websocket, client_type)
 
 @app.websocket("/ws/statistics")
-async def websocket_statistics(websocket: WebSocket):
-    await manager.connect(websocket, "statistics")
+async def websocket_statistics(websocket: WebSocket, compression: Optional[str] = None):
+    client_type = ws_client_type("statistics", compression)
+    await manager.connect(websocket, client_type)
     try:
         # 发送初始数据
-        initial_data = {
-            "timestamp": int(time.time()),
-            "data": data_generator.generate_traffic_statistics()
-        }
-        await websocket.send_json(initial_data)
+        snapshot = await get_snapshot()
+        manager.send(websocket, snapshot_message(snapshot, client_type))
         
         # 保持连接
         while True:
             await websocket.receive_text()
             
     except WebSocketDisconnect:
-        manager.disconnect(websocket, "statistics")
+        manager.disconnect(websocket, client_type)
 
 @app.websocket("/ws/trend_data")
-async def websocket_trend_data(websocket: WebSocket):
-    await manager.connect(websocket, "trend_data")
+async def websocket_trend_data(websocket: WebSocket, compression: Optional[str] = None):
+    client_type = ws_client_type("trend_data", compression)
+    await manager.connect(websocket, client_type)
     try:
         # 发送初始数据
-        initial_data = {
-            "timestamp": int(time.time()),
-            "data": data_generator.generate_traffic_trend_data()
-        }
-        await websocket.send_json(initial_data)
+        snapshot = await get_snapshot()
+        manager.send(websocket, snapshot_message(snapshot, client_type))
         
         # 保持连接
         while True:
             await websocket.receive_text()
             
     except WebSocketDisconnect:
-        manager.disconnect(websocket, "trend_data")
+        manager.disconnect(websocket, client_type)
 
 @app.websocket("/ws/prediction_data")
-async def websocket_prediction_data(websocket: WebSocket):
-    await manager.connect(websocket, "prediction_data")
+async def websocket_prediction_data(websocket: WebSocket, compression: Optional[str] = None):
+    client_type = ws_client_type("prediction_data", compression)
+    await manager.connect(websocket, client_type)
     try:
         # 发送初始数据
-        initial_data = {
-            "timestamp": int(time.time()),
-            "data": data_generator.generate_prediction_data()
-        }
-        await websocket.send_json(initial_data)
+        snapshot = await get_snapshot()
+        manager.send(websocket, snapshot_message(snapshot, client_type))
         
         # 保持连接
         while True:
             await websocket.receive_text()
             
     except WebSocketDisconnect:
-        manager.disconnect(websocket, "prediction_data")
+        manager.disconnect(websocket, client_type)
 
 @app.websocket("/ws/hotspots_data")
-async def websocket_hotspots_data(websocket: WebSocket):
-    await manager.connect(websocket, "hotspots_data")
+async def websocket_hotspots_data(websocket: WebSocket, compression: Optional[str] = None):
+    client_type = ws_client_type("hotspots_data", compression)
+    await manager.connect(websocket, client_type)
     try:
         # 发送初始数据
-        initial_data = {
-            "timestamp": int(time.time()),
-            "data": data_generator.generate_hotspots_data()
-        }
-        await websocket.send_json(initial_data)
+        snapshot = await get_snapshot()
+        manager.send(websocket, snapshot_message(snapshot, client_type))
         
         # 保持连接
         while True:
             await websocket.receive_text()
             
     except WebSocketDisconnect:
-        manager.disconnect(websocket, "hotspots_data")
+        manager.disconnect(websocket, client_type)
 
 @app.websocket("/ws/all_data")
-async def websocket_all_data(websocket: WebSocket):
-    await manager.connect(websocket, "all_data")
+async def websocket_all_data(websocket: WebSocket, compression: Optional[str] = None):
+    client_type = ws_client_type("all_data", compression)
+    await manager.connect(websocket, client_type)
     try:
         # 发送初始数据
-        initial_data = data_generator.update_all_data()
-        await websocket.send_json(initial_data)
+        snapshot = await get_snapshot()
+        manager.send(websocket, snapshot_message(snapshot, client_type))
         
         # 保持连接
         while True:
             await websocket.receive_text()
             
     except WebSocketDisconnect:
-        manager.disconnect(websocket, "all_data")
+        manager.disconnect(websocket, client_type)
 
 # HTTP路由，用于获取初始数据
+async def compressed_response(
+    snapshot: TrafficSnapshot,
+    key: str,
+    content: Union[str, bytes],
+    media_type: str,
+    request: Request,
+) -> Response:
+    """按 Accept-Encoding 返回快照数据，压缩结果在同一 tick 内共享"""
+    headers = {"Vary": "Accept-Encoding"}
+    encoding = choose_encoding(request.headers.get("accept-encoding"))
+    if encoding is None or len(content) < compression_cache.min_size:
+        return Response(content=content, media_type=media_type, headers=headers)
+    headers["Content-Encoding"] = encoding
+    body = await run_in_threadpool(compression_cache.get, snapshot.tick, f"http:{key}", content, encoding)
+    return Response(content=body, media_type=media_type, headers=headers)
+
+async def snapshot_response(channel: str, request: Request) -> Response:
+    """从当前快照返回频道数据"""
+    snapshot = await get_snapshot()
+    return await compressed_response(snapshot, channel, snapshot.payloads[channel], "application/json", request)
+
+def parse_spatial_filter(bbox: Optional[str], within: Optional[str]) -> Optional[BBox]:
+    """校验空间过滤参数，返回解析后的 bbox"""
+    if within is not None and within not in data_generator.district_positions:
+        raise HTTPException(status_code=404, detail=f"区域不存在: {within}")
+    if bbox is None:
+        return None
+    try:
+        return parse_bbox(bbox)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"bbox 参数错误: {e}")
+
+def encode_filtered_road_flow(
+    snapshot: TrafficSnapshot,
+    level: int,
+    bounds: Optional[BBox],
+    within: Optional[str],
+    binary: bool,
+) -> Union[str, bytes]:
+    """编码范围内的道路流量 (只读取快照和静态索引，可在线程池中执行)"""
+    indices = data_generator.query_roads(bounds, within)
+    if binary:
+        return encode_flow_binary(
+            snapshot.tick, snapshot.timestamp,
+            snapshot.road_flow, snapshot.road_speed, snapshot.road_congestion,
+            indices,
+        )
+    return data_generator.encode_flow_geojson(level, snapshot.encoded_properties["road_flow"], indices.tolist())
+
+def encode_filtered_events(snapshot: TrafficSnapshot, bounds: Optional[BBox], within: Optional[str]) -> str:
+    """编码范围内的交通事件"""
+    district = data_generator.get_district_shape(within) if within is not None else None
+    indices = snapshot.event_index.query(bounds, district)
+    return snapshot.encode_events(indices.tolist())
+
+def encode_filtered_districts(
+    snapshot: TrafficSnapshot,
+    level: int,
+    bounds: Optional[BBox],
+    within: Optional[str],
+) -> str:
+    """编码范围内的区域数据"""
+    indices = data_generator.query_districts(bounds, within)
+    return data_generator.encode_district_geojson(
+        level, snapshot.encoded_properties["district_data"], indices.tolist()
+    )
+
+def wants_binary(format: Optional[str], request: Request) -> bool:
+    """format=binary 或 Accept 头包含二进制流量格式时返回 True"""
+    if format is not None:
+        return format == "binary"
+    return FLOW_BINARY_MEDIA_TYPE in request.headers.get("accept", "")
+
 @app.get("/get_road_flow")
-async def get_road_flow():
+async def get_road_flow(
+    request: Request,
+    zoom: Optional[float] = None,
+    lod: Optional[int] = None,
+    bbox: Optional[str] = None,
+    within: Optional[str] = None,
+    format: Optional[str] = None,
+):
+    """
+    bbox=min_lng,min_lat,max_lng,max_lat 或 within=<区域ID> 时只返回范围内的道路
+
+    format=binary (或 Accept: application/x-road-flow) 时返回不含几何的二进制列式数据
+    """
+    level = resolve_lod(zoom, lod)
+    bounds = parse_spatial_filter(bbox, within)
+    binary = wants_binary(format, request)
     try:
-        return data_generator.generate_flow_geojson()
+        if bounds is None and within is None:
+            if binary:
+                snapshot = await get_snapshot()
+                return await compressed_response(
+                    snapshot, "road_flow_binary", snapshot.road_flow_binary, FLOW_BINARY_MEDIA_TYPE, request
+                )
+            return await snapshot_response(channel_key("road_flow", level), request)
+        
+        snapshot = await get_snapshot()
+        content = await run_in_threadpool(encode_filtered_road_flow, snapshot, level, bounds, within, binary)
+        return Response(content=content, media_type=FLOW_BINARY_MEDIA_TYPE if binary else "application/json")
     except Exception as e:
         logging.error(f"获取道路流量数据时出错: {e}")
         raise HTTPException(status_code=500, detail="获取道路流量数据失败")
 
+@app.get("/get_road_ids")
+async def get_road_ids():
+    """按道路下标顺序排列的道路ID，二进制道路流量中的道路下标即此数组中的位置 (服务运行期间不变)"""
+    return Response(content=encode_json(data_generator.road_state.ids), media_type="application/json")
+
 @app.get("/get_traffic_events")
-async def get_traffic_events():
+async def get_traffic_events(request: Request, bbox: Optional[str] = None, within: Optional[str] = None):
+    """bbox=min_lng,min_lat,max_lng,max_lat 或 within=<区域ID> 时只返回范围内的事件"""
+    bounds = parse_spatial_filter(bbox, within)
     try:
-        return data_generator.generate_events_geojson()
+        if bounds is None and within is None:
+            return await snapshot_response("traffic_events", request)
+        
+        snapshot = await get_snapshot()
+        content = await run_in_threadpool(encode_filtered_events, snapshot, bounds, within)
+        return Response(content=content, media_type="application/json")
     except Exception as e:
         logging.error(f"获取交通事件数据时出错: {e}")
         raise HTTPException(status_code=500, detail="获取交通事件数据失败")
 
 @app.get("/get_district_data")
-async def get_district_data():
+async def get_district_data(
+    request: Request,
+    zoom: Optional[float] = None,
+    lod: Optional[int] = None,
+    bbox: Optional[str] = None,
+    within: Optional[str] = None,
+):
+    """bbox=min_lng,min_lat,max_lng,max_lat 或 within=<区域ID> 时只返回范围内的区域"""
+    level = resolve_lod(zoom, lod)
+    bounds = parse_spatial_filter(bbox, within)
     try:
-        return data_generator.generate_district_geojson()
+        if bounds is None and within is None:
+            return await snapshot_response(channel_key("district_data", level), request)
+        
+        snapshot = await get_snapshot()
+        content = await run_in_threadpool(encode_filtered_districts, snapshot, level, bounds, within)
+        return Response(content=content, media_type="application/json")
     except Exception as e:
         logging.error(f"获取区域数据时出错: {e}")
         raise HTTPException(status_code=500, detail="获取区域数据失败")
 
 @app.get("/get_statistics")
-async def get_statistics():
+async def get_statistics(request: Request):
     try:
-        return data_generator.generate_traffic_statistics()
+        return await snapshot_response("statistics", request)
     except Exception as e:
         logging.error(f"获取统计数据时出错: {e}")
         raise HTTPException(status_code=500, detail="获取统计数据失败")
 
+@app.get("/prediction/roads")
+async def get_road_predictions(ids: str):
+    """一条或多条道路 (ids=<道路ID>,<道路ID>...) 未来24小时的预测流量、速度和拥堵等级"""
+    road_ids = [road_id for road_id in ids.split(",") if road_id]
+    if not road_ids or len(road_ids) > HISTORY_MAX_ROADS:
+        raise HTTPException(status_code=400, detail=f"ids 需要包含 1-{HISTORY_MAX_ROADS} 个道路ID")
+    road_index = data_generator.road_state.index
+    unknown = [road_id for road_id in road_ids if road_id not in road_index]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"道路不存在: {','.join(unknown)}")
+    
+    predictions = await run_in_threadpool(
+        data_generator.generate_road_predictions, [road_index[road_id] for road_id in road_ids]
+    )
+    return Response(content=encode_json(predictions), media_type="application/json")
+
 @app.get("/get_trend_data")
-async def get_trend_data():
+async def get_trend_data(request: Request):
     try:
-        return data_generator.generate_traffic_trend_data()
+        return await snapshot_response("trend_data", request)
     except Exception as e:
         logging.error(f"获取趋势数据时出错: {e}")
         raise HTTPException(status_code=500, detail="获取趋势数据失败")
 
 @app.get("/get_prediction_data")
-async def get_prediction_data():
+async def get_prediction_data(request: Request):
     try:
-        return data_generator.generate_prediction_data()
+        return await snapshot_response("prediction_data", request)
     except Exception as e:
         logging.error(f"获取预测数据时出错: {e}")
         raise HTTPException(status_code=500, detail="获取预测数据失败")
 
 @app.get("/get_hotspots_data")
-async def get_hotspots_data():
+async def get_hotspots_data(request: Request):
     try:
-        return data_generator.generate_hotspots_data()
+        return await snapshot_response("hotspots_data", request)
     except Exception as e:
         logging.error(f"获取热点数据时出错: {e}")
         raise HTTPException(status_code=500, detail="获取热点数据失败")
 
 @app.get("/get_all_data")
-async def get_all_data():
+async def get_all_data(request: Request):
     try:
-        return data_generator.update_all_data()
+        return await snapshot_response("all_data", request)
     except Exception as e:
         logging.error(f"获取所有数据时出错: {e}")
         raise HTTPException(status_code=500, detail="获取所有数据失败")
 
+# 道路流量矢量瓦片 (Mapbox Vector Tile)
+@app.get("/tiles/road_flow/{z}/{x}/{y}.mvt")
+async def get_road_flow_tile(z: int, x: int, y: int, request: Request):
+    if not is_valid_tile(z, x, y):
+        raise HTTPException(status_code=404, detail="瓦片不存在")
+    try:
+        snapshot = await get_snapshot()
+        # 以快照序号作为 ETag，同一 tick 内的重复请求可直接使用客户端缓存
+        etag = f'"{snapshot.tick}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=headers)
+        
+        tile = await run_in_threadpool(
+            road_tiles.encode_tile,
+            snapshot.tick, z, x, y,
+            snapshot.road_flow, snapshot.road_speed, snapshot.road_congestion,
+        )
+        return Response(content=tile, media_type="application/vnd.mapbox-vector-tile", headers=headers)
+    except Exception as e:
+        logging.error(f"获取道路流量瓦片时出错: {e}")
+        raise HTTPException(status_code=500, detail="获取道路流量瓦片失败")
+
+# 历史数据查询
+def history_window(start: Optional[int], end: Optional[int], max_points: int) -> Tuple[int, int, int]:
+    """校验历史查询的时间窗口，默认查询最近一小时"""
+    if data_generator.history is None:
+        raise HTTPException(status_code=404, detail="未启用历史记录")
+    end = int(time.time()) if end is None else end
+    start = end - 3600 if start is None else start
+    if start > end:
+        raise HTTPException(status_code=400, detail="start 不能大于 end")
+    return start, end, max(1, min(HISTORY_MAX_POINTS, max_points))
+
+def _rounded(values, decimals: int) -> List:
+    return np.round(values, decimals).tolist()
+
+@app.get("/history/roads")
+async def get_road_history(
+    ids: str,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    max_points: int = 120,
+):
+    """
+    一条或多条道路 (ids=<道路ID>,<道路ID>...) 在 [start, end] 内的流量、速度和拥堵等级，
+    点数超过 max_points 时按时间等分取平均
+    """
+    start, end, max_points = history_window(start, end, max_points)
+    road_ids = [road_id for road_id in ids.split(",") if road_id]
+    if not road_ids or len(road_ids) > HISTORY_MAX_ROADS:
+        raise HTTPException(status_code=400, detail=f"ids 需要包含 1-{HISTORY_MAX_ROADS} 个道路ID")
+    road_index = data_generator.road_state.index
+    unknown = [road_id for road_id in road_ids if road_id not in road_index]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"道路不存在: {','.join(unknown)}")
+    
+    timestamps, (flow, speed, congestion) = await run_in_threadpool(
+        data_generator.history.query_roads, [road_index[road_id] for road_id in road_ids], start, end, max_points
+    )
+    roads = {
+        road_id: {
+            "flow": _rounded(flow[:, i], 1),
+            "speed": _rounded(speed[:, i], 1),
+            "congestion": _rounded(congestion[:, i], 2),
+        }
+        for i, road_id in enumerate(road_ids)
+    }
+    return Response(
+        content=encode_json({"start": start, "end": end, "timestamps": timestamps.tolist(), "roads": roads}),
+        media_type="application/json",
+    )
+
+@app.get("/history/district/{district_id}")
+async def get_district_history(
+    district_id: str,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    max_points: int = 120,
+):
+    """区域在 [start, end] 内的拥堵指数和流量值"""
+    start, end, max_points = history_window(start, end, max_points)
+    position = data_generator.district_positions.get(district_id)
+    if position is None:
+        raise HTTPException(status_code=404, detail=f"区域不存在: {district_id}")
+    
+    timestamps, (congestion_index, flow_value) = await run_in_threadpool(
+        data_generator.history.query_district, position, start, end, max_points
+    )
+    return Response(
+        content=encode_json({
+            "start": start,
+            "end": end,
+            "timestamps": timestamps.tolist(),
+            "congestion_index": _rounded(congestion_index, 2),
+            "flow_value": _rounded(flow_value, 1),
+        }),
+        media_type="application/json",
+    )
+
+@app.get("/history/network")
+async def get_network_history(
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    max_points: int = 120,
+):
+    """全网在 [start, end] 内的总流量、平均速度和各类道路的平均流量"""
+    start, end, max_points = history_window(start, end, max_points)
+    timestamps, (total_flow, avg_speed, class_flow) = await run_in_threadpool(
+        data_generator.history.query_network, start, end, max_points
+    )
+    return Response(
+        content=encode_json({
+            "start": start,
+            "end": end,
+            "timestamps": timestamps.tolist(),
+            "total_flow": _rounded(total_flow, 0),
+            "avg_speed": _rounded(avg_speed, 1),
+            "class_flow": {
+                name: _rounded(class_flow[:, i], 1) for i, name in enumerate(ROAD_CLASS_NAMES)
+            },
+        }),
+        media_type="application/json",
+    )
+
+# 道路速度历史分析 (基于 road_speed.csv 的数据立方)
+speed_store: Optional["RoadSpeedStore"] = None
+speed_store_lock = asyncio.Lock()
+
+async def get_speed_store() -> "RoadSpeedStore":
+    """返回道路速度数据立方，首次调用时在线程池中打开 (必要时由CSV生成)"""
+    global speed_store
+    async with speed_store_lock:
+        if speed_store is None:
+            from services.road.speed_store import RoadSpeedStore
+
+            speed_store = await run_in_threadpool(
+                RoadSpeedStore.open, ROAD_SPEED_STORE_DIR, ROAD_SPEED_CSV, ROAD_INFO_CSV
+            )
+    return speed_store
+
+@app.get("/analytics/sections/{roadsect_id}")
+async def get_section_analytics(roadsect_id: int, hour: Optional[int] = None, period: Optional[int] = None):
+    """路段按 小时×PERIOD 统计的平均速度、平均行程时间及其分位数，可按 hour、period 过滤"""
+    store = await get_speed_store()
+    cells = store.section(roadsect_id, hour, period)
+    if cells is None:
+        raise HTTPException(status_code=404, detail=f"路段不存在: {roadsect_id}")
+    return Response(
+        content=encode_json({"roadsect_id": roadsect_id, "cells": cells}),
+        media_type="application/json",
+    )
+
+@app.get("/analytics/districts")
+async def get_analytics_districts():
+    """有速度数据的区域 (SECT10_NAME) 列表"""
+    store = await get_speed_store()
+    return {"districts": store.district_names}
+
+@app.get("/analytics/districts/{name}")
+async def get_district_analytics(name: str, hour: Optional[int] = None, period: Optional[int] = None):
+    """区域 (SECT10_NAME) 按 小时×PERIOD 统计的平均速度、平均行程时间及其分位数"""
+    store = await get_speed_store()
+    cells = store.district(name, hour, period)
+    if cells is None:
+        raise HTTPException(status_code=404, detail=f"区域不存在: {name}")
+    return Response(
+        content=encode_json({"district": name, "cells": cells}),
+        media_type="application/json",
+    )
+
+# 运行指标
+@app.get("/admin/metrics")
+async def get_metrics():
+    return {**metrics.snapshot(), "user_cache": user_cache.stats()}
+
 # 健康检查
 @app.get("/health")
 async def health_check():
-    return {"status": "ok", "timestamp": int(time.time()), "is_updating": is_updating, "update_interval": update_interval}
+    shared_role = "off" if shared_state is None else ("producer" if shared_state.is_producer else "reader")
+    return {
+        "status": "stale" if shared_state_stale() else "ok",
+        "timestamp": int(time.time()),
+        "is_updating": is_updating,
+        "update_interval": update_interval,
+        "shared_state": shared_role,
+    }
 
 # 在应用启动时自动开始数据更新任务
 @app.on_event("startup")
 async def startup_event():
     """应用启动时的初始化工作"""
-    global is_updating
+    global is_updating, lag_monitor_task, forecast_task
+    
+    # SQLite 模式下创建缺少的表，并预先启动密码哈希进程
+    await init_database()
+    password_pool.start()
+    
+    # 加载路网 (在 tick 线程中执行，完成前不接受请求)
+    with metrics.timer("startup.build_generator"):
+        await run_in_tick_thread(build_data_generator)
+    
+    # 事件循环延迟监控
+    lag_monitor_task = asyncio.create_task(monitor_event_loop_lag(EVENT_LOOP_LAG_INTERVAL))
+    # 预测基线的后台拟合
+    forecast_task = asyncio.create_task(periodic_forecast_refit())
     
     # 自动启动数据更新任务
     if not is_updating:
         is_updating = True
-        asyncio.create_task(periodic_data_update())
+        start_data_task()
         logging.info(f"应用启动时自动开始数据更新任务，间隔：{update_interval}秒")
 
 @app.on_event("shutdown") 
@@ -548,4 +1222,10 @@ async def shutdown_event():
     
     # 停止数据更新任务
     is_updating = False
+    if lag_monitor_task is not None:
+        lag_monitor_task.cancel()
+    if forecast_task is not None:
+        forecast_task.cancel()
+    password_pool.shutdown()
+    await close_database()
     logging.info("应用关闭，停止数据更新任务")
\ No newline at end of file
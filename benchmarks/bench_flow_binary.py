@@ -0,0 +1,75 @@
+"""
+道路流量编码基准测试：GeoJSON vs 二进制列式格式
+
+对比每个 tick 推送的道路流量数据的大小、编码耗时和客户端解码耗时。
+
+用法: python -m benchmarks.bench_flow_binary [--roads 1000 20000 100000] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.bench_geojson_encoder import DISTRICT_FILE, _write_road_network
+from services.data.TrafficDataGenerate import TrafficDataGenerator
+from services.data.flow_binary import decode_flow_binary, encode_flow_binary
+
+
+def _best(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--roads", type=int, nargs="+", default=[1_000, 20_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(
+        f"{'roads':>8} {'format':>8} {'size (KB)':>10} {'bytes/road':>11} "
+        f"{'encode (ms)':>12} {'decode (ms)':>12}"
+    )
+    for n in args.roads:
+        with tempfile.TemporaryDirectory() as tmp:
+            road_file = os.path.join(tmp, "roads.geojson")
+            _write_road_network(road_file, n)
+            generator = TrafficDataGenerator(road_file, DISTRICT_FILE, seed=0)
+        state = generator.road_state
+
+        def encode_json():
+            return generator.encode_flow_geojson(0, generator.encode_flow_properties())
+
+        def encode_binary():
+            return encode_flow_binary(1, 0, state.flow, state.speed, state.congestion)
+
+        text = encode_json().encode()
+        data = encode_binary()
+
+        # 二进制帧与 GeoJSON 中的属性一致 (速度以 float32 传输)
+        frame = decode_flow_binary(data)
+        features = json.loads(text)["features"]
+        assert [f["properties"]["FLOW"] for f in features] == frame.flow.tolist()
+        assert [f["properties"]["CONGESTION"] for f in features] == frame.congestion.tolist()
+        assert np.allclose([f["properties"]["SPEED"] for f in features], frame.speed, atol=1e-4)
+
+        cases = [
+            ("geojson", text, encode_json, lambda: json.loads(text)),
+            ("binary", data, encode_binary, lambda: decode_flow_binary(data)),
+        ]
+        for name, payload, encode, decode in cases:
+            print(
+                f"{len(state):>8} {name:>8} {len(payload) / 1024:>10.1f} {len(payload) / len(state):>11.1f} "
+                f"{_best(encode, args.repeat) * 1000:>12.2f} {_best(decode, args.repeat) * 1000:>12.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
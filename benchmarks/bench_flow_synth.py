@@ -0,0 +1,88 @@
+"""
+FLOW 合成基准测试：每次调用都重新拟合的 sklearn KernelDensity vs 缓存的向量化合成器
+
+把 road_speed.csv 按倍数扩充后，分别统计生成多个 tick 所需的时间，并比较两种方法合成值的
+均值、标准差和分位数 (两者都是带宽0.5的高斯 KDE，分布应一致)。
+
+用法: python -m benchmarks.bench_flow_synth [--scales 1 10 100] [--ticks 100]
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import KernelDensity
+
+from services.road import simulatieFlow
+
+ROAD_SPEED_FILE = "public/road_speed.csv"
+
+
+def _legacy_simulate_flow(data: pd.DataFrame, random_state=None) -> pd.DataFrame:
+    data = data.dropna(subset=["FLOW"])
+    kde = KernelDensity(kernel="gaussian", bandwidth=0.5)
+    kde.fit(data[["FLOW"]].values)
+    new_dataset = data.copy()
+    new_dataset["FLOW"] = kde.sample(n_samples=len(data), random_state=random_state).flatten()
+    return new_dataset
+
+
+def _load(scale: int) -> pd.DataFrame:
+    road_speed = pd.read_csv(ROAD_SPEED_FILE, index_col=0)
+    road_speed["FLOW"] = road_speed["GOLEN"] / road_speed["GOTIME"]
+    data = pd.concat([road_speed] * scale, ignore_index=True)
+    data["ROADSECT_ID"] += np.repeat(np.arange(scale) * 10_000_000, len(road_speed))
+    return data
+
+
+def _summary(values: np.ndarray) -> str:
+    p5, p50, p95 = np.percentile(values, [5, 50, 95])
+    return f"mean={values.mean():.3f} std={values.std():.3f} p5={p5:.3f} p50={p50:.3f} p95={p95:.3f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--ticks", type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'ticks':>6} {'method':>22} {'total (ms)':>11} {'per tick (ms)':>14}")
+    for scale in args.scales:
+        data = _load(scale)
+        timings = {}
+
+        start = time.perf_counter()
+        legacy = np.stack([_legacy_simulate_flow(data, tick)["FLOW"].to_numpy() for tick in range(args.ticks)])
+        timings["sklearn fit+sample"] = time.perf_counter() - start
+
+        simulatieFlow._synthesizers.clear()
+        start = time.perf_counter()
+        cached = np.stack([simulatieFlow.simulate_flow(data, tick)["FLOW"].to_numpy() for tick in range(args.ticks)])
+        timings["simulate_flow (cached)"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batch = simulatieFlow.FlowSynthesizer(data).sample(args.ticks, random_state=0)
+        timings["fit + batch sample"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        by_road = simulatieFlow.FlowSynthesizer(data, by="ROADSECT_ID").sample(args.ticks, random_state=0)
+        timings["per-road batch sample"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in simulatieFlow.get_synthesizer(data).frames(args.ticks, random_state=0):
+            pass
+        timings["streaming frames"] = time.perf_counter() - start
+
+        for method, elapsed in timings.items():
+            print(
+                f"{len(data):>8} {args.ticks:>6} {method:>22} {elapsed * 1000:>11.1f} "
+                f"{elapsed * 1000 / args.ticks:>14.2f}"
+            )
+        print(f"  sklearn:  {_summary(legacy)}")
+        print(f"  cached:   {_summary(cached)}")
+        print(f"  batch:    {_summary(batch)}")
+        print(f"  per-road: {_summary(by_road)}")
+
+
+if __name__ == "__main__":
+    main()
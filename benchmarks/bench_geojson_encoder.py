@@ -0,0 +1,84 @@
+"""
+GeoJSON 编码基准测试：每次构建字典再 json.dumps vs 预序列化几何片段
+
+用法: python -m benchmarks.bench_geojson_encoder [--roads 20000] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from services.data.TrafficDataGenerate import TrafficDataGenerator
+from services.data.geojson_encoder import dumps
+
+DISTRICT_FILE = "public/distriction/440300.json"
+
+
+def _write_road_network(path: str, n: int):
+    """写入 n 条随机折线组成的合成道路网络"""
+    features = []
+    for i in range(n):
+        lng, lat = 113.8 + random.random() * 0.5, 22.5 + random.random() * 0.3
+        coordinates = [[lng, lat]]
+        for _ in range(random.randint(2, 12)):
+            lng += random.uniform(-0.002, 0.002)
+            lat += random.uniform(-0.002, 0.002)
+            coordinates.append([round(lng, 7), round(lat, 7)])
+        features.append(
+            {
+                "type": "Feature",
+                "properties": {"id": str(i), "name": "深南大道", "level": random.randint(1, 5)},
+                "geometry": {"type": "LineString", "coordinates": coordinates},
+            }
+        )
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"type": "FeatureCollection", "features": features}, f, ensure_ascii=False)
+
+
+def _measure(fn, repeat: int):
+    """返回最佳耗时(秒)和单次调用的峰值内存分配(MB)"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--roads", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        road_file = os.path.join(tmp, "roads.geojson")
+        _write_road_network(road_file, args.roads)
+        generator = TrafficDataGenerator(road_file, DISTRICT_FILE, seed=0)
+
+    cases = [
+        ("road_flow", lambda: dumps(generator.generate_flow_geojson()), generator.encode_flow_geojson),
+        ("district", lambda: dumps(generator.generate_district_geojson()), generator.encode_district_geojson),
+    ]
+
+    print(f"{'channel':>10} {'size (KB)':>10} {'before (ms)':>12} {'after (ms)':>11} {'before (MB)':>12} {'after (MB)':>11}")
+    for name, before, after in cases:
+        expected = before()
+        assert after() == expected, f"{name} 编码结果不一致"
+        before_time, before_mem = _measure(before, args.repeat)
+        after_time, after_mem = _measure(after, args.repeat)
+        print(
+            f"{name:>10} {len(expected.encode()) / 1024:>10.0f} {before_time * 1000:>12.2f} "
+            f"{after_time * 1000:>11.2f} {before_mem:>12.2f} {after_mem:>11.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+geoservice 路网流量 ETL 基准测试：逐行构建映射的原实现 vs 向量化分阶段实现
+
+把 road_info.csv 和 road_speed.csv 按倍数扩充 (复制并平移 ROADSECT_ID、给名称加后缀)，
+生成名称取自扩充后 road_info 的合成路网边，分别统计各阶段的耗时和峰值内存，并校验两种实现的结果一致。
+
+用法: python -m benchmarks.bench_geoservice_etl [--scales 1 10 100] [--edges 10000] [--chunk-size 50000]
+"""
+import argparse
+import time
+import tracemalloc
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+from services.road import geoservice
+
+ROAD_INFO_FILE = "public/road_info.csv"
+ROAD_SPEED_FILE = "public/road_speed.csv"
+
+
+def _legacy_add_roadsect_id(road_info, road_network):
+    road_to_sect_id = {}
+    for _, row in road_info.iterrows():
+        road_to_sect_id[row["ROADSECT_FROM"]] = row["ROADSECT_ID"]
+        road_to_sect_id[row["ROADSECT_TO"]] = row["ROADSECT_ID"]
+    road_network["ROADSECT_ID"] = road_network["name"].map(road_to_sect_id)
+    road_network = road_network.dropna(subset=["ROADSECT_ID"])
+    road_network["ROADSECT_ID"] = road_network["ROADSECT_ID"].astype(int)
+    return road_network
+
+
+def _legacy_add_flow(road_speed, road_network):
+    road_speed["FLOW"] = road_speed["GOLEN"] / road_speed["GOTIME"]
+    return pd.merge(road_network, road_speed[["ROADSECT_ID", "FLOW"]], on="ROADSECT_ID", how="left")
+
+
+def _legacy_stages(edges, road_info, road_speed):
+    road_speed = road_speed.copy()
+    return [
+        ("extract", lambda network: edges[edges["name"].isin(road_info["ROADSECT_NAME"])][geoservice.NETWORK_COLUMNS]),
+        ("roadsect_id", lambda network: _legacy_add_roadsect_id(road_info, network)),
+        ("flow", lambda network: _legacy_add_flow(road_speed, network)),
+    ]
+
+
+def _vectorized_stages(edges, road_info, road_speed):
+    road_names = pd.unique(road_info["ROADSECT_NAME"])
+    return [
+        ("extract", lambda network: geoservice.select_roads(edges, road_names)),
+        ("roadsect_id", lambda network: geoservice.attach_roadsect_id(network, geoservice.build_roadsect_mapping(road_info))),
+        ("flow", lambda network: geoservice.attach_flow(network, geoservice.build_flow_table(road_speed))),
+    ]
+
+
+def _enlarge(scale: int):
+    """把 road_info 和 road_speed 扩充 scale 倍，第 k 份的 ROADSECT_ID 加 k * 10^7，名称加后缀 #k"""
+    road_info = pd.read_csv(ROAD_INFO_FILE)
+    road_speed = pd.read_csv(ROAD_SPEED_FILE)
+    infos, speeds = [], []
+    for k in range(scale):
+        suffix = f"#{k}" if k else ""
+        info = road_info.copy()
+        info["ROADSECT_ID"] += k * 10_000_000
+        for column in ["ROADSECT_NAME", "ROADSECT_FROM", "ROADSECT_TO"]:
+            info[column] = info[column] + suffix
+        speed = road_speed.copy()
+        speed["ROADSECT_ID"] += k * 10_000_000
+        infos.append(info)
+        speeds.append(speed)
+    return pd.concat(infos, ignore_index=True), pd.concat(speeds, ignore_index=True)
+
+
+def _synthetic_edges(road_info: pd.DataFrame, n: int, rng: np.random.Generator) -> gpd.GeoDataFrame:
+    """名称取自 road_info (含 FROM/TO 名称和少量不匹配的名称) 的合成路网边"""
+    names = pd.unique(
+        np.concatenate([road_info[column].to_numpy() for column in ["ROADSECT_NAME", "ROADSECT_FROM", "ROADSECT_TO"]])
+    )
+    names = np.append(names, ["无名路", "测试路"])
+    start = np.column_stack([113.8 + rng.random(n) * 0.5, 22.5 + rng.random(n) * 0.3])
+    coordinates = np.stack([start, start + rng.uniform(-0.002, 0.002, size=(n, 2))], axis=1)
+    return gpd.GeoDataFrame(
+        {
+            "osmid": np.arange(n),
+            "name": rng.choice(names, n),
+            "length": rng.random(n) * 500,
+            "lanes": rng.integers(1, 5, n).astype(str),
+            "highway": "primary",
+            "oneway": False,
+            "geometry": shapely.linestrings(coordinates),
+        },
+        crs="EPSG:4326",
+    )
+
+
+def _run(stages):
+    """依次运行各阶段，返回结果和每个阶段的 (耗时秒, 峰值内存MB)"""
+    results, network = [], None
+    for name, stage in stages:
+        tracemalloc.start()
+        start = time.perf_counter()
+        network = stage(network)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results.append((name, elapsed, peak / 2**20))
+    return network, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--edges", type=int, default=10_000, help="倍数为1时的路网边数")
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    print(f"{'scale':>6} {'edges':>9} {'impl':>11} {'stage':>12} {'time (ms)':>10} {'peak (MB)':>10}")
+    for scale in args.scales:
+        road_info, road_speed = _enlarge(scale)
+        edges = _synthetic_edges(road_info, args.edges * scale, rng)
+        speed_before = road_speed.copy()
+
+        legacy, legacy_stats = _run(_legacy_stages(edges, road_info, road_speed))
+        vectorized, vectorized_stats = _run(_vectorized_stages(edges, road_info, road_speed))
+
+        # 分块运行整个流程
+        tracemalloc.start()
+        start = time.perf_counter()
+        chunked = geoservice.build_road_flow(edges, road_info, road_speed, chunk_size=args.chunk_size)
+        chunked_stats = [("all", time.perf_counter() - start, tracemalloc.get_traced_memory()[1] / 2**20)]
+        tracemalloc.stop()
+
+        pd.testing.assert_frame_equal(legacy.reset_index(drop=True), vectorized.reset_index(drop=True))
+        pd.testing.assert_frame_equal(vectorized, chunked)
+        pd.testing.assert_frame_equal(road_speed, speed_before)
+
+        for impl, stats in [("legacy", legacy_stats), ("vectorized", vectorized_stats), ("chunked", chunked_stats)]:
+            for stage, elapsed, peak in stats:
+                print(f"{scale:>6} {len(edges):>9} {impl:>11} {stage:>12} {elapsed * 1000:>10.1f} {peak:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
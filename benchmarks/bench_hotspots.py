@@ -0,0 +1,68 @@
+"""
+拥堵热点检测基准测试
+
+对比每个 tick 的增量更新 (只更新拥堵等级变化的道路) 与每次从头重新聚类的耗时。
+
+用法: python -m benchmarks.bench_hotspots [--roads 10000 100000 200000] [--ticks 20]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.bench_geojson_encoder import DISTRICT_FILE, _write_road_network
+from services.data.TrafficDataGenerate import TrafficDataGenerator
+from services.data.hotspots import HotspotDetector
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--roads", type=int, nargs="+", default=[10_000, 100_000, 200_000])
+    parser.add_argument("--ticks", type=int, default=20)
+    args = parser.parse_args()
+
+    print(
+        f"{'roads':>8} {'changed/tick':>13} {'hotspots':>9} {'incremental (ms)':>17} "
+        f"{'rebuild (ms)':>13} {'output (ms)':>12}"
+    )
+    for n in args.roads:
+        with tempfile.TemporaryDirectory() as tmp:
+            road_file = os.path.join(tmp, "roads.geojson")
+            _write_road_network(road_file, n)
+            generator = TrafficDataGenerator(road_file, DISTRICT_FILE, seed=0)
+        detector = generator.hotspot_detector
+        state = generator.road_state
+
+        incremental, rebuild, output, changed = [], [], [], []
+        for _ in range(args.ticks):
+            previous = state.congestion.copy()
+            state.update(1.0)
+            changed.append(int((state.congestion != previous).sum()))
+
+            start = time.perf_counter()
+            generator.update_hotspots()
+            incremental.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            fresh = HotspotDetector(
+                detector.cell_center[detector.road_cell], detector.road_indices, cell_size=0.01
+            )
+            fresh.update(state.congestion)
+            rebuild.append(time.perf_counter() - start)
+            assert [h.congested for h in fresh.hotspots] == [h.congested for h in detector.hotspots]
+
+            start = time.perf_counter()
+            generator.generate_hotspots_data()
+            output.append(time.perf_counter() - start)
+
+        print(
+            f"{len(state):>8} {np.mean(changed):>13.0f} {len(detector.hotspots):>9} "
+            f"{np.median(incremental) * 1000:>17.2f} {np.median(rebuild) * 1000:>13.2f} "
+            f"{np.median(output) * 1000:>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+登录密码验证基准测试：请求线程中直接计算 bcrypt vs 独立进程池
+
+模拟登录突发：在与 FastAPI 默认线程池同样大小 (40) 的线程池中同时发起多次密码验证，统计每秒登录数、
+延迟，以及突发期间另一个普通同步任务等待线程的时间。进程池分别使用 1、4 和 CPU 核数个工作进程；
+fail-fast 行把等待上限设为工作进程数的4倍，超出的请求被拒绝 (对应503)。
+
+用法: python -m benchmarks.bench_password_pool [--logins 200] [--rounds 10] [--threads 40]
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from passlib.context import CryptContext
+
+from services.auth.password_pool import PasswordHashPool, PasswordPoolBusy
+
+PASSWORD = "correct horse battery staple"
+
+
+def _burst(verify, hashed: str, logins: int, threads: int):
+    """同时发起 logins 次验证，返回 (耗时秒, 成功的延迟列表, 被拒绝数, 普通任务的等待秒数)"""
+
+    def login():
+        start = time.perf_counter()
+        try:
+            assert verify(PASSWORD, hashed)
+        except PasswordPoolBusy:
+            return None
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        start = time.perf_counter()
+        futures = [executor.submit(login) for _ in range(logins)]
+        # 突发期间到达的另一个同步路由请求
+        probe_start = time.perf_counter()
+        executor.submit(lambda: None).result()
+        probe_wait = time.perf_counter() - probe_start
+        results = [future.result() for future in futures]
+        elapsed = time.perf_counter() - start
+
+    latencies = [latency for latency in results if latency is not None]
+    return elapsed, latencies, len(results) - len(latencies), probe_wait
+
+
+def _report(mode: str, workers, elapsed: float, latencies, rejected: int, probe_wait: float):
+    print(
+        f"{mode:>10} {str(workers):>8} {len(latencies) / elapsed:>9.1f} "
+        f"{np.percentile(latencies, 50) * 1000:>9.1f} {np.percentile(latencies, 95) * 1000:>9.1f} "
+        f"{rejected:>9} {probe_wait * 1000:>12.1f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=10, help="bcrypt 的 rounds (passlib 默认12)")
+    parser.add_argument("--threads", type=int, default=40)
+    args = parser.parse_args()
+
+    hashed = CryptContext(schemes=["bcrypt"], bcrypt__rounds=args.rounds).hash(PASSWORD)
+    context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    cores = os.cpu_count() or 1
+
+    print(f"cpu cores: {cores}, bcrypt rounds: {args.rounds}, logins: {args.logins}, threads: {args.threads}")
+    print(
+        f"{'mode':>10} {'workers':>8} {'logins/s':>9} {'p50 (ms)':>9} {'p95 (ms)':>9} "
+        f"{'rejected':>9} {'probe (ms)':>12}"
+    )
+    _report("inline", "-", *_burst(context.verify, hashed, args.logins, args.threads))
+
+    for workers in sorted({1, 4, cores}):
+        for mode, max_pending in [("pool", args.logins), ("fail-fast", workers * 4)]:
+            pool = PasswordHashPool(workers=workers, max_pending=max_pending)
+            # 预先启动全部工作进程
+            for future in [pool.submit(len, "") for _ in range(workers)]:
+                future.result()
+            _report(mode, workers, *_burst(pool.verify, hashed, args.logins, args.threads))
+            pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
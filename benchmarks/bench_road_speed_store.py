@@ -0,0 +1,93 @@
+"""
+道路速度历史分析基准测试：每次查询重新扫描CSV vs Parquet 数据立方
+
+把 road_speed.csv 复制为多天的数据 (每一份日期不同)，比较存储大小、导入和生成数据立方的耗时，
+以及单个路段统计查询的耗时。
+
+用法: python -m benchmarks.bench_road_speed_store [--days 1 10 100] [--queries 200]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from services.road.speed_store import RoadSpeedStore, build_cubes, ingest_csv, read_speed_csv
+
+SPEED_FILE = "public/road_speed.csv"
+ROAD_INFO_FILE = "public/road_info.csv"
+
+
+def _write_days(path: str, days: int):
+    """把原始数据按天平移复制 days 份写入 path"""
+    source = pd.read_csv(SPEED_FILE, parse_dates=["TIME"])
+    frames = []
+    for day in range(days):
+        frame = source.copy()
+        frame["TIME"] = frame["TIME"] + pd.Timedelta(days=day)
+        frames.append(frame)
+    pd.concat(frames).to_csv(path, index=False)
+
+
+def _scan_section(path: str, roadsect_id: int) -> pd.DataFrame:
+    """不使用数据立方：读取整个CSV并聚合单个路段"""
+    df = read_speed_csv(path)
+    df = df[df["ROADSECT_ID"] == roadsect_id]
+    grouped = df.groupby(["hour", "PERIOD"])
+    return grouped.agg(golen=("GOLEN", "sum"), gotime=("GOTIME", "sum"), p85=("SPEED", lambda s: s.quantile(0.85)))
+
+
+def _dir_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    section_ids = pd.read_csv(SPEED_FILE, usecols=["ROADSECT_ID"])["ROADSECT_ID"].unique()
+    rng = np.random.default_rng(0)
+
+    print(
+        f"{'days':>5} {'rows':>9} {'csv (MB)':>9} {'parquet (MB)':>13} {'ingest (s)':>11} "
+        f"{'cubes (s)':>10} {'scan (ms)':>10} {'cube (us)':>10}"
+    )
+    for days in args.days:
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = os.path.join(tmp, "road_speed.csv")
+            store_dir = os.path.join(tmp, "store")
+            _write_days(csv_path, days)
+
+            start = time.perf_counter()
+            rows = ingest_csv(csv_path, store_dir)
+            ingest_time = time.perf_counter() - start
+            start = time.perf_counter()
+            build_cubes(store_dir, ROAD_INFO_FILE)
+            cube_time = time.perf_counter() - start
+
+            store = RoadSpeedStore(store_dir)
+            queries = rng.choice(section_ids, args.queries).tolist()
+            start = time.perf_counter()
+            for roadsect_id in queries:
+                store.section(roadsect_id)
+            query_time = (time.perf_counter() - start) / len(queries)
+
+            # 扫描CSV很慢，只测少量查询
+            start = time.perf_counter()
+            for roadsect_id in queries[:3]:
+                _scan_section(csv_path, roadsect_id)
+            scan_time = (time.perf_counter() - start) / 3
+
+            print(
+                f"{days:>5} {rows:>9} {os.path.getsize(csv_path) / 2**20:>9.1f} "
+                f"{_dir_size(os.path.join(store_dir, 'records')) / 2**20:>13.1f} {ingest_time:>11.2f} "
+                f"{cube_time:>10.2f} {scan_time * 1000:>10.1f} {query_time * 1e6:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
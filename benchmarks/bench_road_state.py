@@ -0,0 +1,80 @@
+"""
+道路状态更新基准测试：逐条字典循环 vs NumPy 批量更新
+
+用法: python -m benchmarks.bench_road_state [--sizes 10000 100000 1000000] [--repeat 3]
+"""
+import argparse
+import random
+import time
+
+from services.data.road_state import RoadState
+
+
+def _build_features(n: int):
+    """构造 n 条只包含属性的合成道路要素"""
+    return [
+        {"properties": {"id": str(i), "name": "深南大道", "level": random.randint(1, 5)}, "geometry": None}
+        for i in range(n)
+    ]
+
+
+def _legacy_congestion_level(speed: float) -> int:
+    if speed > 60:
+        return 1
+    elif speed > 40:
+        return 2
+    elif speed > 25:
+        return 3
+    else:
+        return 4
+
+
+def _legacy_update(road_flow_data, time_factor: float):
+    """原 TrafficDataGenerator.update_road_flow_data 中的逐条字典循环"""
+    for road_id, road_data in road_flow_data.items():
+        flow_change = random.uniform(-0.15, 0.15)
+        speed_change = random.uniform(-0.1, 0.1)
+        road_level = road_data["level"]
+        base_flow = (6 - road_level) * 400 + random.randint(-200, 200)
+        new_flow = int(base_flow * (1 + flow_change) * time_factor)
+        new_flow = max(200, new_flow)
+        speed_factor = 1.0 - (new_flow / 6000) * 0.4
+        speed_factor = max(0.4, min(1.2, speed_factor))
+        new_speed = road_data["speed"] * (1 + speed_change) * speed_factor
+        new_speed = max(10, min(120, new_speed))
+        road_data["flow"] = new_flow
+        road_data["speed"] = round(new_speed, 1)
+        road_data["congestion_level"] = _legacy_congestion_level(new_speed)
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'roads':>10} {'dict loop (s)':>14} {'numpy (s)':>12} {'speedup':>9}")
+    for n in args.sizes:
+        features = _build_features(n)
+        state = RoadState.from_features(features, [], seed=0)
+        road_flow_data = {
+            road_id: {"level": int(level), "flow": int(flow), "speed": float(speed), "congestion_level": 1}
+            for road_id, level, flow, speed in zip(state.ids, state.level, state.flow, state.speed)
+        }
+
+        legacy = _best_of(lambda: _legacy_update(road_flow_data, 1.3), args.repeat)
+        vectorized = _best_of(lambda: state.update(1.3), args.repeat)
+        print(f"{n:>10} {legacy:>14.4f} {vectorized:>12.4f} {legacy / vectorized:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
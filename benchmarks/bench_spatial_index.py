@@ -0,0 +1,64 @@
+"""
+空间查询基准测试：STRtree 索引 vs 线性扫描
+
+用法: python -m benchmarks.bench_spatial_index [--sizes 10000 100000 1000000] [--queries 200]
+"""
+import argparse
+import time
+
+import numpy as np
+import shapely
+
+from services.data.spatial_index import SpatialIndex
+
+
+def _build_segments(n: int, rng: np.random.Generator) -> np.ndarray:
+    """在深圳范围内生成 n 条 4 个点的随机折线"""
+    start = np.column_stack([rng.uniform(113.75, 114.65, n), rng.uniform(22.45, 22.85, n)])
+    steps = rng.uniform(-0.002, 0.002, size=(n, 3, 2))
+    coordinates = np.concatenate([start[:, None, :], start[:, None, :] + np.cumsum(steps, axis=1)], axis=1)
+    return shapely.linestrings(coordinates)
+
+
+def _random_bboxes(count: int, size: float, rng: np.random.Generator):
+    min_lng = rng.uniform(113.75, 114.65 - size, count)
+    min_lat = rng.uniform(22.45, 22.85 - size, count)
+    return [(x, y, x + size, y + size) for x, y in zip(min_lng, min_lat)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--bbox-size", type=float, default=0.01, help="查询范围的边长 (度)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'segments':>10} {'build (s)':>10} {'index (ms)':>11} {'scan (ms)':>10} {'speedup':>9} {'hits':>6}")
+    for n in args.sizes:
+        geometries = _build_segments(n, rng)
+        bboxes = _random_bboxes(args.queries, args.bbox_size, rng)
+
+        start = time.perf_counter()
+        index = SpatialIndex(geometries)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = [index.query(bbox) for bbox in bboxes]
+        indexed = (time.perf_counter() - start) / len(bboxes)
+
+        # 线性扫描：对每个范围逐一判断所有几何是否相交
+        scan_queries = bboxes[: max(1, min(len(bboxes), 20_000_000 // n))]
+        start = time.perf_counter()
+        expected = [np.flatnonzero(shapely.intersects(geometries, shapely.box(*bbox))) for bbox in scan_queries]
+        scan = (time.perf_counter() - start) / len(scan_queries)
+
+        for got, want in zip(results, expected):
+            assert np.array_equal(got, want), "索引查询结果与线性扫描不一致"
+
+        hits = np.mean([len(result) for result in results])
+        print(f"{n:>10} {build:>10.2f} {indexed * 1000:>11.3f} {scan * 1000:>10.2f} {scan / indexed:>8.0f}x {hits:>6.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,25 @@
 from sqlmodel import Session
 
-from app.crud import getUserByUsername
-from app.crud import verifyPassword
+from app.crud import getCachedUser, getCachedUserAsync
+from app.crud import verifyPassword, verifyPasswordAsync
 
 # 验证用户
 def authenticateUser(db: Session, username: str, password: str):
-    user = getUserByUsername(db, username)
+    user = getCachedUser(db, username)
     if not user:
         return False
     
     if not verifyPassword(password, user.hashedPassword):
         return False
-    return user
\ No newline at end of file
+    return user
+
+
+# 验证用户 (异步引擎)
+async def authenticateUserAsync(db, username: str, password: str):
+    user = await getCachedUserAsync(db, username)
+    if not user:
+        return False
+
+    if not await verifyPasswordAsync(password, user.hashedPassword):
+        return False
+    return user
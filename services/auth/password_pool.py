@@ -0,0 +1,183 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Sequence, Tuple
+
+from services.monitoring.metrics import metrics
+
+# 工作进程中的密码哈希上下文，由 _init_worker 创建
+_worker_context = None
+
+
+def _init_worker(schemes: Sequence[str]):
+    global _worker_context
+    from passlib.context import CryptContext
+
+    _worker_context = CryptContext(schemes=list(schemes), deprecated="auto")
+
+
+def _hash(password: str) -> str:
+    return _worker_context.hash(password)
+
+
+def _verify(password: str, hashed_password: str) -> bool:
+    return _worker_context.verify(password, hashed_password)
+
+
+def _hash_ready() -> bool:
+    return _worker_context is not None
+
+
+class PasswordPoolBusy(Exception):
+    """等待中的哈希任务已达上限"""
+
+
+class PasswordPoolBroken(PasswordPoolBusy):
+    """工作进程在计算中异常退出，进程池已重新创建，请求可以重试"""
+
+
+class PasswordHashPool:
+    """
+    在独立进程池中计算密码哈希 (bcrypt)
+
+    bcrypt 每次计算约数百毫秒的 CPU 时间，放在请求线程中会占满 FastAPI 的线程池并阻塞其他同步路由。
+    哈希任务提交到大小固定的进程池，可以利用全部 CPU 核；已提交但未完成的任务数达到 max_pending
+    时立即抛出 PasswordPoolBusy，而不是继续排队。
+
+    进程池在 start() 或第一次使用时创建 (spawn 方式，工作进程只导入本模块和 passlib)。
+    每个服务进程 (uvicorn worker) 各有一个进程池，workers 和 max_pending 都是单个服务进程的值。
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        schemes: Sequence[str] = ("bcrypt",),
+        processes: int = 1,
+    ):
+        """
+        Args:
+            workers: 工作进程数，默认为 CPU 核数 / processes (至少1个)，各服务进程的哈希进程合计不超过 CPU 核数
+            max_pending: 本进程最多同时等待的任务数 (含正在计算的)，默认为工作进程数的4倍
+            schemes: passlib 的哈希方案
+            processes: 共用 CPU 的服务进程数 (uvicorn --workers)
+        """
+        self.workers = workers or max(1, (os.cpu_count() or 1) // max(1, processes))
+        self.max_pending = max_pending or self.workers * 4
+        self.schemes = tuple(schemes)
+        self.pending = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.schemes,),
+            )
+        return self._executor
+
+    def start(self):
+        """预先启动全部工作进程 (不等待)，避免第一批请求承担进程启动和导入的耗时"""
+        with self._lock:
+            executor = self._get_executor()
+            for _ in range(self.workers):
+                executor.submit(_hash_ready)
+
+    def submit(self, func, *args) -> Future:
+        """
+        提交任务到进程池
+
+        Raises:
+            PasswordPoolBusy: 等待中的任务数已达 max_pending
+        """
+        return self._submit(func, *args)[0]
+
+    def _submit(self, func, *args) -> Tuple[Future, ProcessPoolExecutor]:
+        """提交任务，同时返回执行任务的进程池"""
+        with self._lock:
+            if self.pending >= self.max_pending:
+                metrics.increment("password.rejected")
+                raise PasswordPoolBusy(f"等待中的密码哈希任务已达上限 ({self.max_pending})")
+            self.pending += 1
+            try:
+                executor = self._get_executor()
+                try:
+                    future = executor.submit(func, *args)
+                except BrokenProcessPool:
+                    # 工作进程异常退出后进程池不可再用，重新创建
+                    self._executor = None
+                    executor = self._get_executor()
+                    future = executor.submit(func, *args)
+            except Exception:
+                self.pending -= 1
+                raise
+        future.add_done_callback(self._release)
+        return future, executor
+
+    def _release(self, _future: Future):
+        with self._lock:
+            self.pending -= 1
+
+    def _discard(self, executor: ProcessPoolExecutor) -> PasswordPoolBroken:
+        """任务因工作进程异常退出而失败时丢弃该进程池 (下次提交时重新创建)，返回要抛出的异常"""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+        metrics.increment("password.broken")
+        return PasswordPoolBroken("密码哈希工作进程异常退出，进程池已重新创建")
+
+    def _run(self, func, *args):
+        """
+        执行任务，阻塞直到完成
+
+        Raises:
+            PasswordPoolBusy: 等待中的任务数已达 max_pending
+            PasswordPoolBroken: 工作进程在计算中异常退出
+        """
+        future, executor = self._submit(func, *args)
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            raise self._discard(executor)
+
+    async def _run_async(self, func, *args):
+        """执行任务，等待期间不占用线程 (异常同 _run())"""
+        future, executor = self._submit(func, *args)
+        try:
+            return await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            raise self._discard(executor)
+
+    def hash(self, password: str) -> str:
+        """计算密码哈希，阻塞直到完成"""
+        with metrics.timer("password.hash"):
+            return self._run(_hash, password)
+
+    def verify(self, password: str, hashed_password: str) -> bool:
+        """验证密码，阻塞直到完成"""
+        with metrics.timer("password.verify"):
+            return self._run(_verify, password, hashed_password)
+
+    async def hash_async(self, password: str) -> str:
+        """计算密码哈希，等待期间不占用线程"""
+        with metrics.timer("password.hash"):
+            return await self._run_async(_hash, password)
+
+    async def verify_async(self, password: str, hashed_password: str) -> bool:
+        """验证密码，等待期间不占用线程"""
+        with metrics.timer("password.verify"):
+            return await self._run_async(_verify, password, hashed_password)
+
+    def shutdown(self):
+        """关闭进程池，下次使用时重新创建"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
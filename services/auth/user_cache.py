@@ -0,0 +1,108 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple
+
+from services.monitoring.metrics import metrics
+from services.shared.versions import VersionSlots
+
+
+class CachedUser(NamedTuple):
+    """缓存中的用户记录 (与数据库会话无关的只读副本)"""
+
+    id: Optional[int]
+    username: str
+    hashedPassword: str
+
+    @classmethod
+    def from_model(cls, user) -> "CachedUser":
+        return cls(user.id, user.username, user.hashedPassword)
+
+
+class _Entry(NamedTuple):
+    user: Optional[CachedUser]
+    version: int
+    expires: float
+
+
+class UserCache:
+    """
+    按用户名缓存用户记录的进程内 TTL/LRU 缓存
+
+    不存在的用户也会被缓存 (记录为 None)。修改用户数据后必须调用 invalidate()：除了删除本进程的
+    缓存，还会更新共享的版本号，其他进程读取缓存时发现版本号变化即视为未命中。未提供 versions
+    时只在本进程内失效，其他进程的缓存最多在 ttl 秒后过期。
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 60.0, versions: Optional[VersionSlots] = None):
+        """
+        Args:
+            maxsize: 最多缓存的用户数，超出时淘汰最久未使用的
+            ttl: 缓存有效秒数
+            versions: 多进程共享的版本号
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.versions = versions
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def version(self, username: str) -> int:
+        """用户名当前的共享版本号，需在读取数据库之前获取并传给 put()"""
+        return self.versions.get(username) if self.versions is not None else 0
+
+    def get(self, username: str) -> Tuple[bool, Optional[CachedUser]]:
+        """
+        Returns:
+            (是否命中, 用户记录)，命中时用户记录为 None 表示用户不存在
+        """
+        version = self.version(username)
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is not None and entry.version == version and entry.expires > time.monotonic():
+                self._entries.move_to_end(username)
+                self.hits += 1
+                hit = True
+            else:
+                if entry is not None:
+                    del self._entries[username]
+                self.misses += 1
+                hit = False
+        metrics.increment("user_cache.hit" if hit else "user_cache.miss")
+        return hit, entry.user if hit else None
+
+    def put(self, username: str, user: Optional[CachedUser], version: int):
+        """
+        缓存从数据库读取的用户记录
+
+        Args:
+            username: 用户名
+            user: 用户记录，用户不存在时为 None
+            version: 读取数据库之前由 version() 获取的版本号
+        """
+        with self._lock:
+            self._entries[username] = _Entry(user, version, time.monotonic() + self.ttl)
+            self._entries.move_to_end(username)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, username: str):
+        """使该用户名在所有进程中的缓存失效 (在数据库提交之后调用)"""
+        with self._lock:
+            self._entries.pop(username, None)
+        if self.versions is not None:
+            self.versions.bump(username)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
@@ -2,26 +2,78 @@ import random
 import time
 import datetime
 import json
+import logging
 import math
-from typing import List, Dict, Any
+import os
+from typing import List, Dict, Any, Optional, Sequence
+
+import numpy as np
+import shapely
+
+from services.data.forecast import SeasonalForecaster
+from services.data.geojson_encoder import FeatureCollectionEncoder, encode_geometries
+from services.data.hotspots import HotspotDetector
+from services.data.history import ROAD_CLASS_NAMES, TrafficHistory
+from services.data.lod import LOD_LEVELS, build_lod_geometries
+from services.data.network_cache import load_network_cache, network_cache_key, save_network_cache
+from services.data.spatial_index import BBox, SpatialIndex, shapes_from_geojson
+from services.data.road_state import RoadState, congestion_index
+
+logger = logging.getLogger(__name__)
 
 
 class TrafficDataGenerator:
-    def __init__(self, road_network_file: str, district_file: str):
+    def __init__(
+        self,
+        road_network_file: str,
+        district_file: str,
+        seed: Optional[int] = None,
+        history_dir: Optional[str] = None,
+        history_road_capacity: int = 1440,
+        history_network_capacity: int = 20160,
+        history_writable: bool = True,
+        forecast_decay: float = 0.7,
+        hotspot_cell_size: float = 0.01,
+        max_hotspots: int = 10,
+        cache_dir: Optional[str] = None,
+        simulate: bool = True,
+    ):
         """
         初始化交通数据生成器
 
         Args:
             road_network_file: 道路网络GeoJSON文件路径
             district_file: 行政区域GeoJSON文件路径
+            seed: 道路状态随机数种子，用于复现模拟结果
+            history_dir: 历史数据目录，为空时不记录历史
+            history_road_capacity: 道路历史保存的 tick 数
+            history_network_capacity: 全网汇总历史保存的 tick 数
+            history_writable: 是否写入历史 (同一目录只能有一个写入进程，其余进程只读)
+            forecast_decay: 预测中实时偏差每小时的衰减系数
+            hotspot_cell_size: 热点检测的网格边长 (度)
+            max_hotspots: 最多输出的热点数
+            cache_dir: 静态数据缓存目录，为空时不缓存。去重后的道路数组 (ID、名称、等级、几何)、各细节层级的
+                几何JSON和道路所在区域只由输入文件决定，按文件内容缓存为二进制文件，重启时直接读取，
+                不再解析道路网络GeoJSON
+            simulate: 是否运行模拟。为 False 时 (共享状态的读者) 只构建查询和编码需要的路网数据，
+                不生成交通事件、不构建热点检测，接替模拟前调用 start_simulation()
         """
-        # 加载道路网络数据
-        with open(road_network_file, "r", encoding="utf-8-sig") as f:
-            self.road_network = json.load(f)
-
-        # 加载行政区域数据
-        with open(district_file, "r", encoding="utf-8-sig") as f:
-            self.districts = json.load(f)
+        # 读取道路网络和行政区域文件 (原始字节同时用于计算缓存键)，道路网络有缓存时不解析GeoJSON
+        with open(road_network_file, "rb") as f:
+            road_network_content = f.read()
+        with open(district_file, "rb") as f:
+            district_content = f.read()
+        self.districts = json.loads(district_content.decode("utf-8-sig"))
+
+        cache_path = (
+            os.path.join(
+                cache_dir,
+                f"network-{network_cache_key(road_network_content, district_content, params=repr(LOD_LEVELS))}.npz",
+            )
+            if cache_dir
+            else None
+        )
+        cached = load_network_cache(cache_path, len(LOD_LEVELS)) if cache_path else None
 
         # 初始化交通事件列表
         self.traffic_events = []
@@ -53,72 +105,173 @@ class TrafficDataGenerator:
             "水官高速",
         ]
 
-        # 初始化道路流量数据
-        self.road_flow_data = self._initialize_road_flow()
-
         # 初始化区域交通数据
         self.district_data = self._initialize_district_data()
+        districts = list(self.district_data.values())
+        if cached is not None and len(cached["district_geometries"][0]) != len(districts):
+            cached = None
+
+        # 初始化道路流量数据：缓存中保存了去重后的道路数组 (缺少ID的道路使用的随机ID也一并保存)
+        if cached is not None:
+            roads = cached["roads"]
+            self.road_state = RoadState.from_arrays(
+                roads["ids"], roads["names"], roads["levels"], roads["shapes"], seed=seed
+            )
+        else:
+            road_network = json.loads(road_network_content.decode("utf-8-sig"))
+            self.road_state = RoadState.from_features(road_network["features"], self.road_name_templates, seed=seed)
+            del road_network
+        del road_network_content
+
+        # 道路和区域的几何在初始化后不再变化，按每个细节层级简化并预先序列化
+        if cached is not None:
+            road_geometries, district_geometries = cached["road_geometries"], cached["district_geometries"]
+        else:
+            road_geometries = [
+                encode_geometries(geometries) for geometries in build_lod_geometries(self.road_state.geometries)
+            ]
+            district_geometries = [
+                encode_geometries(geometries)
+                for geometries in build_lod_geometries([district["geometry"] for district in districts])
+            ]
+            # 几何已编码，释放解析得到的GeoJSON几何 (需要时由 shapes 重新生成)
+            self.road_state.release_geometries()
+        # 较粗的细节层级只输出主要道路和部分属性
+        static_columns = {"id": self.road_state.ids, "name": self.road_state.names}
+        dynamic_keys = ["FLOW", "SPEED", "CONGESTION"]
+        self.flow_encoders = []
+        # 每个层级输出的动态属性在 encode_flow_properties() 结果中的位置，以及输出的道路下标 (全部输出时为空)
+        self.flow_lod_columns: List[List[int]] = []
+        self.flow_lod_roads: List[Optional[np.ndarray]] = []
+        for level, geometries in zip(LOD_LEVELS, road_geometries):
+            static_keys = [key for key in static_columns if key in level.road_properties]
+            self.flow_encoders.append(
+                FeatureCollectionEncoder(
+                    static_keys=static_keys,
+                    static_columns=[static_columns[key] for key in static_keys],
+                    dynamic_keys=[key for key in dynamic_keys if key in level.road_properties],
+                    encoded_geometries=geometries,
+                )
+            )
+            self.flow_lod_columns.append([i for i, key in enumerate(dynamic_keys) if key in level.road_properties])
+            visible = self.road_state.level <= level.max_road_level
+            self.flow_lod_roads.append(None if visible.all() else np.flatnonzero(visible))
+        self.district_encoders = [
+            FeatureCollectionEncoder(
+                static_keys=["id", "name"],
+                static_columns=[
+                    [district["id"] for district in districts],
+                    [district["name"] for district in districts],
+                ],
+                dynamic_keys=["congestion_index", "flow_value", "trend", "total_flow"],
+                encoded_geometries=geometries,
+            )
+            for geometries in district_geometries
+        ]
+        # 原始精度的编码器
+        self.flow_encoder = self.flow_encoders[0]
+        self.district_encoder = self.district_encoders[0]
+
+        # 道路和区域的空间索引，下标与编码器中要素的顺序一致
+        self.road_index = SpatialIndex(self.road_state.shapes)
+        self.district_index = SpatialIndex(
+            shapes_from_geojson([district["geometry"] for district in districts])
+        )
+        self.district_positions = {district["id"]: i for i, district in enumerate(districts)}
 
-        # 初始化一些交通事件
-        self._initialize_traffic_events()
+        # 每条道路按几何中心归入所在区域 (只计算一次)，区域指标每个 tick 由道路状态按区域聚合
+        road_district = (
+            cached["road_district"]
+            if cached is not None
+            else self.district_index.locate(shapely.centroid(self.road_index.geometries))
+        )
+        self.located_roads = np.flatnonzero(road_district >= 0)
+        self.road_district = road_district[self.located_roads]
+        self.district_road_counts = np.bincount(self.road_district, minlength=len(districts))
+        if cache_path is not None and cached is None:
+            state = self.road_state
+            try:
+                save_network_cache(
+                    cache_path,
+                    {"ids": state.ids, "names": state.names, "levels": state.level, "shapes": state.shapes},
+                    road_geometries,
+                    district_geometries,
+                    road_district,
+                )
+            except Exception as e:
+                # 缓存只用于加速下次启动，写入失败不影响本次启动
+                logger.warning(f"写入道路网络缓存 {cache_path} 失败: {e}")
+
+        self.update_district_data()
 
-    def _initialize_road_flow(self) -> Dict[str, Dict]:
-        """初始化道路流量数据"""
-        road_flow = {}
-
-        for feature in self.road_network["features"]:
-            road_id = feature["properties"].get("id", str(random.randint(10000, 99999)))
-            name = feature["properties"].get(
-                "name",
-                (
-                    random.choice(self.road_name_templates)
-                    if self.road_name_templates
-                    else "默认道路名称"
-                ),
+        # 每个 tick 的道路和区域状态历史，趋势数据和同比统计由历史计算
+        self.history = (
+            TrafficHistory(
+                history_dir,
+                self.road_state.level,
+                len(districts),
+                road_capacity=history_road_capacity,
+                network_capacity=history_network_capacity,
+                road_ids=self.road_state.ids,
+                district_ids=[district["id"] for district in districts],
+                writable=history_writable,
             )
+            if history_dir
+            else None
+        )
 
-            # 根据道路等级设置基础流量和速度
-            road_level = feature["properties"].get("level", random.randint(1, 5))
-            # 降低基础流量，减少拥堵概率
-            base_flow = (6 - road_level) * 400 + random.randint(-200, 200)
-            # 提高基础速度
-            base_speed = (6 - road_level) * 12 + random.randint(8, 18)
+        # 按道路的季节基线预测，基线由后台任务调用 refit_forecast() 更新，每个 tick 只做批量混合
+        self.forecaster = SeasonalForecaster(len(self.road_state), decay=forecast_decay)
+        self.update_forecast()
 
-            # 计算拥堵等级
-            congestion_level = self._calculate_congestion_level(base_flow, base_speed)
+        # 交通事件和拥堵热点只在运行模拟的进程中构建
+        self.hotspot_cell_size = hotspot_cell_size
+        self.max_hotspots = max_hotspots
+        self.hotspot_detector: Optional[HotspotDetector] = None
+        if simulate:
+            self.start_simulation()
 
-            road_flow[road_id] = {
-                "id": road_id,
-                "name": name,
-                "flow": base_flow,
-                "speed": base_speed,
-                "congestion_level": congestion_level,
-                "geometry": feature["geometry"],
-            }
+    def start_simulation(self):
+        """构建只有模拟需要的状态：初始交通事件和拥堵热点检测 (已构建时不重复构建)"""
+        if self.hotspot_detector is not None:
+            return
+
+        # 初始化一些交通事件 (事件创建时归入所在区域)
+        self._initialize_traffic_events()
+        self.update_district_data()
 
-        return road_flow
+        # 拥堵热点：以道路几何中心做网格聚类，每个 tick 只更新拥堵等级变化的道路
+        road_centroids = shapely.centroid(self.road_index.geometries)
+        located = np.flatnonzero(~shapely.is_missing(road_centroids) & ~shapely.is_empty(road_centroids))
+        self.hotspot_detector = HotspotDetector(
+            shapely.get_coordinates(road_centroids[located]), located, cell_size=self.hotspot_cell_size
+        )
+        # 道路名称编码，用于统计热点中出现最多的道路名称
+        self.road_name_values, self.road_name_codes = np.unique(
+            np.asarray(self.road_state.names, dtype=object), return_inverse=True
+        )
+        self.update_hotspots()
 
     def _initialize_district_data(self) -> Dict[str, Dict]:
         """初始化区域交通数据"""
         district_data = {}
 
         for feature in self.districts["features"]:
+            # 没有 id 时使用行政区划代码，保证区域ID在重启后保持不变
             district_id = feature["properties"].get(
-                "id", str(random.randint(1000, 9999))
+                "id", str(feature["properties"].get("adcode", random.randint(1000, 9999)))
             )
             name = feature["properties"].get("name", "未知区域")
 
-            # 生成随机拥堵指数和流量值
-            congestion_index = round(5.0 + random.random() * 4.0, 1)
-            flow_value = random.randint(60, 95)
-            trend = "up" if random.random() > 0.5 else "down"
-
+            # 拥堵指数、流量值和趋势在道路归类后由 update_district_data() 计算
             district_data[district_id] = {
                 "id": district_id,
                 "name": name,
-                "congestion_index": congestion_index,
-                "flow_value": flow_value,
-                "trend": trend,
+                "congestion_index": None,
+                "flow_value": 50,
+                "total_flow": 0,
+                "trend": "flat",
+                "event_count": 0,
                 "geometry": feature["geometry"],
             }
 
@@ -132,35 +285,26 @@ class TrafficDataGenerator:
         for _ in range(num_events):
             self._generate_random_event()
 
-    def _calculate_congestion_level(self, flow: int, speed: float) -> int:
-        """根据流量和速度计算拥堵等级"""
-        # 修改速度阈值，提高每个等级的速度标准，降低拥堵概率
-        if speed > 60:  # 原先是50
-            return 1  # 畅通
-        elif speed > 40:  # 原先是30
-            return 2  # 轻度拥堵
-        elif speed > 25:  # 原先是15
-            return 3  # 中度拥堵
-        else:
-            return 4  # 严重拥堵
-
     def _generate_random_event(self) -> Dict:
         """生成随机交通事件"""
         event_type = random.choice(self.event_types)
 
-        # 随机选择一个区域和位置
-        district = random.choice(list(self.location_templates.keys()))
-        location_prefix = random.choice(self.location_templates[district])
-
-        # 随机选择一条道路
-        road = random.choice(self.road_name_templates)
-        location = f"{district}{location_prefix}{road}"
-
         # 随机坐标 (深圳市大致范围)
         lng = 113.8 + random.random() * 0.5
         lat = 22.5 + random.random() * 0.3
         coordinates = [lng, lat]
 
+        # 事件归入坐标所在的区域，位置描述使用该区域的名称
+        position = int(self.district_index.locate(shapely.points([coordinates]))[0])
+        district = list(self.district_data.values())[position]["name"] if position >= 0 else ""
+        location_prefix = (
+            random.choice(self.location_templates[district]) if district in self.location_templates else ""
+        )
+
+        # 随机选择一条道路
+        road = random.choice(self.road_name_templates)
+        location = f"{district}{location_prefix}{road}"
+
         # 生成时间 (最近2小时内)
         minutes_ago = random.randint(0, 120)
         event_time = (
@@ -226,6 +370,7 @@ class TrafficDataGenerator:
             "type": event_type,
             "location": location,
             "coordinates": coordinates,
+            "district": position,
             "time": event_time,
             "status": status,
             "severity": severity,
@@ -237,90 +382,63 @@ class TrafficDataGenerator:
 
         return event
 
-    def update_road_flow_data(self):
-        """更新道路流量数据"""
-        # 获取当前小时
-        current_hour = datetime.datetime.now().hour
-
-        # 根据时间段调整流量
-        time_factor = 1.0
+    def _get_time_factor(self, current_hour: int) -> float:
+        """根据时间段获取流量系数"""
         if 7 <= current_hour <= 9:  # 早高峰
-            time_factor = 1.3  # 原先是1.5，降低高峰期流量
+            return 1.3  # 原先是1.5，降低高峰期流量
         elif 17 <= current_hour <= 19:  # 晚高峰
-            time_factor = 1.5  # 原先是1.8，降低高峰期流量
+            return 1.5  # 原先是1.8，降低高峰期流量
         elif 23 <= current_hour or current_hour <= 5:  # 深夜
-            time_factor = 0.3
+            return 0.3
         elif 10 <= current_hour <= 15:  # 工作时间
-            time_factor = 0.7  # 原先是0.8，略微降低
+            return 0.7  # 原先是0.8，略微降低
+        return 1.0
 
-        for road_id, road_data in self.road_flow_data.items():
-            # 添加随机波动
-            flow_change = random.uniform(-0.15, 0.15)
-            speed_change = random.uniform(-0.1, 0.1)
-            
-            # 问题在这里: 当我们每次更新都使用当前值乘以时间因子，会导致流量值累积减小
-            # 解决方案: 使用道路的基础流量作为基准，而不是当前流量
-            
-            # 获取道路等级
-            road_level = 3  # 默认值，如果没有指定等级
-            if "level" in road_data:
-                road_level = road_data["level"]
-            
-            # 重新计算基础流量，或使用初始化时的基准流量
-            base_flow = (6 - road_level) * 400 + random.randint(-200, 200)
-            
-            # 根据时间因子和随机波动调整流量，但基于基准流量
-            new_flow = int(base_flow * (1 + flow_change) * time_factor)
-            
-            # 确保流量不会小于最小值
-            new_flow = max(200, new_flow)  # 设置最小流量为200
-            
-            # 流量与速度成反比，降低流量对速度的影响
-            speed_factor = (
-                1.0 - (new_flow / 6000) * 0.4
-            )  # 原先是5000和0.5，减轻流量对速度的影响
-            speed_factor = max(
-                0.4, min(1.2, speed_factor)
-            )  # 提高最低速度因子，原先是0.3
-
-            new_speed = road_data["speed"] * (1 + speed_change) * speed_factor
-            new_speed = max(10, min(120, new_speed))  # 提高最低速度，原先是5
-
-            # 更新拥堵等级
-            new_congestion_level = self._calculate_congestion_level(new_flow, new_speed)
-
-            # 更新数据
-            self.road_flow_data[road_id]["flow"] = new_flow
-            self.road_flow_data[road_id]["speed"] = round(new_speed, 1)
-            self.road_flow_data[road_id]["congestion_level"] = new_congestion_level
+    def update_road_flow_data(self):
+        """更新道路流量数据"""
+        # 根据当前时间段调整流量，所有道路在一次批量运算中完成更新
+        current_hour = datetime.datetime.now().hour
+        self.road_state.update(self._get_time_factor(current_hour))
 
     def update_district_data(self):
-        """更新区域交通数据"""
-        for district_id, district in self.district_data.items():
-            # 添加随机波动
-            congestion_change = random.uniform(-0.3, 0.3)
-            flow_change = random.randint(-5, 5)
-
-            # 更新拥堵指数
-            new_congestion = district["congestion_index"] + congestion_change
-            new_congestion = max(5.0, min(9.0, new_congestion))  # 限制在5.0-9.0之间
-
-            # 更新流量值
-            new_flow = district["flow_value"] + flow_change
-            new_flow = max(50, min(100, new_flow))  # 限制在50-100之间
+        """
+        按区域聚合道路状态，更新区域交通数据
 
-            # 更新趋势
-            if district["congestion_index"] < new_congestion:
-                trend = "up"
+        拥堵指数为区域内道路拥堵等级 (1-4) 的平均值映射到 5.0-9.0 (见 congestion_index())；
+        流量值为区域道路平均流量相对最繁忙区域的指数 (50-100)，total_flow 为区域内道路流量之和；
+        趋势为拥堵指数相对上一 tick 的变化 (up/down，不变为 flat)。没有道路的区域拥堵指数为5.0、流量值为50
+        """
+        state = self.road_state
+        n_districts = len(self.district_data)
+        flow = np.bincount(self.road_district, weights=state.flow[self.located_roads], minlength=n_districts)
+        level_sum = np.bincount(
+            self.road_district, weights=state.congestion[self.located_roads], minlength=n_districts
+        )
+        counts = self.district_road_counts
+        index = np.where(counts > 0, congestion_index(level_sum / np.maximum(counts, 1)), 5.0)
+        mean_flow = flow / np.maximum(counts, 1)
+        busiest = mean_flow.max() if n_districts else 0
+        flow_value = np.rint(50 + 50 * mean_flow / busiest) if busiest > 0 else np.full(n_districts, 50.0)
+        event_districts = [event["district"] for event in self.traffic_events if event["district"] >= 0]
+        event_counts = np.bincount(np.asarray(event_districts, dtype=np.int64), minlength=n_districts)
+
+        for district, district_index, value, total, events in zip(
+            self.district_data.values(),
+            index.tolist(),
+            flow_value.tolist(),
+            flow.tolist(),
+            event_counts.tolist(),
+        ):
+            new_congestion = round(district_index, 1)
+            previous = district["congestion_index"]
+            if previous is None or new_congestion == previous:
+                district["trend"] = "flat"
             else:
-                trend = "down"
-
-            # 更新数据
-            self.district_data[district_id]["congestion_index"] = round(
-                new_congestion, 1
-            )
-            self.district_data[district_id]["flow_value"] = new_flow
-            self.district_data[district_id]["trend"] = trend
+                district["trend"] = "up" if new_congestion > previous else "down"
+            district["congestion_index"] = new_congestion
+            district["flow_value"] = int(value)
+            district["total_flow"] = int(total)
+            district["event_count"] = events
 
     def update_traffic_events(self):
         """更新交通事件"""
@@ -351,23 +469,69 @@ class TrafficDataGenerator:
     def generate_flow_geojson(self) -> Dict:
         """生成道路流量GeoJSON数据"""
         features = []
-
-        for road_id, road_data in self.road_flow_data.items():
+        state = self.road_state
+
+        for road_id, name, flow, speed, congestion_level, geometry in zip(
+            state.ids,
+            state.names,
+            state.flow.tolist(),
+            state.speed.tolist(),
+            state.congestion.tolist(),
+            state.geometries,
+        ):
             feature = {
                 "type": "Feature",
                 "properties": {
                     "id": road_id,
-                    "name": road_data["name"],
-                    "FLOW": road_data["flow"],
-                    "SPEED": road_data["speed"],
-                    "CONGESTION": road_data["congestion_level"],
+                    "name": name,
+                    "FLOW": flow,
+                    "SPEED": speed,
+                    "CONGESTION": congestion_level,
                 },
-                "geometry": road_data["geometry"],
+                "geometry": geometry,
             }
             features.append(feature)
 
         return {"type": "FeatureCollection", "features": features}
 
+    def encode_flow_properties(self) -> List[List[str]]:
+        """序列化道路流量的动态属性，可在各细节层级的编码之间复用"""
+        state = self.road_state
+        return self.flow_encoder.encode_columns(
+            [state.flow.tolist(), state.speed.tolist(), state.congestion.tolist()]
+        )
+
+    def encode_flow_geojson(
+        self,
+        lod: int = 0,
+        encoded_properties: Optional[List[List[str]]] = None,
+        indices: Optional[Sequence[int]] = None,
+    ) -> str:
+        """
+        生成道路流量GeoJSON的JSON文本，层级0的结果与序列化 generate_flow_geojson() 一致
+
+        较粗的细节层级只输出该层级显示的道路等级和属性 (见 LOD_LEVELS)
+
+        Args:
+            lod: 几何的细节层级
+            encoded_properties: encode_flow_properties() 的结果，不提供时重新序列化
+            indices: 只输出这些下标的道路，默认全部
+        """
+        if encoded_properties is None:
+            encoded_properties = self.encode_flow_properties()
+        visible = self.flow_lod_roads[lod]
+        if visible is not None:
+            if indices is None:
+                indices = visible
+            else:
+                indices = np.asarray(indices, dtype=np.int64)
+                indices = indices[self.road_state.level[indices] <= LOD_LEVELS[lod].max_road_level]
+            indices = indices.tolist()
+        columns = self.flow_lod_columns[lod]
+        if len(columns) < len(encoded_properties):
+            encoded_properties = [encoded_properties[i] for i in columns]
+        return self.flow_encoders[lod].encode(indices=indices, encoded_columns=encoded_properties)
+
     def generate_events_geojson(self) -> Dict:
         """生成交通事件GeoJSON数据"""
         features = []
@@ -403,6 +567,7 @@ class TrafficDataGenerator:
                     "congestion_index": district["congestion_index"],
                     "flow_value": district["flow_value"],
                     "trend": district["trend"],
+                    "total_flow": district["total_flow"],
                 },
                 "geometry": district["geometry"],
             }
@@ -410,29 +575,84 @@ class TrafficDataGenerator:
 
         return {"type": "FeatureCollection", "features": features}
 
+    def encode_district_properties(self) -> List[List[str]]:
+        """序列化区域交通的动态属性，可在各细节层级的编码之间复用"""
+        districts = list(self.district_data.values())
+        return self.district_encoder.encode_columns(
+            [
+                [district["congestion_index"] for district in districts],
+                [district["flow_value"] for district in districts],
+                [district["trend"] for district in districts],
+                [district["total_flow"] for district in districts],
+            ]
+        )
+
+    def encode_district_geojson(
+        self,
+        lod: int = 0,
+        encoded_properties: Optional[List[List[str]]] = None,
+        indices: Optional[Sequence[int]] = None,
+    ) -> str:
+        """
+        生成区域交通GeoJSON的JSON文本，层级0的结果与序列化 generate_district_geojson() 一致
+
+        Args:
+            lod: 几何的细节层级
+            encoded_properties: encode_district_properties() 的结果，不提供时重新序列化
+            indices: 只输出这些下标的区域，默认全部
+        """
+        if encoded_properties is None:
+            encoded_properties = self.encode_district_properties()
+        return self.district_encoders[lod].encode(indices=indices, encoded_columns=encoded_properties)
+
+    def get_district_shape(self, district_id: str):
+        """
+        返回区域边界的 shapely 几何
+
+        Raises:
+            KeyError: 区域不存在
+        """
+        return self.district_index.geometries[self.district_positions[district_id]]
+
+    def query_roads(self, bbox: Optional[BBox] = None, within: Optional[str] = None) -> np.ndarray:
+        """
+        查询与范围相交的道路下标
+
+        Args:
+            bbox: 经纬度范围 (min_lng, min_lat, max_lng, max_lat)
+            within: 区域ID，只返回与该区域相交的道路
+        """
+        district = self.get_district_shape(within) if within is not None else None
+        return self.road_index.query(bbox, district)
+
+    def query_districts(self, bbox: Optional[BBox] = None, within: Optional[str] = None) -> np.ndarray:
+        """
+        查询与范围相交的区域下标
+
+        Args:
+            bbox: 经纬度范围
+            within: 区域ID，只返回该区域
+        """
+        indices = self.district_index.query(bbox)
+        if within is not None:
+            indices = indices[indices == self.district_positions[within]]
+        return indices
+
     def generate_traffic_statistics(self) -> Dict:
         """生成交通统计数据"""
+        state = self.road_state
+
         # 计算总车辆数
-        total_vehicles = sum(road["flow"] for road in self.road_flow_data.values())
+        total_vehicles = int(state.flow.sum())
 
         # 计算平均车速，避免除零风险
-        speeds = [road["speed"] for road in self.road_flow_data.values()]
-        avg_speed = sum(speeds) / len(speeds) if speeds else 0
+        avg_speed = float(state.speed.mean()) if len(state) else 0
 
         # 计算高峰流量
-        peak_hour_flow = max(
-            (road["flow"] for road in self.road_flow_data.values()), default=0
-        )
+        peak_hour_flow = int(state.flow.max()) if len(state) else 0
 
-        # 计算平均拥堵指数，避免除零风险
-        congestion_indices = [
-            district["congestion_index"] for district in self.district_data.values()
-        ]
-        avg_congestion = (
-            sum(congestion_indices) / len(congestion_indices)
-            if congestion_indices
-            else 0
-        )
+        # 全网拥堵指数，与区域拥堵指数的计算方式一致
+        avg_congestion = float(congestion_index(state.congestion.mean())) if len(state) else 0
 
         # 生成区域数据
         district_data = []
@@ -441,15 +661,20 @@ class TrafficDataGenerator:
                 {
                     "name": district["name"],
                     "value": district["flow_value"],
+                    "events": district["event_count"],
                     "fill": self._get_color_for_congestion(
                         district["congestion_index"]
                     ),
                 }
             )
 
-        # 生成与昨日和上周的比较数据
-        comparison_yesterday = round(random.uniform(-8.0, 8.0), 1)
-        comparison_last_week = round(random.uniform(-8.0, 8.0), 1)
+        # 与昨日和上周同一时刻的总流量比较 (%)，没有足够的历史时为0
+        comparison_yesterday = comparison_last_week = None
+        if self.history is not None:
+            comparison_yesterday = self.history.compare_total_flow(86400)
+            comparison_last_week = self.history.compare_total_flow(7 * 86400)
+        comparison_yesterday = round(comparison_yesterday or 0.0, 1)
+        comparison_last_week = round(comparison_last_week or 0.0, 1)
 
         return {
             "totalVehicles": total_vehicles,
@@ -463,126 +688,123 @@ class TrafficDataGenerator:
         }
 
     def generate_traffic_trend_data(self) -> Dict:
-        """生成交通趋势数据"""
-        current_hour = datetime.datetime.now().hour
+        """生成交通趋势数据：最近24小时每小时各类道路的平均流量，没有历史的时段为 null"""
+        now = int(time.time())
+        current_hour = datetime.datetime.fromtimestamp(now).hour
+        hourly = (
+            self.history.hourly_class_flow(now, 24, utc_offset=time.localtime(now).tm_gmtoff)
+            if self.history is not None
+            else [None] * 24
+        )
 
         # 生成24小时数据
         hours_data = []
-        for i in range(24):
+        for i, class_flow in enumerate(hourly):
             hour = (current_hour - 23 + i) % 24
-
-            # 基础流量
-            base_flow = 1000
-
-            # 早高峰 (7-9点)
-            if hour >= 7 and hour <= 9:
-                base_flow = 2500 + random.random() * 500
-            # 晚高峰 (17-19点)
-            elif hour >= 17 and hour <= 19:
-                base_flow = 2800 + random.random() * 500
-            # 中午时段 (12-14点)
-            elif hour >= 12 and hour <= 14:
-                base_flow = 1800 + random.random() * 300
-            # 深夜时段 (0-5点)
-            elif hour >= 0 and hour <= 5:
-                base_flow = 500 + random.random() * 200
-            # 其他时段
-            else:
-                base_flow = 1200 + random.random() * 300
-
-            hours_data.append(
-                {
-                    "hour": f"{hour}:00",
-                    "主干道流量": int(base_flow),
-                    "次干道流量": int(base_flow * 0.6),
-                    "支路流量": int(base_flow * 0.3),
-                }
-            )
+            entry = {"hour": f"{hour}:00"}
+            for j, class_name in enumerate(ROAD_CLASS_NAMES):
+                entry[f"{class_name}流量"] = int(class_flow[j]) if class_flow is not None else None
+            hours_data.append(entry)
 
         return {"trendData": hours_data}
 
     def generate_prediction_data(self) -> Dict:
-        """生成交通预测数据"""
-        current_hour = datetime.datetime.now().hour
-
-        # 生成未来24小时预测数据
-        prediction_data = []
-        for i in range(24):
-            hour = (current_hour + i) % 24
-
-            # 基础流量
-            base_flow = 60
-
-            # 早高峰 (7-9点)
-            if hour >= 7 and hour <= 9:
-                base_flow = 85 + random.random() * 10
-            # 晚高峰 (17-19点)
-            elif hour >= 17 and hour <= 19:
-                base_flow = 90 + random.random() * 10
-            # 中午时段 (12-14点)
-            elif hour >= 12 and hour <= 14:
-                base_flow = 70 + random.random() * 10
-            # 深夜时段 (0-5点)
-            elif hour >= 0 and hour <= 5:
-                base_flow = 30 + random.random() * 10
-            # 其他时段
-            else:
-                base_flow = 50 + random.random() * 15
+        """
+        生成交通预测数据：未来24小时全网的平均预测流量和预测拥堵指数
 
-            # 添加随机波动
-            random_factor = random.random() * 5
+        读取最近一次 update_forecast() 的结果，拥堵指数由道路预测拥堵等级 (1-4) 的平均值计算 (见 congestion_index())
+        """
+        forecast = self.forecaster.latest
+        flow = forecast.flow.mean(axis=1) if self.forecaster.n_roads else np.zeros(len(forecast.slots))
+        congestion = (
+            forecast.congestion.mean(axis=1) if self.forecaster.n_roads else np.zeros(len(forecast.slots))
+        )
 
+        prediction_data = []
+        for slot, slot_flow, slot_congestion in zip(forecast.slots.tolist(), flow.tolist(), congestion.tolist()):
             prediction_data.append(
                 {
-                    "hour": f"{hour}:00",
-                    "预测流量": int(base_flow + random_factor),
-                    "预测拥堵指数": round((base_flow + random_factor) / 20 + 3, 1),
+                    "hour": f"{slot % 24}:00",
+                    "预测流量": int(slot_flow),
+                    "预测拥堵指数": round(float(congestion_index(slot_congestion)), 1),
                 }
             )
 
         return {"predictionData": prediction_data}
 
-    def generate_hotspots_data(self) -> Dict:
-        """生成热点区域数据"""
-        hotspots = []
-
-        # 使用区域数据生成热点
-        for district_id, district in self.district_data.items():
-            # 为每个区域生成1-2个热点
-            num_hotspots = random.randint(1, 2)
-
-            for i in range(num_hotspots):
-                if district["name"] in self.location_templates:
-                    location_prefix = random.choice(
-                        self.location_templates[district["name"]]
-                    )
-                else:
-                    location_prefix = "中心区"
-
-                congestion_level = district["congestion_index"] + random.uniform(
-                    -0.5, 0.5
-                )
-                congestion_level = max(5.0, min(9.0, congestion_level))
+    def generate_road_predictions(self, indices: Sequence[int]) -> Dict:
+        """
+        指定道路未来24小时的预测流量、速度和拥堵等级
 
-                status = "轻度拥堵"
-                if congestion_level >= 8.0:
-                    status = "严重拥堵"
-                elif congestion_level >= 7.0:
-                    status = "中度拥堵"
+        Args:
+            indices: 道路下标
+        """
+        forecast = self.forecaster.latest
+        return {
+            "timestamp": forecast.timestamp,
+            "hours": [f"{slot % 24}:00" for slot in forecast.slots.tolist()],
+            "roads": {
+                self.road_state.ids[i]: {
+                    "flow": np.round(forecast.flow[:, i]).astype(np.int64).tolist(),
+                    "speed": np.round(forecast.speed[:, i].astype(np.float64), 1).tolist(),
+                    "congestion": forecast.congestion[:, i].tolist(),
+                }
+                for i in indices
+            },
+        }
 
-                trend = "up" if random.random() > 0.5 else "down"
+    def generate_hotspots_data(self) -> Dict:
+        """
+        生成热点区域数据：拥堵道路聚集的区域，按拥堵道路数从多到少排列
 
-                hotspot = {
-                    "id": len(hotspots) + 1,
-                    "name": f"{district['name']}{location_prefix}",
-                    "congestionLevel": round(congestion_level, 1),
+        读取最近一次 update_hotspots() 的结果，同一 tick 内多次调用结果一致；start_simulation() 之前没有热点
+        """
+        if self.hotspot_detector is None:
+            return {"hotspots": []}
+        hotspots = self.hotspot_detector.hotspots[: self.max_hotspots]
+        districts = list(self.district_data.values())
+        district_names = [""] * len(hotspots)
+        if hotspots and len(self.district_index):
+            points, positions = self.district_index.tree.query(
+                shapely.points([hotspot.center for hotspot in hotspots]), predicate="intersects"
+            )
+            for point, position in zip(points.tolist(), positions.tolist()):
+                district_names[point] = district_names[point] or districts[position]["name"]
+
+        result = []
+        for i, hotspot in enumerate(hotspots):
+            congestion_level = round(hotspot.congestion_index, 1)
+            status = "轻度拥堵"
+            if congestion_level >= 8.0:
+                status = "严重拥堵"
+            elif congestion_level >= 7.0:
+                status = "中度拥堵"
+
+            road_name = (
+                self.road_name_values[np.bincount(self.road_name_codes[hotspot.roads]).argmax()]
+                if len(hotspot.roads)
+                else ""
+            )
+            if hotspot.congested > hotspot.previous_congested:
+                trend = "up"
+            elif hotspot.congested < hotspot.previous_congested:
+                trend = "down"
+            else:
+                trend = "flat"
+            result.append(
+                {
+                    "id": i + 1,
+                    "name": f"{district_names[i]}{road_name}",
+                    "congestionLevel": congestion_level,
                     "trend": trend,
                     "status": status,
+                    "center": [round(float(hotspot.center[0]), 6), round(float(hotspot.center[1]), 6)],
+                    "congestedRoads": hotspot.congested,
+                    "totalRoads": hotspot.total,
                 }
+            )
 
-                hotspots.append(hotspot)
-
-        return {"hotspots": hotspots}
+        return {"hotspots": result}
 
     def _get_color_for_congestion(self, congestion_index: float) -> str:
         """根据拥堵指数获取颜色"""
@@ -597,10 +819,10 @@ class TrafficDataGenerator:
 
     def debug_flow_stats(self):
         """输出流量统计信息，用于调试"""
-        if not self.road_flow_data:
+        if not len(self.road_state):
             return {"count": 0, "min": 0, "max": 0, "avg": 0}
             
-        flow_values = [road["flow"] for road in self.road_flow_data.values()]
+        flow_values = self.road_state.flow.tolist()
         return {
             "count": len(flow_values),
             "min": min(flow_values),
@@ -609,15 +831,52 @@ class TrafficDataGenerator:
             "samples": random.sample(flow_values, min(5, len(flow_values)))
         }
         
+    def update_data(self):
+        """推进一次模拟，只更新内部状态，不生成数据包"""
+        self.update_road_flow_data()
+        self.update_district_data()
+        self.update_traffic_events()
+        self.record_history()
+        self.update_forecast()
+        self.update_hotspots()
+
+    def record_history(self):
+        """把当前道路和区域状态写入历史 (只读打开历史的进程不写入)"""
+        if self.history is None or not self.history.writable:
+            return
+        state = self.road_state
+        districts = list(self.district_data.values())
+        self.history.record(
+            int(time.time()),
+            state.flow,
+            state.speed,
+            state.congestion,
+            [district["congestion_index"] for district in districts],
+            [district["flow_value"] for district in districts],
+        )
+
+    def update_forecast(self):
+        """以当前道路状态和已拟合的基线生成预测 (不拟合)"""
+        now = int(time.time())
+        self.forecaster.update(
+            now, self.road_state.flow, self.road_state.speed, utc_offset=time.localtime(now).tm_gmtoff
+        )
+
+    def update_hotspots(self):
+        """以当前道路拥堵等级增量更新热点"""
+        self.hotspot_detector.update(self.road_state.congestion)
+
+    def refit_forecast(self) -> int:
+        """把新的道路历史累加到预测基线，返回累加的行数 (耗时较长，应在后台线程中调用)"""
+        return self.forecaster.refit(self.history, utc_offset=time.localtime().tm_gmtoff)
+
     def update_all_data(self) -> Dict:
         """更新所有数据并返回完整数据包"""
         # 输出更新前的流量统计
         pre_update_stats = self.debug_flow_stats()
         
         # 更新各类数据
-        self.update_road_flow_data()
-        self.update_district_data()
-        self.update_traffic_events()
+        self.update_data()
         
         # 输出更新后的流量统计
         post_update_stats = self.debug_flow_stats()
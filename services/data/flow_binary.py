@@ -0,0 +1,111 @@
+"""
+道路流量二进制列式格式
+
+每个 tick 道路流量的可变部分只有流量、速度和拥堵等级三个数值，二进制格式只传输这些列，
+几何通过道路下标引用：下标是道路在道路状态 (RoadState) 中的位置，在服务运行期间保持不变，
+/get_road_ids 按下标顺序返回道路ID，客户端只需获取一次ID和几何。
+
+下标只与不过滤的 LOD 0 FeatureCollection 中要素的位置一致；LOD 大于 0 或带 bbox、within
+参数时 /get_road_flow 只返回部分道路 (LOD 3 的要素只有 id 和 CONGESTION)，要素位置不是道路下标，
+应按要素的 id 与 /get_road_ids 对应。
+
+布局 (小端序)：
+
+    偏移        类型          字段
+    0           char[4]       魔数 b"RFLW"
+    4           uint16        格式版本，当前为 1
+    6           uint16        保留，固定为 0
+    8           int64         时间戳 (秒)
+    16          uint32        快照序号 (tick)
+    20          uint32        道路数 n
+    24          uint32[n]     道路下标
+    24 + 4n     uint32[n]     流量
+    24 + 8n     float32[n]    速度 (km/h)
+    24 + 12n    uint8[n]      拥堵等级 (1-4)
+
+头部为24字节，各数值列的起始偏移都是4的倍数，客户端可以直接用 TypedArray 读取。
+"""
+import struct
+from typing import NamedTuple, Optional, Sequence
+
+import numpy as np
+
+MAGIC = b"RFLW"
+VERSION = 1
+MEDIA_TYPE = "application/x-road-flow"
+
+_HEADER = struct.Struct("<4sHHqII")
+HEADER_SIZE = _HEADER.size
+
+
+class FlowFrame(NamedTuple):
+    """解码后的二进制道路流量帧"""
+
+    tick: int
+    timestamp: int
+    road_index: np.ndarray
+    flow: np.ndarray
+    speed: np.ndarray
+    congestion: np.ndarray
+
+
+def encode_flow_binary(
+    tick: int,
+    timestamp: int,
+    flow: np.ndarray,
+    speed: np.ndarray,
+    congestion: np.ndarray,
+    indices: Optional[Sequence[int]] = None,
+) -> bytes:
+    """
+    把道路状态编码为二进制列式帧
+
+    Args:
+        tick: 快照序号
+        timestamp: 时间戳 (秒)
+        flow, speed, congestion: 按道路下标排列的状态数组
+        indices: 只输出这些下标的道路，为空时输出全部道路
+    """
+    if indices is None:
+        road_index = np.arange(len(flow), dtype="<u4")
+    else:
+        road_index = np.asarray(indices, dtype="<u4")
+        flow, speed, congestion = flow[road_index], speed[road_index], congestion[road_index]
+
+    return b"".join(
+        [
+            _HEADER.pack(MAGIC, VERSION, 0, timestamp, tick, len(road_index)),
+            road_index.tobytes(),
+            np.asarray(flow, dtype="<u4").tobytes(),
+            np.asarray(speed, dtype="<f4").tobytes(),
+            np.asarray(congestion, dtype=np.uint8).tobytes(),
+        ]
+    )
+
+
+def decode_flow_binary(data: bytes) -> FlowFrame:
+    """
+    参考解码器，返回的数组是 data 的只读视图
+
+    Raises:
+        ValueError: 魔数、版本或长度不正确
+    """
+    if len(data) < HEADER_SIZE:
+        raise ValueError("数据长度不足，缺少头部")
+    magic, version, _, timestamp, tick, count = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"魔数不正确: {magic!r}")
+    if version != VERSION:
+        raise ValueError(f"不支持的格式版本: {version}")
+    if len(data) != HEADER_SIZE + 13 * count:
+        raise ValueError(f"数据长度与道路数 {count} 不一致")
+
+    offset = HEADER_SIZE
+    road_index = np.frombuffer(data, dtype="<u4", count=count, offset=offset)
+    offset += 4 * count
+    flow = np.frombuffer(data, dtype="<u4", count=count, offset=offset)
+    offset += 4 * count
+    speed = np.frombuffer(data, dtype="<f4", count=count, offset=offset)
+    offset += 4 * count
+    congestion = np.frombuffer(data, dtype=np.uint8, count=count, offset=offset)
+    return FlowFrame(tick, timestamp, road_index, flow, speed, congestion)
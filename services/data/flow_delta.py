@@ -0,0 +1,112 @@
+import numpy as np
+from typing import Optional, Tuple
+
+from services.data.geojson_encoder import FeatureCollectionEncoder
+from services.data.road_state import RoadState
+from services.websocket.encoding import encode_json
+
+
+class FlowDeltaTracker:
+    """
+    道路流量增量推送
+
+    维护已推送给增量客户端的道路状态基线。客户端先收到一次带序号的完整快照，之后每个 tick
+    只收到相对基线变化超过阈值的道路:
+
+        {"type": "snapshot", "seq": n, "timestamp": t, "data": FeatureCollection}
+        {"type": "delta", "seq": n, "timestamp": t, "changes": {"<道路ID>": [FLOW, SPEED, CONGESTION]}}
+
+    每个 tick 的序号加一 (即使没有变化也会推送空的 changes)。客户端应忽略序号不大于快照序号的增量，
+    发现序号不连续时发送 {"type": "resync"} 请求重新下发快照。
+    """
+
+    def __init__(
+        self,
+        road_state: RoadState,
+        encoder: FeatureCollectionEncoder,
+        flow_threshold: float,
+        speed_threshold: float,
+    ):
+        """
+        Args:
+            road_state: 道路状态，用于初始化基线
+            encoder: 道路流量GeoJSON编码器，用于生成快照
+            flow_threshold: 流量变化阈值
+            speed_threshold: 速度变化阈值 (km/h)
+        """
+        self.road_ids = road_state.ids
+        self.encoder = encoder
+        self.flow_threshold = flow_threshold
+        self.speed_threshold = speed_threshold
+        self.seq = 0
+        # 最近一次生成的快照 (序号, 消息)，同一序号内的快照请求共用
+        self._snapshot_cache: Optional[Tuple[int, str]] = None
+
+        # 已推送的基线状态
+        self.flow = road_state.flow.copy()
+        self.speed = road_state.speed.copy()
+        self.congestion = road_state.congestion.copy()
+
+    def update(self, road_state: RoadState, timestamp: int) -> str:
+        """
+        比较当前道路状态与基线，更新基线并返回本 tick 的增量消息
+
+        Args:
+            road_state: 本 tick 更新后的道路状态
+            timestamp: 消息时间戳
+        """
+        changed = np.flatnonzero(
+            (np.abs(road_state.flow - self.flow) > self.flow_threshold)
+            | (np.abs(road_state.speed - self.speed) > self.speed_threshold)
+            | (road_state.congestion != self.congestion)
+        )
+
+        self.flow[changed] = road_state.flow[changed]
+        self.speed[changed] = road_state.speed[changed]
+        self.congestion[changed] = road_state.congestion[changed]
+        self.seq += 1
+
+        changes = {
+            self.road_ids[i]: [flow, speed, congestion]
+            for i, flow, speed, congestion in zip(
+                changed.tolist(),
+                self.flow[changed].tolist(),
+                self.speed[changed].tolist(),
+                self.congestion[changed].tolist(),
+            )
+        }
+        return encode_json({"type": "delta", "seq": self.seq, "timestamp": timestamp, "changes": changes})
+
+    def encode_snapshot(self, timestamp: int) -> str:
+        """生成与当前基线和序号一致的完整快照消息，同一序号只编码一次"""
+        if self._snapshot_cache is not None and self._snapshot_cache[0] == self.seq:
+            return self._snapshot_cache[1]
+
+        data = self.encoder.encode(
+            [self.flow.tolist(), self.speed.tolist(), self.congestion.tolist()]
+        )
+        message = (
+            '{"type":"snapshot","seq":' + str(self.seq)
+            + ',"timestamp":' + str(timestamp)
+            + ',"data":' + data + "}"
+        )
+        self._snapshot_cache = (self.seq, message)
+        return message
+
+    def get_state(self) -> Tuple[int, np.ndarray, np.ndarray, np.ndarray]:
+        """返回当前序号和基线的副本，用于在进程间同步增量推送状态"""
+        return self.seq, self.flow.copy(), self.speed.copy(), self.congestion.copy()
+
+    def set_state(self, seq: int, flow: np.ndarray, speed: np.ndarray, congestion: np.ndarray):
+        """
+        以其他进程的序号和基线替换当前状态
+
+        Args:
+            seq: 增量序号
+            flow, speed, congestion: 已推送的基线状态
+        """
+        self.seq = seq
+        self.flow = flow
+        self.speed = speed
+        self.congestion = congestion
+        self._snapshot_cache = None
@@ -0,0 +1,185 @@
+import threading
+from typing import NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from services.data.history import TrafficHistory
+from services.data.road_state import calculate_congestion_levels
+
+# 一周的时段数 (星期 × 小时)
+WEEK_SLOTS = 7 * 24
+
+
+def week_slots(timestamps: np.ndarray, utc_offset: int = 0) -> np.ndarray:
+    """时间戳对应的一周内时段下标 星期(周一为0) * 24 + 小时，按本地时间划分"""
+    local = np.asarray(timestamps, dtype=np.int64) + utc_offset
+    # 1970-01-01 为周四
+    weekday = (local // 86400 + 3) % 7
+    return weekday * 24 + local % 86400 // 3600
+
+
+class Forecast(NamedTuple):
+    """
+    一次预测的结果
+
+    slots 为各预测时段的一周内时段下标，flow、speed、congestion 的形状为 (时段数, 道路数)，
+    按道路下标排列。
+    """
+
+    timestamp: int
+    slots: np.ndarray
+    flow: np.ndarray
+    speed: np.ndarray
+    congestion: np.ndarray
+
+
+class SeasonalForecaster:
+    """
+    按道路的季节基线预测
+
+    基线为道路历史 (TrafficHistory.roads) 中每条道路在 星期 × 小时 时段的平均流量和速度，
+    由后台任务调用 refit() 增量累加新的历史行。某个时段没有历史时，依次退回到同一小时
+    (不区分星期) 的平均值、外部提供的小时速度先验 (如 road_speed.csv 的统计)、最新观测值。
+
+    预测时以最新观测相对当前时段基线的比值作为偏差，偏差按 decay**k 向未来第 k 小时衰减：
+        预测[k] = 基线[k] * (1 + (观测 / 基线[0] - 1) * decay**k)
+    所有道路的全部时段在一次批量运算中完成。refit() 和 update() 都在后台线程中执行，
+    读者只读取已发布的 latest，不在请求中计算。
+
+    每个时段只保存 float32 的滑动平均值 (而不是累加和与填充后的完整基线)，预测时只为需要的
+    horizon 个时段查找基线，每条道路约占 (2 × 168 + 3 × 24) × 4 字节。
+    """
+
+    def __init__(self, n_roads: int, horizon: int = 24, decay: float = 0.7):
+        """
+        Args:
+            n_roads: 道路数
+            horizon: 预测的小时数 (含当前时段)
+            decay: 实时偏差每小时的衰减系数
+        """
+        self.n_roads = n_roads
+        self.horizon = horizon
+        self.decay = decay
+        self.fitted_count = 0
+        self.latest: Optional[Forecast] = None
+
+        # 各时段的平均流量和速度，没有历史的时段为 NaN
+        self._flow_mean = np.full((WEEK_SLOTS, n_roads), np.nan, dtype=np.float32)
+        self._speed_mean = np.full((WEEK_SLOTS, n_roads), np.nan, dtype=np.float32)
+        self._counts = np.zeros(WEEK_SLOTS, dtype=np.int64)
+        # 按小时 (不区分星期) 的回退基线，形状为 (24, 道路数)，refit() 时整体替换
+        self._hourly_flow = np.full((24, n_roads), np.nan, dtype=np.float32)
+        self._hourly_speed = np.full((24, n_roads), np.nan, dtype=np.float32)
+        # 小时速度先验，形状为 (24, 道路数)，没有先验为 NaN
+        self._speed_prior = np.full((24, n_roads), np.nan, dtype=np.float32)
+        self._fit_lock = threading.Lock()
+
+    def set_speed_prior(self, hourly_speed: np.ndarray):
+        """
+        设置按小时的速度先验，在下次 refit() 后生效
+
+        Args:
+            hourly_speed: 形状为 (24, 道路数) 的速度，没有先验的道路为 NaN
+        """
+        self._speed_prior = np.asarray(hourly_speed, dtype=np.float32)
+
+    def refit(self, history: Optional[TrafficHistory], utc_offset: int = 0) -> int:
+        """
+        累加上次拟合后新写入的道路历史，重新计算并发布按小时的回退基线
+
+        Args:
+            history: 交通状态历史，为空时只使用先验
+            utc_offset: 本地时间相对 UTC 的秒数
+
+        Returns:
+            本次累加的历史行数
+        """
+        with self._fit_lock:
+            added = 0
+            if history is not None:
+                ring = history.roads
+                rows, timestamps, self.fitted_count = ring.since(self.fitted_count)
+                added = len(rows)
+                slots = week_slots(timestamps, utc_offset)
+                # 新增的行通常只落在一两个时段内，按时段分组更新平均值 (每个时段一次写入，update() 读到的
+                # 时段要么是旧的平均值，要么是新的)
+                for slot in np.unique(slots):
+                    slot_rows = rows[slots == slot]
+                    count = self._counts[slot]
+                    total = count + len(slot_rows)
+                    for mean, column in [(self._flow_mean, "flow"), (self._speed_mean, "speed")]:
+                        batch = ring.columns[column][slot_rows].sum(axis=0, dtype=np.float64)
+                        previous = np.nan_to_num(mean[slot].astype(np.float64)) * count
+                        mean[slot] = (previous + batch) / total
+                    self._counts[slot] = total
+
+            self._hourly_flow = self._hourly(self._flow_mean, None)
+            self._hourly_speed = self._hourly(self._speed_mean, self._speed_prior)
+            return added
+
+    def _hourly(self, means: np.ndarray, prior: Optional[np.ndarray]) -> np.ndarray:
+        """同一小时各星期平均值按行数加权的平均值，没有历史的小时退回到先验"""
+        hourly = np.full((24, self.n_roads), np.nan, dtype=np.float32)
+        counts = self._counts.reshape(7, 24)
+        for hour in np.flatnonzero(counts.sum(axis=0)):
+            weekdays = np.flatnonzero(counts[:, hour])
+            weights = counts[weekdays, hour]
+            hourly[hour] = np.average(means[weekdays * 24 + hour], axis=0, weights=weights)
+        if prior is not None:
+            hourly = np.where(np.isnan(hourly), prior, hourly)
+        return hourly
+
+    def baseline(self, slots: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        指定时段的流量和速度基线，没有历史的时段退回到同一小时的平均值和先验
+
+        Args:
+            slots: 一周内时段下标
+
+        Returns:
+            (流量, 速度)，形状为 (时段数, 道路数)，没有基线为 NaN
+        """
+        hours = slots % 24
+        hourly_flow, hourly_speed = self._hourly_flow, self._hourly_speed
+        flow = self._flow_mean[slots]
+        speed = self._speed_mean[slots]
+        return (
+            np.where(np.isnan(flow), hourly_flow[hours], flow),
+            np.where(np.isnan(speed), hourly_speed[hours], speed),
+        )
+
+    def update(self, timestamp: int, flow: np.ndarray, speed: np.ndarray, utc_offset: int = 0) -> Forecast:
+        """
+        以最新观测和当前基线生成未来 horizon 小时的预测并发布到 latest
+
+        Args:
+            timestamp: 观测时间戳
+            flow, speed: 按道路下标排列的最新观测
+            utc_offset: 本地时间相对 UTC 的秒数
+        """
+        slots = (week_slots(timestamp, utc_offset) + np.arange(self.horizon)) % WEEK_SLOTS
+        weights = self.decay ** np.arange(self.horizon)[:, None]
+        baseline_flow, baseline_speed = self.baseline(slots)
+
+        predicted_flow = self._blend(baseline_flow, flow, weights)
+        predicted_speed = self._blend(baseline_speed, speed, weights)
+        forecast = Forecast(
+            timestamp=timestamp,
+            slots=slots,
+            flow=predicted_flow.astype(np.float32),
+            speed=predicted_speed.astype(np.float32),
+            congestion=calculate_congestion_levels(predicted_speed),
+        )
+        self.latest = forecast
+        return forecast
+
+    @staticmethod
+    def _blend(baseline: np.ndarray, observed: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """按衰减的实时偏差调整基线，没有基线的时段使用观测值"""
+        observed = np.asarray(observed, dtype=np.float64)
+        current = baseline[0]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ratio = np.where(current > 0, observed / current, 1.0)
+        ratio = np.where(np.isnan(ratio), 1.0, ratio)
+        blended = baseline * (1 + (ratio - 1) * weights)
+        return np.where(np.isnan(blended), observed, blended)
@@ -0,0 +1,125 @@
+import json
+from itertools import repeat
+from typing import Any, Iterable, List, Optional, Sequence
+
+
+def dumps(obj: Any) -> str:
+    """按 FastAPI/Starlette 默认的JSON格式序列化 (紧凑分隔符，保留非ASCII字符)"""
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def _encode_value(value: Any) -> str:
+    """序列化单个属性值，数值走快速路径"""
+    value_type = type(value)
+    if value_type is int or value_type is float:
+        return repr(value)
+    return dumps(value)
+
+
+def encode_geometries(geometries: Iterable[Any]) -> List[str]:
+    """序列化每个要素的几何，结果可以缓存后传给 FeatureCollectionEncoder(encoded_geometries=...)"""
+    return [dumps(geometry) for geometry in geometries]
+
+
+def encode_timestamped(timestamp: int, data: str) -> str:
+    """将已序列化的数据包装为 {"timestamp": ..., "data": ...} 消息"""
+    return '{"timestamp":' + str(timestamp) + ',"data":' + data + "}"
+
+
+class FeatureCollectionEncoder:
+    """
+    预序列化几何的 FeatureCollection 编码器
+
+    几何和不变的属性 (如 id、name) 在构建时序列化一次，之后每次编码只序列化变化的属性。
+    输出与 dumps({"type": "FeatureCollection", "features": [...]}) 逐字节一致。
+    """
+
+    def __init__(
+        self,
+        static_keys: Sequence[str],
+        static_columns: Sequence[Sequence[Any]],
+        dynamic_keys: Sequence[str],
+        geometries: Optional[Sequence[Any]] = None,
+        encoded_geometries: Optional[Sequence[str]] = None,
+    ):
+        """
+        Args:
+            static_keys: 不变属性的键，按输出顺序排列
+            static_columns: 与 static_keys 对应的每列属性值
+            dynamic_keys: 每次编码时传入的属性键，排在不变属性之后
+            geometries: 每个要素的几何对象
+            encoded_geometries: 已序列化的几何JSON文本 (如 encode_geometries() 的结果)，提供时忽略 geometries
+        """
+        self.dynamic_keys = list(dynamic_keys)
+        if encoded_geometries is None:
+            encoded_geometries = encode_geometries(geometries)
+
+        # 每个要素的头部: {"type":"Feature","properties":{"id":..,"name":..
+        heads = ['{"type":"Feature","properties":{'] * len(encoded_geometries)
+        for position, (key, column) in enumerate(zip(static_keys, static_columns)):
+            separator = "," if position else ""
+            key_prefix = separator + dumps(key) + ":"
+            heads = [head + key_prefix + _encode_value(value) for head, value in zip(heads, column)]
+        self._heads = heads
+
+        # 动态属性的键前缀，如 ,"FLOW":
+        self._key_prefixes = [
+            ("," if position or static_keys else "") + dumps(key) + ":"
+            for position, key in enumerate(self.dynamic_keys)
+        ]
+
+        # 每个要素的尾部: },"geometry":{...}}
+        self._tails = ['},"geometry":' + geometry + "}" for geometry in encoded_geometries]
+
+    def __len__(self) -> int:
+        return len(self._heads)
+
+    def encode_columns(self, columns: Sequence[Sequence[Any]]) -> List[List[str]]:
+        """
+        序列化全部要素的动态属性列
+
+        结果可以传给 encode(encoded_columns=...)，在几何不同但属性相同的多个编码器之间复用。
+        """
+        return [list(map(_encode_value, column)) for column in columns]
+
+    def encode(
+        self,
+        columns: Optional[Sequence[Sequence[Any]]] = None,
+        indices: Optional[Iterable[int]] = None,
+        encoded_columns: Optional[Sequence[Sequence[str]]] = None,
+    ) -> str:
+        """
+        序列化为完整的 FeatureCollection JSON 文本
+
+        所有片段只在最后拼接一次，避免几何字符串被重复复制。
+
+        Args:
+            columns: 与 dynamic_keys 对应的每列属性值，长度与要素数相同
+            indices: 只序列化这些下标的要素，默认全部
+            encoded_columns: encode_columns() 的结果，提供时忽略 columns
+        """
+        if indices is None:
+            indices = range(len(self._heads))
+            if encoded_columns is None:
+                encoded_columns = self.encode_columns(columns)
+            rows = zip(*encoded_columns) if encoded_columns else repeat(())
+        else:
+            indices = list(indices)
+            if encoded_columns is None:
+                rows = zip(*[[_encode_value(column[i]) for i in indices] for column in columns]) if columns else repeat(())
+            else:
+                rows = (tuple(column[i] for column in encoded_columns) for i in indices)
+
+        heads, tails, key_prefixes = self._heads, self._tails, self._key_prefixes
+        parts = ['{"type":"FeatureCollection","features":[']
+        append = parts.append
+        for n, (i, row) in enumerate(zip(indices, rows)):
+            if n:
+                append(",")
+            append(heads[i])
+            for key_prefix, value in zip(key_prefixes, row):
+                append(key_prefix)
+                append(value)
+            append(tails[i])
+        append("]}")
+        return "".join(parts)
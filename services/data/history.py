@@ -0,0 +1,383 @@
+import fcntl
+import hashlib
+import logging
+import os
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 道路等级对应的道路类别 (趋势图中的 主干道/次干道/支路)，等级 1-2 为主干道，3 为次干道，4-5 为支路
+ROAD_CLASS_NAMES = ["主干道", "次干道", "支路"]
+_LEVEL_TO_CLASS = {1: 0, 2: 0, 3: 1, 4: 2, 5: 2}
+
+logger = logging.getLogger(__name__)
+
+
+def road_classes(levels: np.ndarray) -> np.ndarray:
+    """按道路等级返回每条道路的类别下标"""
+    return np.array([_LEVEL_TO_CLASS.get(int(level), 2) for level in levels], dtype=np.int8)
+
+
+class MemmapRing:
+    """
+    基于 memmap 文件的定长环形时间序列
+
+    每一行对应一个 tick，包含时间戳和若干列 (每列每行可以是一个数组)。写满后覆盖最早的行。
+    数据和写入计数都保存在文件中，进程重启后历史仍然可用，多个进程可以同时读取；
+    只能有一个进程写入 (由使用者保证)，其余进程应以只读方式打开。
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        name: str,
+        capacity: int,
+        columns: Dict[str, Tuple[str, Tuple[int, ...]]],
+        key: str = "",
+        readonly: bool = False,
+    ):
+        """
+        Args:
+            directory: 文件所在目录
+            name: 文件名前缀
+            capacity: 最多保存的行数
+            columns: 列名 -> (dtype, 每行的形状)
+            key: 列内容的标识 (如道路ID顺序的摘要)，与文件中记录的不一致时旧数据视为无效
+            readonly: 只读映射文件，不能调用 append()
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.name = name
+        self.capacity = capacity
+        self.column_specs = columns
+        # 布局签名：容量、列定义或列内容的标识变化后旧文件中的数据视为无效
+        self.signature = zlib.crc32(repr((capacity, sorted(columns.items()), key)).encode())
+        self.open(readonly)
+
+    def open(self, readonly: bool):
+        """
+        (重新) 映射文件
+
+        Args:
+            readonly: 只读映射，用于不写入历史的进程
+        """
+        self.readonly = readonly
+        mode = "r" if readonly else "r+"
+        self._meta = self._open(self._path("meta"), np.int64, (2,), mode)
+        self.timestamps = self._open(self._path("ts"), np.int64, (self.capacity,), mode)
+        self.columns = {
+            column: self._open(self._path(column), dtype, (self.capacity,) + shape, mode)
+            for column, (dtype, shape) in self.column_specs.items()
+        }
+
+    def _path(self, suffix: str) -> str:
+        return os.path.join(self.directory, f"{self.name}.{suffix}")
+
+    @staticmethod
+    def _open(path: str, dtype, shape: Tuple[int, ...], mode: str = "r+") -> np.memmap:
+        """打开 (必要时创建或扩展) memmap 文件，不会清空已有内容"""
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+        finally:
+            os.close(fd)
+        return np.memmap(path, dtype=dtype, mode=mode, shape=shape)
+
+    @property
+    def count(self) -> int:
+        """累计写入的行数，布局签名不一致时为 0"""
+        if self._meta[0] != self.signature:
+            return 0
+        return int(self._meta[1])
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def append(self, timestamp: int, **values):
+        """
+        写入一行，所有列都需要提供
+
+        时间戳早于上一行时 (如系统时间回拨) 按上一行的时间戳写入，保证时间戳单调不减，
+        window() 的二分查找才能得到正确的范围。
+        """
+        if self.readonly:
+            raise RuntimeError(f"历史序列 {self.name} 以只读方式打开")
+        count = self.count
+        if count == 0:
+            self._meta[0] = self.signature
+        else:
+            timestamp = max(timestamp, int(self.timestamps[(count - 1) % self.capacity]))
+        row = count % self.capacity
+        self.timestamps[row] = timestamp
+        for column, value in values.items():
+            self.columns[column][row] = value
+        # 数据写完后再更新计数，读者不会读到写了一半的行
+        self._meta[1] = count + 1
+
+    def _rows(self) -> np.ndarray:
+        """按时间顺序排列的有效行号"""
+        count = self.count
+        size = min(count, self.capacity)
+        return (np.arange(count - size, count) % self.capacity) if size else np.array([], dtype=np.int64)
+
+    def window(self, start: int, end: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        返回时间窗口 [start, end] 内的行号和时间戳 (按时间顺序)
+        """
+        rows = self._rows()
+        timestamps = self.timestamps[rows]
+        lo, hi = np.searchsorted(timestamps, [start, end + 1])
+        return rows[lo:hi], timestamps[lo:hi]
+
+    def since(self, count: int) -> Tuple[np.ndarray, np.ndarray, int]:
+        """
+        返回累计写入计数为 count 之后写入的行号和时间戳 (已被覆盖的行除外)，以及当前的累计计数
+
+        Args:
+            count: 上次读取时的累计计数，大于当前计数 (文件被重建) 时返回全部有效行
+        """
+        current = self.count
+        if count > current:
+            count = 0
+        start = max(count, current - self.capacity)
+        rows = np.arange(start, current) % self.capacity
+        return rows, self.timestamps[rows], current
+
+    def nearest(self, timestamp: int, tolerance: int) -> Optional[int]:
+        """返回时间戳与 timestamp 相差不超过 tolerance 的最近一行的行号"""
+        rows, timestamps = self.window(timestamp - tolerance, timestamp + tolerance)
+        if not len(rows):
+            return None
+        return int(rows[np.argmin(np.abs(timestamps - timestamp))])
+
+    def latest(self) -> Optional[int]:
+        """最新一行的行号"""
+        count = self.count
+        return (count - 1) % self.capacity if count else None
+
+
+def downsample(
+    timestamps: np.ndarray,
+    series: Sequence[np.ndarray],
+    start: int,
+    end: int,
+    max_points: int,
+) -> Tuple[np.ndarray, List[np.ndarray]]:
+    """
+    把时间窗口等分为最多 max_points 段，每段取平均值，空段被省略
+
+    Args:
+        timestamps: 每行的时间戳，长度为 t
+        series: 形状为 (t, ...) 的数组列表
+        start, end: 时间窗口
+        max_points: 最多返回的点数
+
+    Returns:
+        每段的平均时间戳和各序列每段的平均值
+    """
+    if len(timestamps) <= max_points:
+        return timestamps, [np.asarray(values, dtype=np.float64) for values in series]
+
+    span = max(1, end - start + 1)
+    buckets = ((timestamps - start) * max_points // span).clip(0, max_points - 1)
+    counts = np.bincount(buckets, minlength=max_points)
+    present = counts > 0
+
+    def mean(values: np.ndarray) -> np.ndarray:
+        values = np.asarray(values, dtype=np.float64)
+        sums = np.zeros((max_points,) + values.shape[1:])
+        np.add.at(sums, buckets, values)
+        return (sums[present].T / counts[present]).T
+
+    return mean(timestamps).astype(np.int64), [mean(values) for values in series]
+
+
+def ids_digest(ids: Sequence[str]) -> str:
+    """ID 列表 (含顺序) 的摘要"""
+    digest = hashlib.sha1()
+    for value in ids:
+        digest.update(str(value).encode("utf-8") + b"\0")
+    return digest.hexdigest()
+
+
+class TrafficHistory:
+    """
+    交通状态历史
+
+    两个环形序列：
+        roads    每个 tick 每条道路的流量、速度和拥堵等级，容量较小 (默认一天)
+        network  每个 tick 的全网汇总 (总流量、平均速度、各类道路平均流量) 和各区域的拥堵指数、
+                 流量值，数据量小，容量较大 (默认两周)，用于趋势和同比统计
+
+    同一目录只能有一个写入进程：写入方持有目录下 writer.lock 的文件锁，其余进程只读打开。
+    道路和区域的ID顺序记录在布局签名中，路网变化后旧文件中的列不会被误认为属于新的道路。
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        road_levels: np.ndarray,
+        n_districts: int,
+        road_capacity: int = 1440,
+        network_capacity: int = 20160,
+        road_ids: Sequence[str] = (),
+        district_ids: Sequence[str] = (),
+        writable: bool = True,
+    ):
+        """
+        Args:
+            directory: 历史文件目录
+            road_levels: 每条道路的等级，用于按类别汇总流量
+            n_districts: 区域数
+            road_capacity: 道路序列保存的 tick 数
+            network_capacity: 汇总序列保存的 tick 数
+            road_ids: 按道路下标排列的道路ID
+            district_ids: 按区域顺序排列的区域ID
+            writable: 是否写入历史，写入锁已被其他进程持有时退回为只读
+        """
+        n_roads = len(road_levels)
+        self.classes = road_classes(road_levels)
+        self.class_counts = np.maximum(np.bincount(self.classes, minlength=len(ROAD_CLASS_NAMES)), 1)
+
+        os.makedirs(directory, exist_ok=True)
+        self._lock_fd = os.open(os.path.join(directory, "writer.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        self.writable = False
+        if writable and not self._try_lock():
+            logger.warning(f"历史目录 {directory} 已由其他进程写入，本进程只读打开")
+
+        self.roads = MemmapRing(
+            directory,
+            "roads",
+            road_capacity,
+            {
+                "flow": ("uint32", (n_roads,)),
+                "speed": ("float32", (n_roads,)),
+                "congestion": ("uint8", (n_roads,)),
+            },
+            key=ids_digest(road_ids),
+            readonly=not self.writable,
+        )
+        self.network = MemmapRing(
+            directory,
+            "network",
+            network_capacity,
+            {
+                "total_flow": ("float64", ()),
+                "avg_speed": ("float32", ()),
+                "class_flow": ("float32", (len(ROAD_CLASS_NAMES),)),
+                "district_congestion": ("float32", (n_districts,)),
+                "district_flow": ("float32", (n_districts,)),
+            },
+            key=ids_digest(district_ids),
+            readonly=not self.writable,
+        )
+
+    def _try_lock(self) -> bool:
+        try:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        self.writable = True
+        return True
+
+    def try_become_writer(self) -> bool:
+        """尝试成为写入方 (如接替退出的生产者)，成功时以读写方式重新映射文件"""
+        if self.writable:
+            return True
+        if not self._try_lock():
+            return False
+        self.roads.open(readonly=False)
+        self.network.open(readonly=False)
+        return True
+
+    def record(
+        self,
+        timestamp: int,
+        flow: np.ndarray,
+        speed: np.ndarray,
+        congestion: np.ndarray,
+        district_congestion: Sequence[float],
+        district_flow: Sequence[float],
+    ):
+        """
+        记录一个 tick 的状态
+
+        Args:
+            timestamp: 时间戳 (秒)
+            flow, speed, congestion: 按道路下标排列的道路状态
+            district_congestion, district_flow: 按区域顺序排列的拥堵指数和流量值
+        """
+        self.roads.append(timestamp, flow=flow, speed=speed, congestion=congestion)
+        self.network.append(
+            timestamp,
+            total_flow=float(flow.sum()),
+            avg_speed=float(speed.mean()) if len(speed) else 0.0,
+            class_flow=np.bincount(self.classes, weights=flow, minlength=len(ROAD_CLASS_NAMES)) / self.class_counts,
+            district_congestion=district_congestion,
+            district_flow=district_flow,
+        )
+
+    def query_roads(
+        self, indices: Sequence[int], start: int, end: int, max_points: int
+    ) -> Tuple[np.ndarray, List[np.ndarray]]:
+        """
+        查询道路在时间窗口内的历史，返回时间戳和 [流量, 速度, 拥堵等级] 三个形状为 (点数, 道路数) 的数组
+        """
+        rows, timestamps = self.roads.window(start, end)
+        columns = self.roads.columns
+        series = [columns[name][np.ix_(rows, indices)] for name in ("flow", "speed", "congestion")]
+        return downsample(timestamps, series, start, end, max_points)
+
+    def query_district(
+        self, position: int, start: int, end: int, max_points: int
+    ) -> Tuple[np.ndarray, List[np.ndarray]]:
+        """查询区域在时间窗口内的 [拥堵指数, 流量值]"""
+        rows, timestamps = self.network.window(start, end)
+        columns = self.network.columns
+        series = [columns[name][rows, position] for name in ("district_congestion", "district_flow")]
+        return downsample(timestamps, series, start, end, max_points)
+
+    def query_network(self, start: int, end: int, max_points: int) -> Tuple[np.ndarray, List[np.ndarray]]:
+        """查询全网在时间窗口内的 [总流量, 平均速度, 各类道路平均流量]"""
+        rows, timestamps = self.network.window(start, end)
+        columns = self.network.columns
+        series = [columns[name][rows] for name in ("total_flow", "avg_speed", "class_flow")]
+        return downsample(timestamps, series, start, end, max_points)
+
+    def hourly_class_flow(self, now: int, hours: int = 24, utc_offset: int = 0) -> List[Optional[np.ndarray]]:
+        """
+        最近 hours 个整点时段 (含当前时段) 各类道路的平均流量，没有数据的时段为 None
+
+        Args:
+            now: 当前时间戳
+            hours: 时段数
+            utc_offset: 本地时间相对 UTC 的秒数，用于按本地整点划分时段
+        """
+        current_hour_start = (now + utc_offset) // 3600 * 3600 - utc_offset
+        start = current_hour_start - (hours - 1) * 3600
+        rows, timestamps = self.network.window(start, now)
+        slots = (timestamps - start) // 3600
+        counts = np.bincount(slots, minlength=hours)
+        sums = np.zeros((hours, len(ROAD_CLASS_NAMES)))
+        np.add.at(sums, slots, self.network.columns["class_flow"][rows])
+        return [sums[i] / counts[i] if counts[i] else None for i in range(hours)]
+
+    def compare_total_flow(self, seconds_ago: int, tolerance: int = 1800) -> Optional[float]:
+        """
+        最新总流量相对 seconds_ago 秒前总流量的变化百分比，没有可比较的数据时返回 None
+
+        Args:
+            seconds_ago: 比较的时间间隔，如 86400 为昨日同一时刻
+            tolerance: 允许的时间误差 (秒)
+        """
+        latest = self.network.latest()
+        if latest is None:
+            return None
+        total_flow = self.network.columns["total_flow"]
+        past = self.network.nearest(int(self.network.timestamps[latest]) - seconds_ago, tolerance)
+        if past is None or total_flow[past] <= 0:
+            return None
+        return float((total_flow[latest] - total_flow[past]) / total_flow[past] * 100)
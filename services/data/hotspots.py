@@ -0,0 +1,184 @@
+from typing import List, NamedTuple
+
+import numpy as np
+
+from services.data.road_state import congestion_index
+
+# 拥堵等级不低于该值 (3 中度拥堵、4 严重拥堵) 的道路计为拥堵道路
+CONGESTED_LEVEL = 3
+
+
+class Hotspot(NamedTuple):
+    """
+    一个拥堵热点：相邻热点网格的连通区域
+
+    congestion_index 为区域内所有道路拥堵等级 (1-4) 的平均值映射到 5.0-9.0 的拥堵指数 (与区域拥堵指数一致)，roads 为区域内的拥堵道路下标。
+    """
+
+    center: np.ndarray
+    congested: int
+    total: int
+    congestion_index: float
+    previous_congested: int
+    roads: np.ndarray
+
+
+class HotspotDetector:
+    """
+    基于网格的增量拥堵热点检测
+
+    道路按代表点落入经纬度网格，每个网格维护道路数、拥堵道路数和拥堵等级之和。每个 tick 只有
+    拥堵等级变化的道路会更新所在网格的计数；拥堵道路数和比例都达到阈值的网格为热点网格，
+    八邻域相连的热点网格合并为一个热点 (网格上的 DBSCAN)。热点网格集合不变时沿用上次的连通区域，
+    只重新汇总计数。
+    """
+
+    def __init__(
+        self,
+        points: np.ndarray,
+        road_indices: np.ndarray,
+        cell_size: float = 0.01,
+        min_roads: int = 3,
+        min_ratio: float = 0.3,
+    ):
+        """
+        Args:
+            points: 道路代表点的经纬度，形状为 (m, 2)
+            road_indices: 这些代表点对应的道路下标 (没有几何的道路不参与检测)
+            cell_size: 网格边长 (度)
+            min_roads: 热点网格最少的拥堵道路数
+            min_ratio: 热点网格中拥堵道路的最低比例
+        """
+        self.road_indices = np.asarray(road_indices, dtype=np.int64)
+        self.min_roads = min_roads
+        self.min_ratio = min_ratio
+
+        grid = np.floor(np.asarray(points, dtype=np.float64) / cell_size).astype(np.int64)
+        if len(grid):
+            grid -= grid.min(axis=0)
+        self._width = int(grid[:, 1].max()) + 2 if len(grid) else 1
+        cell_keys, self.road_cell = np.unique(grid[:, 0] * self._width + grid[:, 1], return_inverse=True)
+        self.road_cell = self.road_cell.reshape(-1)
+        self._cell_keys = cell_keys
+        n_cells = len(cell_keys)
+
+        self.cell_roads = np.bincount(self.road_cell, minlength=n_cells)
+        # 网格中心为其中道路代表点的平均位置
+        self.cell_center = np.column_stack(
+            [
+                np.bincount(self.road_cell, weights=points[:, i], minlength=n_cells) / np.maximum(self.cell_roads, 1)
+                for i in range(2)
+            ]
+        ) if n_cells else np.zeros((0, 2))
+
+        # 初始状态视为全部畅通 (等级1)
+        self.congestion = np.ones(len(self.road_indices), dtype=np.uint8)
+        self.cell_congested = np.zeros(n_cells, dtype=np.int64)
+        self.cell_level_sum = self.cell_roads.astype(np.int64)
+        self.previous_congested = self.cell_congested.copy()
+        self.hot = np.zeros(n_cells, dtype=bool)
+
+        # 热点网格下标及其连通区域编号
+        self._hot_cells = np.array([], dtype=np.int64)
+        self._labels = np.array([], dtype=np.int64)
+        self.hotspots: List[Hotspot] = []
+
+    def update(self, congestion: np.ndarray) -> List[Hotspot]:
+        """
+        以本 tick 的道路拥堵等级更新热点
+
+        Args:
+            congestion: 按道路下标排列的全部道路拥堵等级
+
+        Returns:
+            按拥堵道路数从多到少排列的热点
+        """
+        self.previous_congested = self.cell_congested.copy()
+        congestion = np.asarray(congestion)[self.road_indices]
+        changed = np.flatnonzero(congestion != self.congestion)
+        if len(changed):
+            old = self.congestion[changed].astype(np.int64)
+            new = congestion[changed].astype(np.int64)
+            cells = self.road_cell[changed]
+            np.add.at(self.cell_congested, cells, (new >= CONGESTED_LEVEL).astype(np.int64) - (old >= CONGESTED_LEVEL))
+            np.add.at(self.cell_level_sum, cells, new - old)
+            self.congestion[changed] = congestion[changed]
+
+            touched = np.unique(cells)
+            congested = self.cell_congested[touched]
+            hot = (congested >= self.min_roads) & (congested >= self.min_ratio * self.cell_roads[touched])
+            if (hot != self.hot[touched]).any():
+                self.hot[touched] = hot
+                self._relabel()
+
+        self.hotspots = self._summarize()
+        return self.hotspots
+
+    def _relabel(self):
+        """重新计算热点网格的八邻域连通区域"""
+        # scipy.sparse 导入较慢，只在热点网格变化时才需要
+        from scipy.sparse import coo_matrix
+        from scipy.sparse.csgraph import connected_components
+
+        hot_cells = np.flatnonzero(self.hot)
+        self._hot_cells = hot_cells
+        if not len(hot_cells):
+            self._labels = np.array([], dtype=np.int64)
+            return
+
+        keys = self._cell_keys[hot_cells]
+        rows, cols = [], []
+        # 只需检查一半的邻居方向，连通关系是对称的
+        for offset in (1, self._width - 1, self._width, self._width + 1):
+            neighbours = keys + offset
+            positions = np.searchsorted(keys, neighbours)
+            found = positions < len(keys)
+            found[found] = keys[positions[found]] == neighbours[found]
+            rows.append(np.flatnonzero(found))
+            cols.append(positions[found])
+        rows, cols = np.concatenate(rows), np.concatenate(cols)
+        graph = coo_matrix((np.ones(len(rows)), (rows, cols)), shape=(len(keys), len(keys)))
+        _, self._labels = connected_components(graph, directed=False)
+
+    def _summarize(self) -> List[Hotspot]:
+        """按当前计数汇总各连通区域"""
+        if not len(self._hot_cells):
+            return []
+
+        cells, labels = self._hot_cells, self._labels
+        n_clusters = int(labels.max()) + 1
+        congested = np.bincount(labels, weights=self.cell_congested[cells], minlength=n_clusters)
+        previous = np.bincount(labels, weights=self.previous_congested[cells], minlength=n_clusters)
+        total = np.bincount(labels, weights=self.cell_roads[cells], minlength=n_clusters)
+        level_sum = np.bincount(labels, weights=self.cell_level_sum[cells], minlength=n_clusters)
+        center = np.column_stack(
+            [
+                np.bincount(labels, weights=self.cell_center[cells, i] * self.cell_congested[cells], minlength=n_clusters)
+                / np.maximum(congested, 1)
+                for i in range(2)
+            ]
+        )
+
+        # 每个热点包含的拥堵道路
+        cell_label = np.full(len(self.cell_roads), -1, dtype=np.int64)
+        cell_label[cells] = labels
+        road_label = cell_label[self.road_cell]
+        members = np.flatnonzero((road_label >= 0) & (self.congestion >= CONGESTED_LEVEL))
+        order = np.argsort(road_label[members], kind="stable")
+        members = members[order]
+        bounds = np.searchsorted(road_label[members], np.arange(n_clusters + 1))
+
+        hotspots = [
+            Hotspot(
+                center=center[i],
+                congested=int(congested[i]),
+                total=int(total[i]),
+                congestion_index=float(congestion_index(level_sum[i] / total[i])),
+                previous_congested=int(previous[i]),
+                roads=self.road_indices[members[bounds[i]:bounds[i + 1]]],
+            )
+            for i in range(n_clusters)
+        ]
+        hotspots.sort(key=lambda hotspot: (-hotspot.congested, -hotspot.congestion_index))
+        return hotspots
+
@@ -0,0 +1,219 @@
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import shapely
+
+
+class LodLevel(NamedTuple):
+    """细节层级的参数"""
+
+    # 适用的最小缩放级别
+    min_zoom: float
+    # 简化容差 (度)
+    tolerance: float
+    # 坐标保留的小数位数，为空时不取整
+    decimals: Optional[int]
+    # 输出的道路等级上限 (等级1为快速路，数值越大越次要)
+    max_road_level: int
+    # 道路要素输出的属性
+    road_properties: Tuple[str, ...]
+
+
+ROAD_PROPERTIES = ("id", "name", "FLOW", "SPEED", "CONGESTION")
+
+# 细节层级 (LOD)，层级0为原始几何和全部道路
+LOD_LEVELS = [
+    LodLevel(13, 0.0, None, 5, ROAD_PROPERTIES),
+    LodLevel(11, 0.0002, 5, 5, ROAD_PROPERTIES),
+    LodLevel(9, 0.0008, 5, 2, ("id", "FLOW", "SPEED", "CONGESTION")),
+    LodLevel(0, 0.003, 4, 1, ("id", "CONGESTION")),
+]
+
+Point = Tuple[float, ...]
+
+
+def zoom_to_lod(zoom: float) -> int:
+    """根据地图缩放级别选择细节层级"""
+    for lod, level in enumerate(LOD_LEVELS):
+        if zoom >= level.min_zoom:
+            return lod
+    return len(LOD_LEVELS) - 1
+
+
+def resolve_lod(zoom: Optional[float] = None, lod: Optional[int] = None) -> int:
+    """
+    解析请求中的细节层级参数
+
+    Args:
+        zoom: 地图缩放级别
+        lod: 直接指定的细节层级，优先于 zoom
+    """
+    if lod is not None:
+        return max(0, min(len(LOD_LEVELS) - 1, lod))
+    if zoom is not None:
+        return zoom_to_lod(zoom)
+    return 0
+
+
+def _map_paths(geometry: Optional[Dict], func: Callable[[List[Point], bool], List[Point]]) -> Optional[Dict]:
+    """对几何中的每条线和每个环调用 func(坐标列表, 是否闭合)，用返回的坐标生成新的几何"""
+    if geometry is None:
+        return None
+    geometry_type = geometry["type"]
+    coordinates = geometry["coordinates"] if "coordinates" in geometry else None
+
+    def ring(coords):
+        return func([tuple(point) for point in coords], True)
+
+    def line(coords):
+        return func([tuple(point) for point in coords], False)
+
+    if geometry_type == "LineString":
+        coordinates = line(coordinates)
+    elif geometry_type == "MultiLineString":
+        coordinates = [line(coords) for coords in coordinates]
+    elif geometry_type == "Polygon":
+        coordinates = [ring(coords) for coords in coordinates]
+    elif geometry_type == "MultiPolygon":
+        coordinates = [[ring(coords) for coords in polygon] for polygon in coordinates]
+    else:
+        return geometry
+    return {"type": geometry_type, "coordinates": coordinates}
+
+
+def _find_junctions(paths: Sequence[Tuple[List[Point], bool]]) -> set:
+    """
+    找出各条线/环的公共节点：线的端点，以及在不同线/环中相邻点不同的点 (共享边界在此分岔)
+    """
+    neighbours: Dict[Point, Tuple[Point, Point]] = {}
+    junctions = set()
+    for points, closed in paths:
+        if closed:
+            points = points[:-1]
+        n = len(points)
+        for i, point in enumerate(points):
+            if closed:
+                prev, next_ = points[i - 1], points[(i + 1) % n]
+            elif i == 0 or i == n - 1:
+                junctions.add(point)
+                continue
+            else:
+                prev, next_ = points[i - 1], points[i + 1]
+            pair = (prev, next_) if prev <= next_ else (next_, prev)
+            if neighbours.setdefault(point, pair) != pair:
+                junctions.add(point)
+    return junctions
+
+
+def _split_arcs(points: List[Point], closed: bool, junctions: set) -> List[List[Point]]:
+    """在公共节点处把线/环切分为弧段；没有公共节点的环作为一个弧段，从最小的点开始"""
+    if closed:
+        ring = points[:-1]
+        starts = [i for i, point in enumerate(ring) if point in junctions]
+        start = starts[0] if starts else ring.index(min(ring))
+        ring = ring[start:] + ring[:start]
+        points = ring + [ring[0]]
+        if not starts:
+            return [points]
+    cuts = [0] + [i for i in range(1, len(points) - 1) if points[i] in junctions] + [len(points) - 1]
+    return [points[start:end + 1] for start, end in zip(cuts, cuts[1:])]
+
+
+def _round_arc(coords: np.ndarray, decimals: Optional[int]) -> List[Point]:
+    """按小数位数取整，并去掉取整后连续重复的点"""
+    if decimals is not None:
+        coords = np.round(coords, decimals)
+        keep = np.ones(len(coords), dtype=bool)
+        keep[1:] = np.any(coords[1:] != coords[:-1], axis=1)
+        keep[-1] = True
+        coords = coords[keep]
+    return [tuple(point) for point in coords.tolist()]
+
+
+def simplify_geometries(
+    geometries: List[Optional[Dict]], tolerance: float, decimals: Optional[int] = None
+) -> List[Optional[Dict]]:
+    """
+    批量简化GeoJSON几何，相邻几何的公共边界简化后仍然重合
+
+    与 TopoJSON 相同，先在公共节点处把所有线和环切分为弧段，相同的弧段 (含方向相反的) 只保留
+    一份；全部弧段作为一个整体做保持拓扑的简化，弧段端点不动、弧段之间不会相交，再拼回各个几何。
+    因此相邻区域之间不会出现缝隙或重叠，相交道路的交点也保持不变。
+
+    Args:
+        geometries: GeoJSON几何列表，可以包含 None
+        tolerance: 简化容差 (度)
+        decimals: 坐标保留的小数位数，为空时不取整
+    """
+    if tolerance <= 0 and decimals is None:
+        return list(geometries)
+
+    paths: List[Tuple[List[Point], bool]] = []
+    for geometry in geometries:
+        _map_paths(geometry, lambda points, closed: paths.append((points, closed)))
+    junctions = _find_junctions(paths)
+
+    # 去重后的弧段，每条线/环记录组成它的 (弧段下标, 是否反向)
+    arc_ids: Dict[Tuple[Point, ...], int] = {}
+    arcs: List[List[Point]] = []
+    path_arcs: List[List[Tuple[int, bool]]] = []
+    for points, closed in paths:
+        refs = []
+        for arc in _split_arcs(points, closed, junctions):
+            key, reverse_key = tuple(arc), tuple(reversed(arc))
+            reversed_ = reverse_key < key
+            key = reverse_key if reversed_ else key
+            if key not in arc_ids:
+                arc_ids[key] = len(arcs)
+                arcs.append(list(key))
+            refs.append((arc_ids[key], reversed_))
+        path_arcs.append(refs)
+
+    original = [_round_arc(np.asarray(arc, dtype=float), decimals) for arc in arcs]
+    if tolerance > 0 and arcs:
+        lines = shapely.multilinestrings([shapely.linestrings(arc) for arc in arcs])
+        parts = shapely.get_parts(shapely.simplify(lines, tolerance, preserve_topology=True))
+        simplified = [
+            _round_arc(shapely.get_coordinates(part, include_z=len(arc[0]) > 2), decimals)
+            for part, arc in zip(parts, arcs)
+        ]
+    else:
+        simplified = original
+
+    def assemble(refs):
+        points: List[Point] = []
+        for arc_id, reversed_ in refs:
+            arc = simplified[arc_id]
+            arc = arc[::-1] if reversed_ else arc
+            points.extend(arc[1:] if points else arc)
+        return points
+
+    def valid(points, closed):
+        return len(points) >= 4 if closed else len(points) >= 2
+
+    # 简化后退化的环或线 (点数不足) 使用未简化的弧段，弧段是共享的，所以对所有引用它的几何生效
+    changed = True
+    while changed:
+        changed = False
+        for (_, closed), refs in zip(paths, path_arcs):
+            if not valid(assemble(refs), closed):
+                for arc_id, _ in refs:
+                    if simplified[arc_id] is not original[arc_id]:
+                        simplified[arc_id] = original[arc_id]
+                        changed = True
+
+    results = iter(zip(paths, path_arcs))
+
+    def rebuild(_points, _closed):
+        (points, closed), refs = next(results)
+        assembled = assemble(refs)
+        if not valid(assembled, closed):
+            assembled = points
+        return [list(point) for point in assembled]
+
+    return [_map_paths(geometry, rebuild) for geometry in geometries]
+
+
+def build_lod_geometries(geometries: List[Optional[Dict]]) -> List[List[Optional[Dict]]]:
+    """为每个细节层级预先计算简化后的几何，返回按层级排列的几何列表"""
+    return [simplify_geometries(geometries, level.tolerance, level.decimals) for level in LOD_LEVELS]
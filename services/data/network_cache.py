@@ -0,0 +1,123 @@
+import hashlib
+import os
+import zipfile
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import shapely
+
+# 缓存格式版本，保存的内容或格式变化时递增
+NETWORK_CACHE_VERSION = 2
+
+
+def network_cache_key(*contents: bytes, params: str = "") -> str:
+    """由输入文件的内容和生成参数计算缓存键"""
+    digest = hashlib.sha1(f"v{NETWORK_CACHE_VERSION}|{params}".encode())
+    for content in contents:
+        digest.update(len(content).to_bytes(8, "little"))
+        digest.update(content)
+    return digest.hexdigest()[:16]
+
+
+def _pack_bytes(items: Sequence[bytes]) -> Dict[str, np.ndarray]:
+    """把字节串列表打包为一个字节数组和每项的结束位置"""
+    return {
+        "blob": np.frombuffer(b"".join(items), dtype=np.uint8),
+        "ends": np.cumsum([len(item) for item in items], dtype=np.int64),
+    }
+
+
+def _unpack_bytes(blob: np.ndarray, ends: np.ndarray) -> List[bytes]:
+    data = blob.tobytes()
+    starts = np.concatenate([[0], ends[:-1]]).tolist()
+    return [data[start:end] for start, end in zip(starts, ends.tolist())]
+
+
+def _pack_strings(strings: Sequence[str]) -> Dict[str, np.ndarray]:
+    """把字符串列表打包为一个 UTF-8 字节数组和每个字符串的结束位置"""
+    return _pack_bytes([string.encode("utf-8") for string in strings])
+
+
+def _unpack_strings(blob: np.ndarray, ends: np.ndarray) -> List[str]:
+    return [item.decode("utf-8") for item in _unpack_bytes(blob, ends)]
+
+
+def _pack_shapes(shapes: np.ndarray) -> Dict[str, np.ndarray]:
+    """把 shapely 几何数组打包为 WKB，None 为空字节串"""
+    return _pack_bytes([item if item is not None else b"" for item in shapely.to_wkb(shapes).tolist()])
+
+
+def _unpack_shapes(blob: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    items = _unpack_bytes(blob, ends)
+    return shapely.from_wkb(np.array([item or None for item in items], dtype=object))
+
+
+def save_network_cache(
+    path: str,
+    roads: Dict[str, Sequence],
+    road_geometries: Sequence[Sequence[str]],
+    district_geometries: Sequence[Sequence[str]],
+    road_district: np.ndarray,
+):
+    """
+    保存道路网络的静态数据 (先写临时文件再替换，读者不会读到写了一半的文件)
+
+    Args:
+        path: 缓存文件路径 (.npz)
+        roads: 去重后的道路数组 ids、names、levels 和 shapes (shapely 几何数组)，按道路下标排列
+        road_geometries: 每个细节层级的道路几何JSON文本
+        district_geometries: 每个细节层级的区域几何JSON文本
+        road_district: 每条道路所在区域的下标 (-1 为没有几何)
+    """
+    arrays = {
+        "road_district": np.asarray(road_district, dtype=np.int64),
+        "road_levels": np.asarray(roads["levels"], dtype=np.int16),
+    }
+    packed = {
+        "road_ids": _pack_strings(roads["ids"]),
+        "road_names": _pack_strings(roads["names"]),
+        "road_shapes": _pack_shapes(roads["shapes"]),
+    }
+    for prefix, levels in [("road", road_geometries), ("district", district_geometries)]:
+        for lod, strings in enumerate(levels):
+            packed[f"{prefix}_{lod}"] = _pack_strings(strings)
+    for key, parts in packed.items():
+        for name, array in parts.items():
+            arrays[f"{key}_{name}"] = array
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def load_network_cache(path: str, n_lods: int) -> Optional[Dict]:
+    """
+    读取 save_network_cache() 保存的数据，文件不存在或内容不完整时返回 None
+
+    Returns:
+        包含 roads (ids、names、levels、shapes)、road_geometries、district_geometries
+        (按细节层级排列的几何JSON文本) 和 road_district 的字典
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            result = {
+                "road_district": data["road_district"],
+                "roads": {
+                    "ids": _unpack_strings(data["road_ids_blob"], data["road_ids_ends"]),
+                    "names": _unpack_strings(data["road_names_blob"], data["road_names_ends"]),
+                    "levels": data["road_levels"],
+                    "shapes": _unpack_shapes(data["road_shapes_blob"], data["road_shapes_ends"]),
+                },
+            }
+            for prefix in ["road", "district"]:
+                result[f"{prefix}_geometries"] = [
+                    _unpack_strings(data[f"{prefix}_{lod}_blob"], data[f"{prefix}_{lod}_ends"])
+                    for lod in range(n_lods)
+                ]
+            return result
+    except (KeyError, ValueError, OSError, zipfile.BadZipFile, shapely.errors.GEOSException):
+        return None
@@ -0,0 +1,194 @@
+import numpy as np
+from shapely.geometry import mapping, shape
+from typing import Any, Dict, List, Optional
+
+
+# 拥堵等级的速度阈值 (km/h)，与速度从低到高对应 严重/中度/轻度/畅通
+CONGESTION_SPEED_THRESHOLDS = np.array([25.0, 40.0, 60.0])
+
+
+def calculate_congestion_levels(speed: np.ndarray) -> np.ndarray:
+    """
+    根据速度批量计算拥堵等级
+
+    speed > 60 为 1(畅通)，> 40 为 2(轻度拥堵)，> 25 为 3(中度拥堵)，其余为 4(严重拥堵)
+    """
+    # side="left" 使恰好等于阈值的速度归入更拥堵的一档，与原先的 ">" 判断一致
+    return (4 - np.searchsorted(CONGESTION_SPEED_THRESHOLDS, speed, side="left")).astype(np.uint8)
+
+
+def congestion_index(mean_level):
+    """
+    由拥堵等级 (1-4) 的平均值计算拥堵指数，线性映射到 5.0-9.0 (与原先区域拥堵指数的范围一致)
+
+    Args:
+        mean_level: 拥堵等级的平均值 (标量或数组)
+    """
+    return 5.0 + (np.asarray(mean_level, dtype=np.float64) - 1.0) * (4.0 / 3.0)
+
+
+def _state_rng(seed: Optional[int]) -> np.random.Generator:
+    """模拟状态使用的随机数生成器"""
+    return np.random.default_rng(np.random.SeedSequence(seed).spawn(2)[1])
+
+
+class RoadState:
+    """
+    道路状态数组 (struct-of-arrays)
+
+    每条道路对应一个固定下标，流量、速度、等级和拥堵等级分别保存在按下标排列的
+    NumPy 数组中，一次 tick 的更新通过批量运算完成。
+    """
+
+    def __init__(
+        self,
+        ids: List[str],
+        names: List[str],
+        geometries: Optional[List[Dict]],
+        levels: np.ndarray,
+        flow: np.ndarray,
+        speed: np.ndarray,
+        rng: np.random.Generator,
+        shapes: Optional[np.ndarray] = None,
+    ):
+        """
+        Args:
+            ids, names: 按下标排列的道路ID和名称
+            geometries: GeoJSON几何列表，为空时由 shapes 生成 (首次访问 geometries 时)
+            levels: 道路等级
+            flow, speed: 初始流量和速度
+            rng: 模拟使用的随机数生成器
+            shapes: shapely 几何数组，为空时由 geometries 生成
+        """
+        if shapes is None:
+            shapes = np.array([shape(geometry) if geometry else None for geometry in geometries], dtype=object)
+        self.ids = ids
+        self.names = names
+        self.shapes = shapes
+        self._geometries = geometries
+        self.level = np.asarray(levels, dtype=np.int16)
+        self.flow = np.asarray(flow, dtype=np.int64)
+        self.speed = np.asarray(speed, dtype=np.float64)
+        self.congestion = calculate_congestion_levels(self.speed)
+        self.rng = rng
+        # 道路ID到数组下标的映射
+        self.index = {road_id: i for i, road_id in enumerate(ids)}
+
+    @classmethod
+    def from_features(
+        cls,
+        features: List[Dict[str, Any]],
+        name_templates: List[str],
+        seed: Optional[int] = None,
+    ) -> "RoadState":
+        """
+        从道路网络的GeoJSON要素构建道路状态
+
+        Args:
+            features: 道路网络的要素列表
+            name_templates: 要素缺少名称时使用的道路名称模板
+            seed: 随机数种子，用于复现模拟结果
+        """
+        # 缺少的属性和模拟状态使用不同的随机数流，模拟状态与 from_arrays() 使用相同种子时一致
+        rng = np.random.default_rng(np.random.SeedSequence(seed).spawn(2)[0])
+
+        # 先按道路ID去重，重复ID保留第一次出现的位置和最后出现的要素 (与字典赋值一致)
+        roads: Dict[str, Dict] = {}
+        for feature in features:
+            properties = feature["properties"]
+            # 默认值总是抽取，保证随机数流与要素的属性是否缺失无关
+            default_id = str(rng.integers(10000, 100000))
+            default_name = name_templates[rng.integers(len(name_templates))] if name_templates else "默认道路名称"
+            # GeoJSON 中的ID可能是数字、名称可能为 null，统一转为字符串 (与网络缓存读回的类型一致)
+            road_id = properties.get("id")
+            road_id = default_id if road_id is None else str(road_id)
+            name = properties.get("name")
+            name = default_name if name is None else str(name)
+            level = properties.get("level", int(rng.integers(1, 6)))
+            roads[road_id] = {
+                "name": name,
+                "level": level,
+                "geometry": feature["geometry"],
+            }
+
+        levels = np.fromiter((road["level"] for road in roads.values()), dtype=np.int16, count=len(roads))
+
+        return cls._with_base_state(
+            ids=list(roads.keys()),
+            names=[road["name"] for road in roads.values()],
+            geometries=[road["geometry"] for road in roads.values()],
+            levels=levels,
+            rng=_state_rng(seed),
+        )
+
+    @classmethod
+    def from_arrays(
+        cls,
+        ids: List[str],
+        names: List[str],
+        levels: np.ndarray,
+        shapes: np.ndarray,
+        seed: Optional[int] = None,
+    ) -> "RoadState":
+        """
+        由已去重的道路数组构建道路状态 (如从路网缓存读取)，不需要解析GeoJSON
+
+        Args:
+            ids, names: 按下标排列的道路ID和名称
+            levels: 道路等级
+            shapes: shapely 几何数组
+            seed: 随机数种子，用于复现模拟结果
+        """
+        return cls._with_base_state(
+            ids=ids, names=names, geometries=None, levels=levels, rng=_state_rng(seed), shapes=shapes
+        )
+
+    @classmethod
+    def _with_base_state(cls, levels: np.ndarray, rng: np.random.Generator, **kwargs) -> "RoadState":
+        """根据道路等级设置基础流量和速度"""
+        levels = np.asarray(levels, dtype=np.int16)
+        n = len(levels)
+        base_flow = (6 - levels) * 400 + rng.integers(-200, 201, size=n)
+        base_speed = (6 - levels) * 12 + rng.integers(8, 19, size=n)
+        return cls(levels=levels, flow=base_flow, speed=base_speed, rng=rng, **kwargs)
+
+    @property
+    def geometries(self) -> List[Optional[Dict]]:
+        """每条道路的GeoJSON几何 (由缓存构建时在首次访问时从 shapes 生成)"""
+        if self._geometries is None:
+            self._geometries = [mapping(geometry) if geometry is not None else None for geometry in self.shapes]
+        return self._geometries
+
+    def release_geometries(self):
+        """释放GeoJSON几何 (之后访问 geometries 时由 shapes 重新生成)"""
+        self._geometries = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def update(self, time_factor: float):
+        """
+        批量更新一次所有道路的流量、速度和拥堵等级
+
+        Args:
+            time_factor: 当前时段的流量系数
+        """
+        n = len(self.ids)
+        rng = self.rng
+
+        # 添加随机波动
+        flow_change = rng.uniform(-0.15, 0.15, size=n)
+        speed_change = rng.uniform(-0.1, 0.1, size=n)
+
+        # 以道路等级对应的基础流量为基准，避免流量随更新次数累积减小
+        base_flow = (6 - self.level) * 400 + rng.integers(-200, 201, size=n)
+        new_flow = (base_flow * (1 + flow_change) * time_factor).astype(np.int64)
+        np.maximum(new_flow, 200, out=new_flow)  # 设置最小流量为200
+
+        # 流量与速度成反比
+        speed_factor = np.clip(1.0 - (new_flow / 6000) * 0.4, 0.4, 1.2)
+        new_speed = np.clip(self.speed * (1 + speed_change) * speed_factor, 10, 120)
+
+        self.flow = new_flow
+        self.congestion = calculate_congestion_levels(new_speed)
+        self.speed = np.round(new_speed, 1)
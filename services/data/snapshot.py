@@ -0,0 +1,275 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Awaitable, Callable, Dict, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import shapely
+
+from services.data.TrafficDataGenerate import TrafficDataGenerator
+from services.data.flow_binary import encode_flow_binary
+from services.data.geojson_encoder import encode_timestamped
+from services.data.lod import LOD_LEVELS
+from services.data.spatial_index import SpatialIndex
+from services.monitoring.metrics import metrics
+from services.websocket.encoding import encode_json
+
+
+# 快照包含的频道，与 WebSocket 客户端类型一一对应
+CHANNELS = [
+    "road_flow",
+    "traffic_events",
+    "district_data",
+    "statistics",
+    "trend_data",
+    "prediction_data",
+    "hotspots_data",
+    "all_data",
+]
+
+# 按细节层级提供简化几何的频道
+LOD_CHANNELS = ["road_flow", "district_data"]
+
+
+def channel_key(channel: str, lod: int = 0) -> str:
+    """快照中频道数据的键，层级0使用频道名本身，其余层级为 "<频道>@<层级>" """
+    return channel if lod == 0 else f"{channel}@{lod}"
+
+
+# 快照中的全部键
+SNAPSHOT_KEYS = CHANNELS + [
+    channel_key(channel, lod) for channel in LOD_CHANNELS for lod in range(1, len(LOD_LEVELS))
+]
+
+
+@dataclass(frozen=True)
+class TrafficSnapshot:
+    """
+    单个 tick 的只读快照
+
+    payloads 保存每个频道 HTTP 响应体的 JSON 文本，messages 保存对应的 WebSocket 消息
+    ({"timestamp": ..., "data": ...})，键由 channel_key() 生成。road_* 为该 tick 道路状态
+    数组的只读副本，按道路下标排列，road_flow_binary 为其二进制列式编码 (见 flow_binary)。
+    encoded_properties 和 event_features 是已序列化的片段，用于按空间范围输出部分要素。
+    快照发布后不再修改，可被任意数量的读者共享。
+
+    快照可以 pickle，用于在进程间共享；messages 和 event_index 不序列化，在反序列化时重新生成。
+    """
+
+    tick: int
+    timestamp: int
+    payloads: Mapping[str, str]
+    messages: Mapping[str, str]
+    road_flow: np.ndarray
+    road_speed: np.ndarray
+    road_congestion: np.ndarray
+    road_flow_binary: bytes
+    encoded_properties: Mapping[str, Sequence[Sequence[str]]]
+    event_features: Tuple[str, ...]
+    event_index: SpatialIndex
+
+    def encode_events(self, indices: Optional[Sequence[int]] = None) -> str:
+        """输出交通事件 FeatureCollection，indices 为空时输出全部事件"""
+        features = self.event_features if indices is None else [self.event_features[i] for i in indices]
+        return _join_features(features)
+
+    def __reduce__(self):
+        coordinates = shapely.get_coordinates(self.event_index.geometries)
+        return (
+            _restore_snapshot,
+            (
+                self.tick,
+                self.timestamp,
+                dict(self.payloads),
+                self.road_flow,
+                self.road_speed,
+                self.road_congestion,
+                self.road_flow_binary,
+                dict(self.encoded_properties),
+                self.event_features,
+                coordinates,
+            ),
+        )
+
+
+def _join_features(features: Sequence[str]) -> str:
+    """把已序列化的要素拼接为 FeatureCollection"""
+    return '{"type":"FeatureCollection","features":[' + ",".join(features) + "]}"
+
+
+def _readonly_copy(array: np.ndarray) -> np.ndarray:
+    copy = array.copy()
+    copy.flags.writeable = False
+    return copy
+
+
+def _build_event_index(coordinates: Sequence[Sequence[float]]) -> SpatialIndex:
+    """以事件坐标构建空间索引，下标与事件顺序一致"""
+    if len(coordinates) == 0:
+        return SpatialIndex(np.array([], dtype=object))
+    return SpatialIndex(shapely.points(coordinates))
+
+
+def _build_messages(timestamp: int, payloads: Mapping[str, str]) -> Dict[str, str]:
+    """由各频道响应体生成 WebSocket 消息，完整数据包本身已带时间戳"""
+    return {
+        channel: payload if channel == "all_data" else encode_timestamped(timestamp, payload)
+        for channel, payload in payloads.items()
+    }
+
+
+def _restore_snapshot(
+    tick: int,
+    timestamp: int,
+    payloads: Dict[str, str],
+    road_flow: np.ndarray,
+    road_speed: np.ndarray,
+    road_congestion: np.ndarray,
+    road_flow_binary: bytes,
+    encoded_properties: Dict[str, Sequence[Sequence[str]]],
+    event_features: Tuple[str, ...],
+    event_coordinates: np.ndarray,
+) -> TrafficSnapshot:
+    """反序列化快照，重新生成 messages 和事件索引"""
+    for array in (road_flow, road_speed, road_congestion):
+        array.flags.writeable = False
+    return TrafficSnapshot(
+        tick=tick,
+        timestamp=timestamp,
+        payloads=MappingProxyType(payloads),
+        messages=MappingProxyType(_build_messages(timestamp, payloads)),
+        road_flow=road_flow,
+        road_speed=road_speed,
+        road_congestion=road_congestion,
+        road_flow_binary=road_flow_binary,
+        encoded_properties=MappingProxyType(encoded_properties),
+        event_features=event_features,
+        event_index=_build_event_index(event_coordinates),
+    )
+
+
+def build_snapshot(generator: TrafficDataGenerator, tick: int) -> TrafficSnapshot:
+    """
+    将生成器的当前状态编码为快照，不推进模拟
+
+    Args:
+        generator: 交通数据生成器
+        tick: 快照序号
+    """
+    timestamp = int(time.time())
+    # 交通事件逐个序列化，按范围过滤时直接拼接
+    events = generator.generate_events_geojson()["features"]
+    with metrics.timer("snapshot.traffic_events.encode"):
+        event_features = tuple(encode_json(feature) for feature in events)
+    event_index = _build_event_index([feature["geometry"]["coordinates"] for feature in events])
+
+    encoders = {
+        "statistics": lambda: encode_json(generator.generate_traffic_statistics()),
+        "trend_data": lambda: encode_json(generator.generate_traffic_trend_data()),
+        "prediction_data": lambda: encode_json(generator.generate_prediction_data()),
+        "hotspots_data": lambda: encode_json(generator.generate_hotspots_data()),
+    }
+    payloads = {
+        "traffic_events": _join_features(event_features),
+    }
+    for channel, encode in encoders.items():
+        with metrics.timer(f"snapshot.{channel}.encode"):
+            payloads[channel] = encode()
+
+    # 各细节层级共用同一份序列化后的属性
+    lod_encoders = {
+        "road_flow": (generator.encode_flow_properties, generator.encode_flow_geojson),
+        "district_data": (generator.encode_district_properties, generator.encode_district_geojson),
+    }
+    encoded_properties = {}
+    for channel, (encode_properties, encode_geojson) in lod_encoders.items():
+        with metrics.timer(f"snapshot.{channel}.encode"):
+            encoded_properties[channel] = encode_properties()
+            for lod in range(len(LOD_LEVELS)):
+                payloads[channel_key(channel, lod)] = encode_geojson(lod, encoded_properties[channel])
+
+    # 完整数据包与 update_all_data() 的结构一致，本身已带时间戳
+    all_data = "".join(
+        [
+            '{"timestamp":', str(timestamp),
+            ',"flowData":', payloads["road_flow"],
+            ',"eventsData":', payloads["traffic_events"],
+            ',"districtData":', payloads["district_data"],
+            ',"statistics":', payloads["statistics"],
+            ',"trendData":', payloads["trend_data"],
+            ',"predictionData":', payloads["prediction_data"],
+            ',"hotspotsData":', payloads["hotspots_data"],
+            "}",
+        ]
+    )
+    payloads["all_data"] = all_data
+
+    road_flow = _readonly_copy(generator.road_state.flow)
+    road_speed = _readonly_copy(generator.road_state.speed)
+    road_congestion = _readonly_copy(generator.road_state.congestion)
+    with metrics.timer("snapshot.road_flow_binary.encode"):
+        road_flow_binary = encode_flow_binary(tick, timestamp, road_flow, road_speed, road_congestion)
+
+    return TrafficSnapshot(
+        tick=tick,
+        timestamp=timestamp,
+        payloads=MappingProxyType(payloads),
+        messages=MappingProxyType(_build_messages(timestamp, payloads)),
+        road_flow=road_flow,
+        road_speed=road_speed,
+        road_congestion=road_congestion,
+        road_flow_binary=road_flow_binary,
+        encoded_properties=MappingProxyType(encoded_properties),
+        event_features=event_features,
+        event_index=event_index,
+    )
+
+
+class SnapshotStore:
+    """
+    双缓冲快照存储
+
+    tick 在后台构建新快照，构建完成后一次性替换当前快照，读者始终拿到一份完整的快照。
+    尚无快照时，并发的读请求共享同一次构建。
+    """
+
+    def __init__(self):
+        self._current: Optional[TrafficSnapshot] = None
+        self._previous: Optional[TrafficSnapshot] = None
+        self._pending: Optional[asyncio.Future] = None
+
+    @property
+    def current(self) -> Optional[TrafficSnapshot]:
+        return self._current
+
+    @property
+    def previous(self) -> Optional[TrafficSnapshot]:
+        return self._previous
+
+    def publish(self, snapshot: TrafficSnapshot):
+        """发布新快照，旧快照保留为 previous"""
+        self._previous, self._current = self._current, snapshot
+
+    async def get(self, factory: Callable[[], Awaitable[TrafficSnapshot]]) -> TrafficSnapshot:
+        """
+        返回当前快照，尚无快照时调用 factory 构建并发布
+
+        Args:
+            factory: 构建快照的协程函数，并发调用只会执行一次
+        """
+        if self._current is not None:
+            return self._current
+
+        if self._pending is None:
+            self._pending = asyncio.ensure_future(self._build(factory))
+        return await asyncio.shield(self._pending)
+
+    async def _build(self, factory: Callable[[], Awaitable[TrafficSnapshot]]) -> TrafficSnapshot:
+        try:
+            snapshot = await factory()
+            if self._current is None:
+                self.publish(snapshot)
+            return self._current
+        finally:
+            self._pending = None
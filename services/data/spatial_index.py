@@ -0,0 +1,108 @@
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import shapely
+from shapely.geometry import shape
+
+BBox = Tuple[float, float, float, float]
+
+
+def parse_bbox(text: str) -> BBox:
+    """
+    解析 "min_lng,min_lat,max_lng,max_lat" 形式的范围参数
+
+    Raises:
+        ValueError: 格式不正确或范围无效
+    """
+    parts = [float(part) for part in text.split(",")]
+    if len(parts) != 4:
+        raise ValueError("bbox 必须是 min_lng,min_lat,max_lng,max_lat")
+    min_lng, min_lat, max_lng, max_lat = parts
+    if min_lng > max_lng or min_lat > max_lat:
+        raise ValueError("bbox 的最小值不能大于最大值")
+    return min_lng, min_lat, max_lng, max_lat
+
+
+def shapes_from_geojson(geometries: Sequence[Optional[Dict[str, Any]]]) -> np.ndarray:
+    """把GeoJSON几何列表转换为 shapely 几何数组，None 保持为 None"""
+    return np.array(
+        [shape(geometry) if geometry else None for geometry in geometries], dtype=object
+    )
+
+
+class SpatialIndex:
+    """
+    基于 shapely STRtree 的只读空间索引
+
+    查询结果为按升序排列的要素下标，与构建时传入的几何顺序一致。
+    """
+
+    def __init__(self, geometries: np.ndarray):
+        """
+        Args:
+            geometries: shapely 几何数组，可以包含 None
+        """
+        self.geometries = geometries
+        self.tree = shapely.STRtree(geometries)
+
+    def __len__(self) -> int:
+        return len(self.geometries)
+
+    def query(self, bbox: Optional[BBox] = None, within: Optional[Any] = None) -> np.ndarray:
+        """
+        查询与范围相交的要素
+
+        Args:
+            bbox: 经纬度范围 (min_lng, min_lat, max_lng, max_lat)
+            within: shapely 几何 (如区域边界)，只返回与其相交的要素
+
+        Returns:
+            升序排列的要素下标，两个条件都提供时取交集，都不提供时返回全部下标
+        """
+        indices: Optional[np.ndarray] = None
+        if bbox is not None:
+            indices = self.tree.query(shapely.box(*bbox), predicate="intersects")
+        if within is not None:
+            matched = self.tree.query(within, predicate="intersects")
+            indices = matched if indices is None else np.intersect1d(indices, matched)
+        if indices is None:
+            return np.arange(len(self.geometries))
+        return np.unique(indices)
+
+    def locate(self, points: np.ndarray) -> np.ndarray:
+        """
+        查找每个点所在的要素 (用于面要素，如区域边界)
+
+        以点构建临时索引，再用预处理 (prepare) 过的面要素批量查询其中的点；不在任何要素内的点
+        归入边界离它最近的要素，点位于多个要素的公共边界上时取下标最小的要素。
+
+        Args:
+            points: shapely 点数组，可以包含 None
+
+        Returns:
+            每个点所在要素的下标，点为 None 或没有要素时为 -1
+        """
+        points = np.asarray(points, dtype=object)
+        located = np.full(len(points), -1, dtype=np.int64)
+        valid = np.flatnonzero(~shapely.is_missing(points) & ~shapely.is_empty(points))
+        if not len(valid) or not len(self.geometries):
+            return located
+
+        shapely.prepare(self.geometries)
+        polygon_indices, point_indices = shapely.STRtree(points[valid]).query(
+            self.geometries, predicate="intersects"
+        )
+        # 重复赋值时后写入的生效，倒序写入使下标最小的要素优先
+        located[valid[point_indices[::-1]]] = polygon_indices[::-1]
+
+        # 精确的最近距离查询对复杂多边形很慢，改为查找最近的边界顶点 (边界先按约500米加密)
+        outside = valid[located[valid] < 0]
+        if len(outside):
+            from scipy.spatial import cKDTree
+
+            vertices, owners = shapely.get_coordinates(
+                shapely.segmentize(self.geometries, 0.005), return_index=True
+            )
+            _, nearest = cKDTree(vertices).query(shapely.get_coordinates(points[outside]))
+            located[outside] = owners[nearest]
+        return located
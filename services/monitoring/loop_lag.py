@@ -0,0 +1,19 @@
+import asyncio
+
+from services.monitoring.metrics import metrics
+
+
+async def monitor_event_loop_lag(interval: float = 0.5):
+    """
+    定期测量事件循环延迟，记录为 event_loop.lag 指标
+
+    每次 sleep(interval) 实际唤醒的时间比预期晚多少，就是这段时间内事件循环被同步代码阻塞的时长。
+
+    Args:
+        interval: 测量间隔 (秒)
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        metrics.observe("event_loop.lag", max(0.0, loop.time() - start - interval))
@@ -0,0 +1,70 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+
+class TimingMetric:
+    """耗时指标：累计次数、总耗时和最大耗时"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def to_dict(self) -> Dict:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "avg_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+class MetricsRegistry:
+    """进程内指标注册表，按名称记录耗时和计数"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timings: Dict[str, TimingMetric] = {}
+        self._counters: Dict[str, int] = {}
+
+    def observe(self, name: str, seconds: float):
+        """记录一次耗时 (秒)"""
+        with self._lock:
+            metric = self._timings.get(name)
+            if metric is None:
+                metric = self._timings[name] = TimingMetric()
+            metric.observe(seconds)
+
+    def increment(self, name: str, value: int = 1):
+        """计数器加 value"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    @contextmanager
+    def timer(self, name: str):
+        """记录 with 代码块的耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def snapshot(self) -> Dict:
+        """返回所有指标的当前值"""
+        with self._lock:
+            return {
+                "timings": {name: metric.to_dict() for name, metric in sorted(self._timings.items())},
+                "counters": dict(sorted(self._counters.items())),
+            }
+
+
+# 全局指标注册表
+metrics = MetricsRegistry()
@@ -1,73 +1,219 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import geopandas as gpd
+import numpy as np
 from geopandas import GeoDataFrame
-import osmnx as ox
 import pandas as pd
 from pyogrio import read_info
 
+GRAPHML_PATH = "public/road_network/Shenzhen.graphml"
+ROAD_INFO_PATH = "public/road_info.csv"
+ROAD_SPEED_PATH = "public/road_speed.csv"
+ARTIFACT_DIR = "cache/road_network"
+
+# 构建逻辑变化时递增，使旧的路网产物失效
+ARTIFACT_VERSION = 1
+
 
 # 从网络获取道路网络
 def get_road_network_from_osmnx(place_name="Futian, Shenzhen, China"):
+    import osmnx as ox
+
     G = ox.graph_from_place(place_name, network_type="drive")
     edges = ox.graph_to_gdfs(G, nodes=False)
     return edges
 
 # 从本地获取道路网络
-def get_road_network_from_location():
-    G = ox.load_graphml('public/road_network/Shenzhen.graphml')
+def get_road_network_from_location(graphml_path=GRAPHML_PATH):
+    import osmnx as ox
+
+    G = ox.load_graphml(graphml_path)
     edges = ox.graph_to_gdfs(G, nodes=False)
     return edges
 
+# 路网保留的列
+NETWORK_COLUMNS = ['osmid', 'name', 'geometry', 'length', 'lanes']
+
+
+# 道路名称 -> ROADSECT_ID 的映射，与逐行构建字典的结果一致：每行先 FROM 后 TO，同名时后出现的生效
+def build_roadsect_mapping(road_info):
+    names = np.column_stack([road_info["ROADSECT_FROM"].to_numpy(), road_info["ROADSECT_TO"].to_numpy()]).ravel()
+    mapping = pd.Series(np.repeat(road_info["ROADSECT_ID"].to_numpy(), 2), index=names)
+    return mapping[~mapping.index.duplicated(keep="last")]
+
+
+# 每条速度记录的 FLOW (GOLEN / GOTIME)，按 ROADSECT_ID 稳定排序 (同一路段保持原顺序)，不修改 road_speed
+def build_flow_table(road_speed):
+    order = np.argsort(road_speed["ROADSECT_ID"].to_numpy(), kind="stable")
+    return pd.DataFrame(
+        {
+            "ROADSECT_ID": road_speed["ROADSECT_ID"].to_numpy()[order],
+            "FLOW": (road_speed["GOLEN"] / road_speed["GOTIME"]).to_numpy()[order],
+        }
+    )
+
+
+# 阶段1：选出名称出现在 road_info 中的道路，只复制保留的列
+def select_roads(edges, road_names):
+    mask = edges["name"].isin(road_names).to_numpy()
+    return edges.loc[mask, NETWORK_COLUMNS]
+
+
+# 阶段2：按名称添加 ROADSECT_ID，丢弃没有匹配的道路
+def attach_roadsect_id(network, mapping):
+    ids = network["name"].map(mapping).to_numpy()
+    rows = np.flatnonzero(~pd.isna(ids))
+    network = network.take(rows)
+    network["ROADSECT_ID"] = ids[rows].astype(np.int64)
+    return network
+
+
+# 阶段3：按 ROADSECT_ID 合并 FLOW，结果与 pd.merge(how="left") 一致 (一个路段有多条速度记录时道路会重复)
+# 在排序后的 FLOW 表上二分查找，每块的耗时只与块的大小有关
+def attach_flow(network, flow_table):
+    table_ids = flow_table["ROADSECT_ID"].to_numpy()
+    table_flow = flow_table["FLOW"].to_numpy()
+    keys = network["ROADSECT_ID"].to_numpy()
+    lo = np.searchsorted(table_ids, keys, side="left")
+    hi = np.searchsorted(table_ids, keys, side="right")
+
+    # 每条道路输出 max(匹配数, 1) 行，没有匹配的道路 FLOW 为 NaN
+    counts = np.maximum(hi - lo, 1)
+    rows = np.repeat(np.arange(len(keys)), counts)
+    matched = np.repeat(hi > lo, counts)
+    positions = np.repeat(lo - (np.cumsum(counts) - counts), counts) + np.arange(len(rows))
+    flow = np.full(len(rows), np.nan)
+    flow[matched] = table_flow[positions[matched]]
+
+    result = network.take(rows).reset_index(drop=True)
+    result["FLOW"] = flow
+    return result
+
+
+# 分块运行整个流程，每块依次经过三个阶段，映射和 FLOW 表只构建一次
+def iter_road_flow_chunks(edges, road_info, road_speed, chunk_size=50000):
+    road_names = pd.unique(road_info["ROADSECT_NAME"])
+    mapping = build_roadsect_mapping(road_info)
+    flow_table = build_flow_table(road_speed)
+    for start in range(0, max(len(edges), 1), chunk_size):
+        network = select_roads(edges.iloc[start:start + chunk_size], road_names)
+        yield attach_flow(attach_roadsect_id(network, mapping), flow_table)
+
+
+# 由路网的边、road_info 和 road_speed 生成带 ROADSECT_ID 和 FLOW 的路网，chunk_size 为空时不分块
+def build_road_flow(edges, road_info, road_speed, chunk_size=None):
+    chunk_size = chunk_size or max(len(edges), 1)
+    return pd.concat(list(iter_road_flow_chunks(edges, road_info, road_speed, chunk_size)), ignore_index=True)
+
+
 # 提取道路网络
 def extract_road_network(road_info, road_network):
-    new_road_mask = merge_road_network(road_info, road_network)
-    new_road = new_road_mask[['osmid', 'name', 'geometry', 'length', 'lanes']]
-    return new_road
+    return select_roads(road_network, pd.unique(road_info["ROADSECT_NAME"]))
 
 
 # 根据road_info中name字段合并道路
 def merge_road_network(road_info, edges):
-    new_road_mask = edges["name"].isin(road_info["ROADSECT_NAME"])
-    new_road = edges[new_road_mask]
-    return new_road
+    return edges[edges["name"].isin(road_info["ROADSECT_NAME"]).to_numpy()]
 
 # 为路网添加ROADSECT_ID
 def add_roadsect_id(road_info, road_network):
-    # 创建一个字典，存储道路名称与 ROADSECT_ID 的映射
-    road_to_sect_id = {}
-
-    # 遍历道路段数据，构建映射
-    for _, row in road_info.iterrows():
-        road_to_sect_id[row["ROADSECT_FROM"]] = row["ROADSECT_ID"]
-        road_to_sect_id[row["ROADSECT_TO"]] = row["ROADSECT_ID"]
-
-    print(len(road_to_sect_id))
-    # 为路网数据添加 ROADSECT_ID
-    road_network["ROADSECT_ID"] = road_network["name"].map(road_to_sect_id)
-    road_network = road_network.dropna(subset=["ROADSECT_ID"])
-    road_network["ROADSECT_ID"] = road_network["ROADSECT_ID"].astype(int)
-    return road_network
+    return attach_roadsect_id(road_network, build_roadsect_mapping(road_info))
 
 
 # 为路网添加FLOW
 def add_flow(road_speed, road_network):
-    road_speed['FLOW'] = road_speed['GOLEN'] / road_speed['GOTIME']
-    merge_datasets = pd.merge(
-        road_network, road_speed[["ROADSECT_ID", "FLOW"]], on="ROADSECT_ID", how="left"
-    )
-    return merge_datasets
+    return attach_flow(road_network, build_flow_table(road_speed))
+
+
+# 输入文件的内容哈希，文件大小和修改时间不变时复用清单中记录的哈希，避免每次启动都读取整个 graphml
+def _file_digest(path, manifest):
+    stat = os.stat(path)
+    entry = manifest.get(path)
+    if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+        return entry["sha256"]
+
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha256.update(chunk)
+    manifest[path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha256.hexdigest()}
+    return manifest[path]["sha256"]
+
+
+# 路网产物的路径，文件名包含构建版本和输入文件的内容哈希
+def road_network_artifact_path(graphml_path=GRAPHML_PATH, road_info_path=ROAD_INFO_PATH, artifact_dir=ARTIFACT_DIR):
+    os.makedirs(artifact_dir, exist_ok=True)
+    manifest_path = os.path.join(artifact_dir, "manifest.json")
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+
+    key = hashlib.sha256(
+        f"{ARTIFACT_VERSION}:{_file_digest(graphml_path, manifest)}:{_file_digest(road_info_path, manifest)}".encode()
+    ).hexdigest()[:16]
+
+    # 清单先写入临时文件再替换，多个进程同时启动时不会读到写了一半的清单
+    tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path)
+    return os.path.join(artifact_dir, f"road_network-v{ARTIFACT_VERSION}-{key}.feather")
+
+
+# 构建路网产物：解析 graphml、按名称匹配 road_info 并添加 ROADSECT_ID，保存为未压缩的 Feather (GeoArrow)
+def build_road_network_artifact(graphml_path=GRAPHML_PATH, road_info_path=ROAD_INFO_PATH, artifact_dir=ARTIFACT_DIR):
+    path = road_network_artifact_path(graphml_path, road_info_path, artifact_dir)
+    road_info = pd.read_csv(road_info_path)
+    network = extract_road_network(road_info, get_road_network_from_location(graphml_path))
+    network = add_roadsect_id(road_info, network).reset_index(drop=True)
+
+    # osmnx 合并的边中 osmid、name、lanes 可能是列表，Feather 需要单一类型的列
+    for column in ["osmid", "name", "lanes"]:
+        network[column] = network[column].map(
+            lambda value: ";".join(map(str, value)) if isinstance(value, list) else value
+        ).astype("string")
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    network.to_feather(tmp_path, compression="uncompressed")
+    os.replace(tmp_path, path)
+    return path
+
+
+# 加载路网产物 (内存映射读取)，产物不存在或输入文件变化时先构建
+def load_road_network(graphml_path=GRAPHML_PATH, road_info_path=ROAD_INFO_PATH, artifact_dir=ARTIFACT_DIR, rebuild=False):
+    path = road_network_artifact_path(graphml_path, road_info_path, artifact_dir)
+    if rebuild or not os.path.exists(path):
+        build_road_network_artifact(graphml_path, road_info_path, artifact_dir)
+    return gpd.read_feather(path, memory_map=True)
 
 
 def generate_road_with_flow(road_speed_data=None):
-    road_network = get_road_network_from_location()
-    road_info = pd.read_csv('public/road_info.csv')
+    # 路网和 ROADSECT_ID 来自预先构建的产物，每次只合并流量
+    new_network = load_road_network()
     
     # 允许传入 road_speed 数据
     if road_speed_data is None:
-        road_speed = pd.read_csv('public/road_speed.csv')
+        road_speed = pd.read_csv(ROAD_SPEED_PATH)
     else:
         road_speed = road_speed_data
     
-    new_network = extract_road_network(road_info, road_network)
-    new_network = add_roadsect_id(road_info, new_network)
     new_network = add_flow(road_speed, new_network)
     
     return new_network
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="构建 geoservice 使用的路网产物")
+    parser.add_argument("--graphml", default=GRAPHML_PATH)
+    parser.add_argument("--road-info", default=ROAD_INFO_PATH)
+    parser.add_argument("--output-dir", default=ARTIFACT_DIR)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    artifact = build_road_network_artifact(args.graphml, args.road_info, args.output_dir)
+    print(f"路网产物已生成: {artifact} ({time.perf_counter() - start:.2f}秒)")
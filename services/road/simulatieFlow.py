@@ -1,29 +1,147 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Iterator, Optional
+
 import pandas as pd
 import numpy as np
-from sklearn.neighbors import KernelDensity
+
+# 按数据指纹缓存的合成器个数
+SYNTHESIZER_CACHE_SIZE = 8
 
 
-def simulate_flow(data: pd.DataFrame):
+class FlowSynthesizer:
     """
-    根据道路速度数据生成合成数据
-    Note: data 必须包含 'FLOW' 列
+    基于高斯核密度估计 (KDE) 的 FLOW 合成器
+
+    高斯 KDE 的采样等价于：从观测值中均匀随机取一个，再加上标准差为 bandwidth 的正态噪声，
+    与 sklearn KernelDensity.sample 的分布完全相同。拟合只需把观测值按分组排序保存一次，之后
+    任意多个 tick × 道路的样本都由一次向量化的随机下标 + 噪声生成。
+
+    by 为空时所有道路共用一个分布 (与 simulate_flow 相同)；by="ROADSECT_ID" 时每行只从同一路段的
+    观测值中取样，即每个路段各自拟合一个 KDE。
     """
-    # 删除缺失值
-    data = data.dropna(subset=["FLOW"])
-    X = data[["FLOW"]].values
 
-    # 对数值列进行核密度估计
-    kde = KernelDensity(kernel="gaussian", bandwidth=0.5)
-    kde.fit(X)
+    def __init__(self, data: pd.DataFrame, bandwidth: float = 0.5, by: Optional[str] = None):
+        """
+        Args:
+            data: 包含 FLOW 列的数据，FLOW 缺失的行会被丢弃，其余行作为每帧的模板
+            bandwidth: 高斯核的带宽
+            by: 分组列名，为空时不分组
+        """
+        self.template = data.dropna(subset=["FLOW"])
+        self.bandwidth = bandwidth
+        self.by = by
+
+        flows = self.template["FLOW"].to_numpy(dtype=np.float64)
+        if by is None:
+            codes = np.zeros(len(flows), dtype=np.int64)
+        else:
+            codes = pd.factorize(self.template[by])[0].astype(np.int64)
+
+        # 观测值按分组排序，每组占一段连续区间 [start, start + count)
+        order = np.argsort(codes, kind="stable")
+        self.values = flows[order]
+        counts = np.bincount(codes)
+        starts = np.cumsum(counts) - counts
+        # 模板每行对应的取样区间
+        self.row_start = starts[codes]
+        self.row_count = counts[codes]
+
+    def __len__(self) -> int:
+        return len(self.template)
+
+    def sample(self, n_ticks: int = 1, random_state=None) -> np.ndarray:
+        """
+        一次生成多个 tick 的 FLOW
+
+        Args:
+            n_ticks: tick 数
+            random_state: 随机种子或 np.random.Generator
+
+        Returns:
+            形状为 (n_ticks, 模板行数) 的数组
+        """
+        rng = np.random.default_rng(random_state)
+        shape = (n_ticks, len(self.template))
+        picks = self.row_start + (rng.random(shape) * self.row_count).astype(np.int64)
+        return self.values[picks] + rng.normal(scale=self.bandwidth, size=shape)
+
+    def frames(
+        self, n_ticks: Optional[int] = None, batch_ticks: int = 64, random_state=None
+    ) -> Iterator[pd.DataFrame]:
+        """
+        惰性地逐帧生成合成数据，每次生成 batch_ticks 帧的样本
+
+        Args:
+            n_ticks: 帧数，为空时无限生成
+            batch_ticks: 每批生成的帧数
+            random_state: 随机种子或 np.random.Generator
+
+        Yields:
+            模板的浅复制，FLOW 列替换为合成值 (其他列与模板共享，不应原地修改)
+        """
+        rng = np.random.default_rng(random_state)
+        remaining = n_ticks
+        while remaining is None or remaining > 0:
+            batch = batch_ticks if remaining is None else min(batch_ticks, remaining)
+            for flows in self.sample(batch, rng):
+                frame = self.template.copy(deep=False)
+                frame["FLOW"] = flows
+                yield frame
+            if remaining is not None:
+                remaining -= batch
+
 
-    # 生成新的 FLOW 数据
-    n_samples = len(data)  # 保持与原始数据相同的行数
-    new_flows = kde.sample(n_samples=n_samples).flatten()
+def data_fingerprint(data: pd.DataFrame, bandwidth: float = 0.5, by: Optional[str] = None) -> str:
+    """
+    合成器的缓存键：只由决定分布的列 (FLOW 和分组列) 及拟合参数生成，其他列不影响取样
+    """
+    digest = hashlib.sha1(f"{len(data)}|{bandwidth}|{by}".encode())
+    for column in ["FLOW"] if by is None else ["FLOW", by]:
+        values = data[column]
+        if values.dtype == object:
+            values = pd.util.hash_pandas_object(values, index=False)
+        digest.update(np.ascontiguousarray(values.to_numpy()).tobytes())
+    return digest.hexdigest()
+
+
+_synthesizers: "OrderedDict[str, FlowSynthesizer]" = OrderedDict()
+_synthesizers_lock = threading.Lock()
+
+
+def get_synthesizer(data: pd.DataFrame, bandwidth: float = 0.5, by: Optional[str] = None) -> FlowSynthesizer:
+    """
+    返回该数据对应的合成器，FLOW (和分组列) 相同的数据只拟合一次，按指纹缓存最近使用的
+    SYNTHESIZER_CACHE_SIZE 个；缓存命中时 frames() 的模板为首次拟合时的数据
+    """
+    key = data_fingerprint(data, bandwidth, by)
+    with _synthesizers_lock:
+        synthesizer = _synthesizers.get(key)
+        if synthesizer is not None:
+            _synthesizers.move_to_end(key)
+            return synthesizer
+
+    synthesizer = FlowSynthesizer(data, bandwidth, by)
+    with _synthesizers_lock:
+        _synthesizers[key] = synthesizer
+        while len(_synthesizers) > SYNTHESIZER_CACHE_SIZE:
+            _synthesizers.popitem(last=False)
+    return synthesizer
+
+
+def simulate_flow(data: pd.DataFrame, random_state=None):
+    """
+    根据道路速度数据生成合成数据
+    Note: data 必须包含 'FLOW' 列
+    """
+    # 删除缺失值后对 FLOW 做核密度估计 (带宽0.5)，FLOW 相同的数据只拟合一次
+    synthesizer = get_synthesizer(data)
 
-    # 创建新的数据集，复制原始数据的所有列
-    new_dataset = data.copy()
+    # 创建新的数据集，复制原始数据的所有列，FLOW 替换为合成值 (保持与原始数据相同的行数)
+    # 替换 FLOW 列不会修改原始数据，其他列只需浅复制
+    valid = data["FLOW"].notna().to_numpy()
+    new_dataset = data.copy(deep=False) if valid.all() else data.loc[valid].copy(deep=False)
+    new_dataset["FLOW"] = synthesizer.sample(1, random_state)[0]
 
-    # 更新 FLOW 列
-    new_dataset["FLOW"] = new_flows
-    
     return new_dataset
@@ -0,0 +1,299 @@
+"""
+道路速度历史数据的列式存储
+
+CSV (road_speed.csv 及之后的新数据) 经 ingest 转换为按日期分区的 Parquet 数据集，
+再按 路段 × 小时 × PERIOD 和 区域 (SECT10_NAME) × 小时 × PERIOD 预先聚合为数据立方，
+查询直接读取内存中的立方，不再扫描原始数据。
+
+用法: python -m services.road.speed_store ingest public/road_speed.csv [更多CSV...]
+      python -m services.road.speed_store build
+"""
+import argparse
+import fcntl
+import hashlib
+import os
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# 原始数据列及其存储类型 (按取值范围降低精度)
+RECORD_SCHEMA = pa.schema(
+    [
+        ("ROADSECT_ID", pa.int32()),
+        ("PERIOD", pa.int8()),
+        ("hour", pa.int8()),
+        ("GOLEN", pa.float32()),
+        ("GOTIME", pa.float32()),
+        ("GOCOUNT", pa.int32()),
+        ("SPEED", pa.float32()),
+        ("TIME", pa.timestamp("s")),
+        ("date", pa.string()),
+    ]
+)
+
+# 数据立方的度量列
+CUBE_MEASURES = [
+    "records",
+    "vehicles",
+    "avg_speed",
+    "avg_travel_time",
+    "speed_p15",
+    "speed_p50",
+    "speed_p85",
+    "travel_time_p95",
+]
+
+
+def read_speed_csv(path: str) -> pd.DataFrame:
+    """
+    读取道路速度CSV，转换为存储类型并计算小时、日期和速度 (km/h)
+
+    GOTIME 为0的记录无法计算速度，会被丢弃。
+    """
+    df = pd.read_csv(
+        path,
+        usecols=["ROADSECT_ID", "PERIOD", "GOLEN", "GOTIME", "GOCOUNT", "TIME"],
+        dtype={
+            "ROADSECT_ID": "int32",
+            "PERIOD": "int8",
+            "GOLEN": "float32",
+            "GOTIME": "float32",
+            "GOCOUNT": "int32",
+        },
+        parse_dates=["TIME"],
+    )
+    df = df[df["GOTIME"] > 0]
+    df["hour"] = df["TIME"].dt.hour.astype("int8")
+    df["date"] = df["TIME"].dt.strftime("%Y-%m-%d")
+    df["SPEED"] = (df["GOLEN"] / df["GOTIME"] * 3.6).astype("float32")
+    return df
+
+
+def ingest_csv(path: str, store_dir: str) -> int:
+    """
+    把一个CSV文件写入按日期分区的 Parquet 数据集
+
+    文件名由CSV内容的哈希生成，重复导入同一文件会覆盖之前的结果而不会产生重复数据。
+
+    Args:
+        path: CSV文件路径
+        store_dir: 存储目录
+
+    Returns:
+        导入的记录数
+    """
+    with open(path, "rb") as f:
+        digest = hashlib.sha1(f.read()).hexdigest()[:16]
+
+    df = read_speed_csv(path)
+    table = pa.Table.from_pandas(df[RECORD_SCHEMA.names], schema=RECORD_SCHEMA, preserve_index=False)
+    pq.write_to_dataset(
+        table,
+        root_path=os.path.join(store_dir, "records"),
+        partition_cols=["date"],
+        basename_template=f"{digest}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+    return len(df)
+
+
+def _aggregate(df: pd.DataFrame, keys: List[str]) -> pd.DataFrame:
+    """按 keys 聚合记录，返回按 keys 排序的数据立方"""
+    grouped = df.groupby(keys, observed=True, sort=True)
+    cube = grouped.agg(
+        records=("SPEED", "size"),
+        vehicles=("GOCOUNT", "sum"),
+        golen=("GOLEN", "sum"),
+        gotime=("GOTIME", "sum"),
+        avg_travel_time=("GOTIME", "mean"),
+    )
+    # 平均速度为总里程/总耗时 (空间平均速度)，不是各记录速度的算术平均
+    cube["avg_speed"] = cube["golen"] / cube["gotime"] * 3.6
+    speed = grouped["SPEED"].quantile([0.15, 0.5, 0.85]).unstack()
+    cube["speed_p15"], cube["speed_p50"], cube["speed_p85"] = speed[0.15], speed[0.5], speed[0.85]
+    cube["travel_time_p95"] = grouped["GOTIME"].quantile(0.95)
+    return cube[CUBE_MEASURES].astype({"records": "int32", "vehicles": "int64"}).reset_index()
+
+
+def _write_cube(cube: pd.DataFrame, path: str):
+    """写入数据立方 (先写临时文件再替换，读者不会读到写了一半的文件)"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    cube.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def build_cubes(store_dir: str, road_info_path: str):
+    """
+    由 Parquet 数据集重新生成 路段 和 区域 两个数据立方 (区域立方最后写入，存在即表示生成完成)
+
+    Args:
+        store_dir: 存储目录
+        road_info_path: 路段信息CSV，提供路段所属区域 (SECT10_NAME)
+    """
+    records = pq.read_table(
+        os.path.join(store_dir, "records"),
+        columns=["ROADSECT_ID", "PERIOD", "hour", "GOLEN", "GOTIME", "GOCOUNT", "SPEED"],
+    ).to_pandas()
+    road_info = pd.read_csv(
+        road_info_path, usecols=["ROADSECT_ID", "SECT10_NAME"], dtype={"ROADSECT_ID": "int32"}
+    ).drop_duplicates("ROADSECT_ID")
+
+    cube_dir = os.path.join(store_dir, "cubes")
+    os.makedirs(cube_dir, exist_ok=True)
+    _write_cube(_aggregate(records, ["ROADSECT_ID", "hour", "PERIOD"]), os.path.join(cube_dir, "section.parquet"))
+    _write_cube(
+        _aggregate(records.merge(road_info, on="ROADSECT_ID"), ["SECT10_NAME", "hour", "PERIOD"]),
+        os.path.join(cube_dir, "district.parquet"),
+    )
+
+
+class _Cube:
+    """按第一个键排序的数据立方，查询为对排序键的二分查找"""
+
+    def __init__(self, df: pd.DataFrame, key: str):
+        self.keys = df[key].to_numpy()
+        self.hours = df["hour"].to_numpy()
+        self.periods = df["PERIOD"].to_numpy()
+        self.measures = {name: df[name].to_numpy() for name in CUBE_MEASURES}
+
+    def query(self, key, hour: Optional[int] = None, period: Optional[int] = None) -> Optional[List[Dict]]:
+        """返回该键的所有单元格 (可按小时和 PERIOD 过滤)，键不存在时返回 None"""
+        lo = np.searchsorted(self.keys, key, side="left")
+        hi = np.searchsorted(self.keys, key, side="right")
+        if lo == hi:
+            return None
+        rows = np.arange(lo, hi)
+        if hour is not None:
+            rows = rows[self.hours[rows] == hour]
+        if period is not None:
+            rows = rows[self.periods[rows] == period]
+        return [
+            {
+                "hour": int(self.hours[row]),
+                "period": int(self.periods[row]),
+                "records": int(self.measures["records"][row]),
+                "vehicles": int(self.measures["vehicles"][row]),
+                **{
+                    name: round(float(self.measures[name][row]), 2)
+                    for name in CUBE_MEASURES[2:]
+                },
+            }
+            for row in rows.tolist()
+        ]
+
+
+class RoadSpeedStore:
+    """道路速度数据立方的只读查询接口"""
+
+    def __init__(self, store_dir: str):
+        """
+        Args:
+            store_dir: 存储目录，需已由 build_cubes() 生成数据立方
+        """
+        cube_dir = os.path.join(store_dir, "cubes")
+        self.sections = _Cube(pd.read_parquet(os.path.join(cube_dir, "section.parquet")), "ROADSECT_ID")
+        district = pd.read_parquet(os.path.join(cube_dir, "district.parquet"))
+        self.districts = _Cube(district, "SECT10_NAME")
+        self.district_names = sorted(district["SECT10_NAME"].unique().tolist())
+
+    @classmethod
+    def open(cls, store_dir: str, csv_path: str, road_info_path: str) -> "RoadSpeedStore":
+        """
+        打开存储，尚未生成数据立方时先导入 csv_path 并生成
+
+        多个进程同时首次打开时，只有持有存储目录下 build.lock 文件锁的进程生成，其余进程等待锁释放后
+        直接读取生成的结果。
+
+        Args:
+            store_dir: 存储目录
+            csv_path: 首次生成时导入的道路速度CSV
+            road_info_path: 路段信息CSV
+        """
+        done_path = os.path.join(store_dir, "cubes", "district.parquet")
+        if not os.path.exists(done_path):
+            os.makedirs(store_dir, exist_ok=True)
+            lock_fd = os.open(os.path.join(store_dir, "build.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX)
+                # 等待锁期间其他进程可能已经生成
+                if not os.path.exists(done_path):
+                    ingest_csv(csv_path, store_dir)
+                    build_cubes(store_dir, road_info_path)
+            finally:
+                os.close(lock_fd)
+        return cls(store_dir)
+
+    def section(self, roadsect_id: int, hour: Optional[int] = None, period: Optional[int] = None):
+        """路段各 小时×PERIOD 的速度、行程时间统计，路段不存在时返回 None"""
+        return self.sections.query(roadsect_id, hour, period)
+
+    def district(self, name: str, hour: Optional[int] = None, period: Optional[int] = None):
+        """区域 (SECT10_NAME) 各 小时×PERIOD 的速度、行程时间统计，区域不存在时返回 None"""
+        return self.districts.query(name, hour, period)
+
+    def hourly_speed(self, roadsect_ids: Sequence) -> np.ndarray:
+        """
+        各路段每小时的平均速度 (各 PERIOD 按记录数加权)，用作预测的先验
+
+        Args:
+            roadsect_ids: 路段ID列表，无法转换为整数或没有数据的路段为 NaN
+
+        Returns:
+            形状为 (24, 路段数) 的数组
+        """
+        cube = self.sections
+        records = cube.measures["records"]
+        weighted = pd.DataFrame(
+            {
+                "key": cube.keys,
+                "hour": cube.hours,
+                "speed": cube.measures["avg_speed"] * records,
+                "records": records,
+            }
+        ).groupby(["key", "hour"]).sum()
+        table = (weighted["speed"] / weighted["records"]).unstack("hour").reindex(columns=range(24))
+
+        keys = pd.to_numeric(pd.Series(list(roadsect_ids), dtype=object), errors="coerce")
+        return table.reindex(keys).to_numpy(dtype=np.float64).T
+
+    def road_hourly_speed(self, road_names: Sequence[str], road_info_path: str) -> np.ndarray:
+        """
+        按道路名称匹配路段后的每小时平均速度，名称与路网构建 (geoservice) 一样经路段的起止道路名称
+        映射到 ROADSECT_ID
+
+        Args:
+            road_names: 按道路下标排列的道路名称
+            road_info_path: 路段信息CSV
+
+        Returns:
+            形状为 (24, 道路数) 的数组，没有匹配路段或没有数据的道路为 NaN
+        """
+        from services.road.geoservice import attach_roadsect_id, build_roadsect_mapping
+
+        road_info = pd.read_csv(road_info_path, usecols=["ROADSECT_ID", "ROADSECT_FROM", "ROADSECT_TO"])
+        roads = attach_roadsect_id(pd.DataFrame({"name": list(road_names)}), build_roadsect_mapping(road_info))
+        speed = np.full((24, len(road_names)), np.nan)
+        speed[:, roads.index.to_numpy()] = self.hourly_speed(roads["ROADSECT_ID"].to_numpy())
+        return speed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["ingest", "build"])
+    parser.add_argument("csv", nargs="*", help="要导入的CSV文件")
+    parser.add_argument("--store", default="cache/road_speed")
+    parser.add_argument("--road-info", default="public/road_info.csv")
+    args = parser.parse_args()
+
+    if args.command == "ingest":
+        for path in args.csv:
+            print(f"{path}: 导入 {ingest_csv(path, args.store)} 条记录")
+    build_cubes(args.store, args.road_info)
+    print(f"数据立方已生成: {os.path.join(args.store, 'cubes')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import mmap
+import os
+import struct
+from typing import Optional, Tuple
+
+MAGIC = b"TRB1"
+
+# 文件头: 魔数, 槽位数, 槽位大小, 最新记录序号
+_HEADER = struct.Struct("<4sIQQ")
+HEADER_SIZE = 64
+
+# 槽位头: 版本号, 数据长度
+_SLOT_HEADER = struct.Struct("<QQ")
+
+
+class RingBuffer:
+    """
+    基于 mmap 文件的单写多读环形缓冲区
+
+    写入方按序号把记录写入 seq % slots 号槽位，读取方只读取最新的记录。每个槽位带版本号
+    (seqlock)：写入前把版本号设为奇数 2*seq+1，写完后设为偶数 2*seq+2；读取方在复制数据
+    前后各读一次版本号，两次一致且为 2*seq+2 才说明读到的是完整的记录。
+    多个槽位保证读取方在复制最新记录时，写入方写的是另一个槽位。
+
+    记录超过槽位大小时写入方扩大槽位 (重新布局整个文件)，文件头记录当前的槽位数和槽位大小，
+    读取方发现布局变化后按文件头重新映射。
+    """
+
+    def __init__(self, path: str, slots: int = 4, slot_size: int = 64 * 1024 * 1024):
+        """
+        Args:
+            path: 共享文件路径 (建议位于 /dev/shm)
+            slots: 槽位数
+            slot_size: 每个槽位的初始大小 (字节)，写入更大的记录时自动扩大
+        """
+        self.path = path
+        self._mm: Optional[mmap.mmap] = None
+        self._map(slots, slot_size)
+
+    def _map(self, slots: int, slot_size: int):
+        """按给定布局映射文件，文件小于布局大小时扩展 (不会清空已有内容)"""
+        size = HEADER_SIZE + slots * (_SLOT_HEADER.size + slot_size)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+            mm = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        if self._mm is not None:
+            self._mm.close()
+        self._mm = mm
+        self.slots = slots
+        self.slot_size = slot_size
+        self.size = size
+
+    def _header(self) -> Tuple[bytes, int, int, int]:
+        return _HEADER.unpack_from(self._mm, 0)
+
+    def _follow_layout(self) -> bool:
+        """文件头中的布局与当前映射不同时 (写入方扩大了槽位) 按文件头重新映射，返回布局是否变化"""
+        magic, slots, slot_size, _ = self._header()
+        if magic != MAGIC or (slots, slot_size) == (self.slots, self.slot_size) or not slots:
+            return False
+        self._map(slots, slot_size)
+        return True
+
+    def initialize(self):
+        """
+        写入方启动时调用
+
+        文件头有效时沿用其中的布局和最新序号 (接替的写入方继续递增序号，读取方不会把新记录误认为
+        已读过的记录)，槽位比文件头中的小时保留较大的槽位；否则写入新的文件头并清空所有槽位。
+        """
+        magic, slots, slot_size, seq = self._header()
+        if magic == MAGIC and seq > 0 and slots == self.slots and slot_size >= self.slot_size:
+            self._follow_layout()
+            return
+        self._reset(self.slots, self.slot_size, 0)
+
+    def _reset(self, slots: int, slot_size: int, seq: int):
+        """按新布局写入文件头 (保留序号) 并清空所有槽位"""
+        self._map(slots, slot_size)
+        for slot in range(slots):
+            _SLOT_HEADER.pack_into(self._mm, self._slot_offset(slot), 0, 0)
+        _HEADER.pack_into(self._mm, 0, MAGIC, slots, slot_size, seq)
+
+    def _slot_offset(self, slot: int) -> int:
+        return HEADER_SIZE + slot * (_SLOT_HEADER.size + self.slot_size)
+
+    def latest(self) -> int:
+        """最新记录的序号，尚无记录或文件头无效时返回 0"""
+        magic, _, _, seq = self._header()
+        if magic != MAGIC:
+            return 0
+        return seq
+
+    def write(self, data: bytes) -> int:
+        """
+        写入一条记录 (只能由一个进程调用)
+
+        记录超过槽位大小时把槽位扩大到记录大小的 1.5 倍 (按 MB 取整)，扩大时各槽位中的旧记录被清空
+
+        Returns:
+            记录的序号
+        """
+        seq = self.latest() + 1
+        if len(data) > self.slot_size:
+            slot_size = -(-len(data) * 3 // 2 // (1 << 20)) << 20
+            self._reset(self.slots, slot_size, seq - 1)
+
+        offset = self._slot_offset(seq % self.slots)
+        start = offset + _SLOT_HEADER.size
+        _SLOT_HEADER.pack_into(self._mm, offset, 2 * seq + 1, 0)
+        self._mm[start:start + len(data)] = data
+        _SLOT_HEADER.pack_into(self._mm, offset, 2 * seq + 2, len(data))
+        _HEADER.pack_into(self._mm, 0, MAGIC, self.slots, self.slot_size, seq)
+        return seq
+
+    def read_latest(self, retries: int = 3) -> Optional[Tuple[int, bytes]]:
+        """
+        读取最新的完整记录
+
+        Returns:
+            (序号, 数据)，尚无记录或多次重试仍与写入冲突时返回 None
+        """
+        for _ in range(retries):
+            self._follow_layout()
+            seq = self.latest()
+            if seq == 0:
+                return None
+            offset = self._slot_offset(seq % self.slots)
+            version, length = _SLOT_HEADER.unpack_from(self._mm, offset)
+            if version != 2 * seq + 2 or length > self.slot_size:
+                continue
+            start = offset + _SLOT_HEADER.size
+            data = self._mm[start:start + length]
+            # 复制期间槽位被改写或布局变化 (写入方扩大槽位) 时重试
+            _, slots, slot_size, _ = self._header()
+            if (
+                _SLOT_HEADER.unpack_from(self._mm, offset)[0] == version
+                and (slots, slot_size) == (self.slots, self.slot_size)
+            ):
+                return seq, data
+        return None
+
+    def close(self):
+        self._mm.close()
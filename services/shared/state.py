@@ -0,0 +1,86 @@
+import fcntl
+import logging
+import os
+import pickle
+from typing import Optional, Tuple
+
+import numpy as np
+
+from services.data.snapshot import TrafficSnapshot
+from services.monitoring.metrics import metrics
+from services.shared.ring_buffer import RingBuffer
+
+logger = logging.getLogger(__name__)
+
+# 增量推送状态: (序号, 流量基线, 速度基线, 拥堵等级基线)
+DeltaState = Tuple[int, np.ndarray, np.ndarray, np.ndarray]
+
+
+class SharedState:
+    """
+    多进程 (uvicorn --workers N) 共享的交通状态
+
+    各 worker 启动时竞争同一个文件锁，拿到锁的进程成为生产者：运行模拟，把每个 tick 的快照、
+    道路流量增量消息和增量推送状态 pickle 后写入环形缓冲区。其余进程为读者，只轮询缓冲区中的
+    最新记录，不运行模拟。生产者退出后文件锁被释放，读者可以重新竞争并接替生产者。
+    """
+
+    def __init__(self, path: str, slots: int = 4, slot_size: int = 64 * 1024 * 1024):
+        """
+        Args:
+            path: 共享文件路径，文件锁为 "<path>.lock"
+            slots: 环形缓冲区槽位数
+            slot_size: 每个槽位的初始字节数，记录更大时生产者自动扩大槽位
+        """
+        self.ring = RingBuffer(path, slots=slots, slot_size=slot_size)
+        self.is_producer = False
+        self._lock_fd = os.open(f"{path}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+
+    def try_become_producer(self) -> bool:
+        """尝试获取生产者锁 (非阻塞)，已是生产者时直接返回 True"""
+        if self.is_producer:
+            return True
+        try:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+
+        self.ring.initialize()
+        self.is_producer = True
+        logger.info(f"进程 {os.getpid()} 成为共享状态的生产者")
+        return True
+
+    def publish(self, snapshot: TrafficSnapshot, delta_data: str, delta_state: DeltaState) -> int:
+        """
+        写入本 tick 的记录 (只有生产者可以调用)
+
+        Returns:
+            记录序号
+        """
+        with metrics.timer("shared_state.publish"):
+            data = pickle.dumps((snapshot, delta_data, delta_state), protocol=pickle.HIGHEST_PROTOCOL)
+            seq = self.ring.write(data)
+        metrics.increment("shared_state.published_bytes", len(data))
+        return seq
+
+    def read(self, last_seq: int) -> Optional[Tuple[int, TrafficSnapshot, str, DeltaState]]:
+        """
+        读取最新记录
+
+        Args:
+            last_seq: 已读取的记录序号
+
+        Returns:
+            (序号, 快照, 增量消息, 增量推送状态)，没有新记录时返回 None
+        """
+        # 序号与上次不同即为新记录 (共享文件被重建时序号会从头开始)
+        if self.ring.latest() in (0, last_seq):
+            return None
+        record = self.ring.read_latest()
+        if record is None or record[0] == last_seq:
+            return None
+
+        seq, data = record
+        with metrics.timer("shared_state.read"):
+            snapshot, delta_data, delta_state = pickle.loads(data)
+        return seq, snapshot, delta_data, delta_state
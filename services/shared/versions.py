@@ -0,0 +1,47 @@
+import mmap
+import os
+import zlib
+
+import numpy as np
+
+
+class VersionSlots:
+    """
+    基于 mmap 文件、多进程共享的版本号
+
+    键 (如用户名) 按哈希映射到固定数量的槽位，每个槽位是一个 64 位版本号。修改键对应的数据后调用
+    bump() 写入一个新的随机版本号；缓存数据时记下当时的版本号，读取缓存前比较版本号即可发现其他
+    进程的修改。写入随机值而不是加一，并发修改时也不会丢失更新；不同的键落在同一槽位时只会多一次
+    缓存失效。
+    """
+
+    def __init__(self, path: str, slots: int = 65536):
+        """
+        Args:
+            path: 共享文件路径 (建议位于 /dev/shm)
+            slots: 槽位数
+        """
+        self.path = path
+        self.slots = slots
+        size = slots * 8
+
+        # 各进程都以相同大小打开文件，文件已存在时不会清空内容
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+            self._mmap = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        self._versions = np.frombuffer(self._mmap, dtype=np.uint64, count=slots)
+
+    def slot(self, key: str) -> int:
+        return zlib.crc32(key.encode("utf-8")) % self.slots
+
+    def get(self, key: str) -> int:
+        """键当前的版本号"""
+        return int(self._versions[self.slot(key)])
+
+    def bump(self, key: str):
+        """把键的版本号改为新的随机值，使所有进程中该键的缓存失效"""
+        self._versions[self.slot(key)] = int.from_bytes(os.urandom(8), "little")
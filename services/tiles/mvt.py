@@ -0,0 +1,141 @@
+"""
+Mapbox Vector Tile (v2.1) 最小编码器
+
+只实现道路流量瓦片需要的部分：线要素、字符串/整数/浮点属性。
+协议定义见 https://github.com/mapbox/vector-tile-spec/blob/master/2.1/vector_tile.proto
+"""
+import struct
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import shapely
+
+# 几何类型
+GEOM_LINESTRING = 2
+
+# 几何命令
+_CMD_MOVE_TO = 1
+_CMD_LINE_TO = 2
+
+# protobuf 字段类型
+_WIRE_VARINT = 0
+_WIRE_FIXED64 = 1
+_WIRE_BYTES = 2
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        bits = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(bits | 0x80)
+        else:
+            out.append(bits)
+            return bytes(out)
+
+
+def _key(field: int, wire_type: int) -> bytes:
+    return _varint((field << 3) | wire_type)
+
+
+def _bytes_field(field: int, payload: bytes) -> bytes:
+    return _key(field, _WIRE_BYTES) + _varint(len(payload)) + payload
+
+
+def _packed(field: int, values: Iterable[int]) -> bytes:
+    return _bytes_field(field, b"".join(_varint(v) for v in values))
+
+
+def _zigzag(values: np.ndarray) -> np.ndarray:
+    return (values << 1) ^ (values >> 63)
+
+
+def encode_line_geometry(geometry: Any) -> Optional[bytes]:
+    """
+    将瓦片坐标系下的线几何编码为 MVT 几何命令 (packed uint32)
+
+    坐标四舍五入为整数，连续重复的点会被去除，少于两个不同点的线段被丢弃。
+
+    Returns:
+        packed 几何命令的字节串，几何为空时返回 None
+    """
+    commands: List[int] = []
+    cursor = np.zeros(2, dtype=np.int64)
+    for part in shapely.get_parts(geometry):
+        if shapely.get_type_id(part) != 1:  # 只处理 LineString
+            continue
+        points = np.rint(shapely.get_coordinates(part)).astype(np.int64)
+        if len(points) < 2:
+            continue
+        # 去除量化后连续重复的点
+        keep = np.ones(len(points), dtype=bool)
+        keep[1:] = np.any(points[1:] != points[:-1], axis=1)
+        points = points[keep]
+        if len(points) < 2:
+            continue
+
+        deltas = np.diff(np.vstack([cursor, points]), axis=0)
+        encoded = _zigzag(deltas).ravel().tolist()
+        commands.append((_CMD_MOVE_TO & 0x7) | (1 << 3))
+        commands.extend(encoded[:2])
+        commands.append((_CMD_LINE_TO & 0x7) | ((len(points) - 1) << 3))
+        commands.extend(encoded[2:])
+        cursor = points[-1]
+
+    if not commands:
+        return None
+    return b"".join(_varint(v) for v in commands)
+
+
+def _encode_value(value: Any) -> bytes:
+    """编码 Value 消息"""
+    if isinstance(value, str):
+        return _bytes_field(1, value.encode("utf-8"))
+    if isinstance(value, bool):
+        return _key(7, _WIRE_VARINT) + _varint(int(value))
+    if isinstance(value, int):
+        if value >= 0:
+            return _key(5, _WIRE_VARINT) + _varint(value)
+        return _key(6, _WIRE_VARINT) + _varint(int(_zigzag(np.int64(value))))
+    return _key(3, _WIRE_FIXED64) + struct.pack("<d", float(value))
+
+
+def encode_layer(
+    name: str,
+    features: Sequence[Tuple[int, int, bytes, Dict[str, Any]]],
+    extent: int = 4096,
+) -> bytes:
+    """
+    编码一个图层 (Tile.layers)
+
+    Args:
+        name: 图层名称
+        features: (要素ID, 几何类型, encode_line_geometry() 的结果, 属性) 列表
+        extent: 瓦片坐标范围
+    """
+    keys: Dict[str, int] = {}
+    values: Dict[Tuple[type, Any], int] = {}
+    encoded_features = []
+
+    for feature_id, geom_type, geometry, properties in features:
+        tags = []
+        for key, value in properties.items():
+            if value is None:
+                continue
+            tags.append(keys.setdefault(key, len(keys)))
+            tags.append(values.setdefault((type(value), value), len(values)))
+        body = (
+            _key(1, _WIRE_VARINT) + _varint(feature_id)
+            + _packed(2, tags)
+            + _key(3, _WIRE_VARINT) + _varint(geom_type)
+            + _bytes_field(4, geometry)
+        )
+        encoded_features.append(_bytes_field(2, body))
+
+    layer = [_key(15, _WIRE_VARINT) + _varint(2), _bytes_field(1, name.encode("utf-8"))]
+    layer.extend(encoded_features)
+    layer.extend(_bytes_field(3, key.encode("utf-8")) for key in keys)
+    layer.extend(_bytes_field(4, _encode_value(value)) for _, value in values)
+    layer.append(_key(5, _WIRE_VARINT) + _varint(extent))
+    return _bytes_field(3, b"".join(layer))
@@ -0,0 +1,182 @@
+import math
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import numpy as np
+import shapely
+
+from services.data.road_state import RoadState
+from services.data.spatial_index import SpatialIndex
+from services.tiles.mvt import GEOM_LINESTRING, encode_layer, encode_line_geometry
+
+# 瓦片的最大缩放级别
+MAX_ZOOM = 22
+
+# 图层名称
+LAYER_NAME = "road_flow"
+
+TileKey = Tuple[int, int, int]
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """返回瓦片的经纬度范围 (min_lng, min_lat, max_lng, max_lat)"""
+    n = 2 ** z
+    min_lng = x / n * 360.0 - 180.0
+    max_lng = (x + 1) / n * 360.0 - 180.0
+    max_lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    min_lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return min_lng, min_lat, max_lng, max_lat
+
+
+def is_valid_tile(z: int, x: int, y: int) -> bool:
+    return 0 <= z <= MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+class RoadTileCache:
+    """
+    道路流量矢量瓦片
+
+    瓦片内道路的裁剪几何按 (z, x, y) 缓存，不随 tick 变化；每个 tick 只刷新流量属性。
+    编码好的瓦片按 tick 缓存，同一 tick 内的重复请求直接返回缓存。缓存的读写由锁保护，可以在线程池中并发编码。
+    """
+
+    def __init__(
+        self,
+        road_state: RoadState,
+        road_index: SpatialIndex,
+        extent: int = 4096,
+        buffer: int = 64,
+        max_geometry_tiles: int = 4096,
+        max_tiles: int = 1024,
+    ):
+        """
+        Args:
+            road_state: 道路状态，提供道路ID和名称
+            road_index: 道路几何的空间索引，下标与 road_state 一致
+            extent: 瓦片坐标范围
+            buffer: 瓦片边缘外保留的缓冲范围 (瓦片坐标)
+            max_geometry_tiles: 缓存裁剪几何的瓦片数上限
+            max_tiles: 缓存编码结果的瓦片数上限
+        """
+        self.ids = road_state.ids
+        self.names = road_state.names
+        self.road_index = road_index
+        self.extent = extent
+        self.buffer = buffer
+        self.max_geometry_tiles = max_geometry_tiles
+        self.max_tiles = max_tiles
+
+        self._geometry_cache: "OrderedDict[TileKey, List[Tuple[int, bytes]]]" = OrderedDict()
+        self._tile_cache: "OrderedDict[TileKey, Tuple[int, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _to_tile_coordinates(self, z: int, x: int, y: int):
+        """返回把经纬度坐标转换为该瓦片坐标系的函数"""
+        n = 2 ** z
+        extent = self.extent
+
+        def transform(coordinates: np.ndarray) -> np.ndarray:
+            lng = coordinates[:, 0]
+            lat = np.clip(coordinates[:, 1], -85.0511, 85.0511)
+            tile_x = (lng + 180.0) / 360.0 * n
+            lat_rad = np.radians(lat)
+            tile_y = (1.0 - np.log(np.tan(lat_rad) + 1.0 / np.cos(lat_rad)) / math.pi) / 2.0 * n
+            return np.column_stack([(tile_x - x) * extent, (tile_y - y) * extent])
+
+        return transform
+
+    def tile_geometry(self, z: int, x: int, y: int) -> List[Tuple[int, bytes]]:
+        """返回瓦片内每条道路的 (道路下标, 编码后的裁剪几何)，结果会被缓存"""
+        key = (z, x, y)
+        with self._lock:
+            cached = self._geometry_cache.get(key)
+            if cached is not None:
+                self._geometry_cache.move_to_end(key)
+                return cached
+
+        min_lng, min_lat, max_lng, max_lat = tile_bounds(z, x, y)
+        margin_lng = (max_lng - min_lng) * self.buffer / self.extent
+        margin_lat = (max_lat - min_lat) * self.buffer / self.extent
+        candidates = self.road_index.query(
+            (min_lng - margin_lng, min_lat - margin_lat, max_lng + margin_lng, max_lat + margin_lat)
+        )
+
+        features = []
+        if len(candidates):
+            transformed = shapely.transform(
+                self.road_index.geometries[candidates], self._to_tile_coordinates(z, x, y)
+            )
+            clipped = shapely.clip_by_rect(
+                transformed, -self.buffer, -self.buffer, self.extent + self.buffer, self.extent + self.buffer
+            )
+            for index, geometry in zip(candidates.tolist(), clipped):
+                if geometry is None or geometry.is_empty:
+                    continue
+                encoded = encode_line_geometry(geometry)
+                if encoded is not None:
+                    features.append((index, encoded))
+
+        with self._lock:
+            self._geometry_cache[key] = features
+            if len(self._geometry_cache) > self.max_geometry_tiles:
+                self._geometry_cache.popitem(last=False)
+        return features
+
+    def encode_tile(
+        self,
+        tick: int,
+        z: int,
+        x: int,
+        y: int,
+        flow: np.ndarray,
+        speed: np.ndarray,
+        congestion: np.ndarray,
+    ) -> bytes:
+        """
+        编码瓦片，同一 tick 内的重复请求直接返回缓存
+
+        Args:
+            tick: 道路状态对应的快照序号
+            z, x, y: 瓦片坐标
+            flow, speed, congestion: 该 tick 的道路状态数组
+        """
+        key = (z, x, y)
+        with self._lock:
+            cached: Optional[Tuple[int, bytes]] = self._tile_cache.get(key)
+            if cached is not None and cached[0] == tick:
+                self._tile_cache.move_to_end(key)
+                return cached[1]
+
+        features = self.tile_geometry(z, x, y)
+        indices = [index for index, _ in features]
+        flows = flow[indices].tolist()
+        speeds = speed[indices].tolist()
+        levels = congestion[indices].tolist()
+
+        tile = encode_layer(
+            LAYER_NAME,
+            [
+                (
+                    index,
+                    GEOM_LINESTRING,
+                    geometry,
+                    {
+                        "id": self.ids[index],
+                        "name": self.names[index],
+                        "FLOW": flow_value,
+                        "SPEED": speed_value,
+                        "CONGESTION": level,
+                    },
+                )
+                for (index, geometry), flow_value, speed_value, level in zip(features, flows, speeds, levels)
+            ],
+            extent=self.extent,
+        )
+
+        with self._lock:
+            self._tile_cache[key] = (tick, tile)
+            self._tile_cache.move_to_end(key)
+            if len(self._tile_cache) > self.max_tiles:
+                self._tile_cache.popitem(last=False)
+        return tile
@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Callable, Deque, Optional, Union
+
+from fastapi import WebSocket
+
+from services.monitoring.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# 队列满时的处理策略
+POLICY_DROP_OLDEST = "drop_oldest"  # 丢弃最早的未发送消息
+POLICY_LATEST = "latest"  # 只保留最新的一条消息
+
+Message = Union[str, bytes]
+
+
+class ClientSender:
+    """
+    单个 WebSocket 连接的发送队列
+
+    广播方只调用 send() 把消息放入有界队列，不等待网络；由连接自己的写任务依次发送。
+    慢客户端的队列写满后按策略丢弃消息，连续丢弃超过阈值时断开该连接。
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        policy: str = POLICY_DROP_OLDEST,
+        max_queue_size: int = 8,
+        max_dropped: int = 32,
+        on_close: Optional[Callable[["ClientSender"], None]] = None,
+    ):
+        """
+        Args:
+            websocket: 已 accept 的连接
+            policy: 队列满时的策略，drop_oldest 或 latest
+            max_queue_size: 队列最大长度 (latest 策略下固定为1)
+            max_dropped: 自上次成功发送以来丢弃的消息数达到该值时断开连接
+            on_close: 连接因发送失败或被驱逐而关闭时的回调
+        """
+        if policy not in (POLICY_DROP_OLDEST, POLICY_LATEST):
+            raise ValueError(f"未知的发送队列策略: {policy}")
+
+        self.websocket = websocket
+        self.policy = policy
+        self.max_queue_size = 1 if policy == POLICY_LATEST else max(1, max_queue_size)
+        self.max_dropped = max_dropped
+        self.on_close = on_close
+        self.dropped = 0  # 自上次成功发送以来丢弃的消息数
+        self.closed = False
+
+        self._queue: Deque[Message] = deque()
+        self._ready = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    def send(self, message: Message) -> bool:
+        """
+        将消息放入发送队列，不会阻塞
+
+        Returns:
+            连接仍然可用时返回 True
+        """
+        if self.closed:
+            return False
+
+        if len(self._queue) >= self.max_queue_size:
+            self._queue.popleft()
+            self.dropped += 1
+            metrics.increment("ws.dropped_frames")
+            if self.dropped >= self.max_dropped:
+                logger.warning(f"客户端连续丢弃 {self.dropped} 条消息，断开慢速连接")
+                metrics.increment("ws.evicted_clients")
+                self._shutdown()
+                asyncio.create_task(self._close_websocket(code=1013))
+                return False
+
+        self._queue.append(message)
+        self._ready.set()
+        return True
+
+    def close(self):
+        """停止写任务 (连接已由调用方断开)"""
+        self.closed = True
+        self._queue.clear()
+        self._task.cancel()
+
+    async def _run(self):
+        """写任务：依次发送队列中的消息"""
+        try:
+            while True:
+                await self._ready.wait()
+                self._ready.clear()
+                while self._queue:
+                    message = self._queue.popleft()
+                    start = time.perf_counter()
+                    if isinstance(message, bytes):
+                        await self.websocket.send_bytes(message)
+                    else:
+                        await self.websocket.send_text(message)
+                    metrics.observe("ws.send", time.perf_counter() - start)
+                    self.dropped = 0
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"发送消息失败: {e}")
+            self._shutdown()
+
+    def _shutdown(self):
+        """标记连接关闭并通知管理器"""
+        if self.closed:
+            return
+        self.close()
+        if self.on_close is not None:
+            self.on_close(self)
+
+    async def _close_websocket(self, code: int):
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
@@ -0,0 +1,108 @@
+import gzip
+import threading
+from typing import Dict, List, Optional, Tuple, Union
+
+import brotli
+
+GZIP = "gzip"
+BROTLI = "br"
+
+# 支持的压缩格式，按优先级排列
+SUPPORTED_ENCODINGS: List[str] = [BROTLI, GZIP]
+
+
+def compress(data: bytes, encoding: str, gzip_level: int = 6, brotli_quality: int = 5) -> bytes:
+    """
+    压缩数据
+
+    Args:
+        data: 原始数据
+        encoding: gzip 或 br
+        gzip_level: gzip 压缩级别 (1-9)
+        brotli_quality: brotli 压缩质量 (0-11)
+    """
+    if encoding == GZIP:
+        # 固定 mtime 使相同内容的压缩结果一致
+        return gzip.compress(data, compresslevel=gzip_level, mtime=0)
+    if encoding == BROTLI:
+        return brotli.compress(data, quality=brotli_quality)
+    raise ValueError(f"不支持的压缩格式: {encoding}")
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    根据 Accept-Encoding 请求头选择压缩格式
+
+    Returns:
+        客户端接受且服务端支持的优先级最高的格式，都不接受时返回 None
+    """
+    if not accept_encoding:
+        return None
+
+    accepted = set()
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                continue
+        if quality > 0:
+            accepted.add(name.strip().lower())
+
+    for encoding in SUPPORTED_ENCODINGS:
+        if encoding in accepted or "*" in accepted:
+            return encoding
+    return None
+
+
+class CompressionCache:
+    """
+    按 tick 缓存的压缩结果
+
+    同一 tick 内每份数据对每种格式只压缩一次，之后所有请求和连接共享压缩结果；
+    出现更新的 tick 时丢弃旧 tick 的缓存。缓存的读写由锁保护，可以在线程池中调用。
+    """
+
+    def __init__(self, gzip_level: int = 6, brotli_quality: int = 5, min_size: int = 1024):
+        """
+        Args:
+            gzip_level: gzip 压缩级别 (1-9)
+            brotli_quality: brotli 压缩质量 (0-11)
+            min_size: 小于该字节数的 HTTP 响应不压缩
+        """
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.min_size = min_size
+
+        self._tick = -1
+        self._entries: Dict[Tuple[int, str, str], bytes] = {}
+        self._lock = threading.Lock()
+
+    def get(self, tick: int, key: str, data: Union[str, bytes], encoding: str) -> bytes:
+        """
+        返回数据的压缩结果，同一 tick 内重复调用直接返回缓存
+
+        Args:
+            tick: 数据对应的快照序号
+            key: 数据在该 tick 内的唯一标识
+            data: 原始数据，str 按 UTF-8 编码
+            encoding: gzip 或 br
+        """
+        cache_key = (tick, key, encoding)
+        with self._lock:
+            if tick > self._tick:
+                self._entries.clear()
+                self._tick = tick
+            cached = self._entries.get(cache_key)
+        if cached is not None:
+            return cached
+
+        raw = data.encode() if isinstance(data, str) else data
+        compressed = compress(raw, encoding, self.gzip_level, self.brotli_quality)
+        with self._lock:
+            if tick == self._tick:
+                self._entries[cache_key] = compressed
+        return compressed
@@ -0,0 +1,18 @@
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，未安装时使用标准库
+    orjson = None
+
+
+def encode_json(obj: Any) -> str:
+    """
+    将消息序列化为紧凑的JSON文本，安装了 orjson 时优先使用
+
+    广播时应只调用一次，再把同一份文本发送给所有连接。
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode()
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
@@ -4,6 +4,9 @@ import asyncio
 import logging
 import time
 
+from services.monitoring.metrics import metrics
+from services.websocket.encoding import encode_json
+
 logger = logging.getLogger(__name__)
 
 
@@ -11,6 +14,7 @@ class ConnectionManager:
     def __init__(self):
         self.active_connections: List[WebSocket] = []
         self.last_data = None  # 存储最后一次发送的数据
+        self.last_text = None  # 最后一次发送数据的JSON文本
         self.connection_count = 0  # 添加连接计数器
     
     async def connect(self, websocket: WebSocket):
@@ -19,17 +23,20 @@ class ConnectionManager:
         self.connection_count += 1
         logger.info(f"服务已连接, 总连接次数 {self.connection_count}")
         
-        # 如果有最新数据，立即发送给新连接的客户端
+        # 如果有最新数据，立即发送给新连接的客户端 (复用已序列化的文本)
         if self.last_data:
-            await self.send_personal_message(self.last_data, websocket)
+            await self._send_text(self.last_text, websocket)
     
     def disconnect(self, websocket: WebSocket):
         self.active_connections.remove(websocket)
         logger.info(f"已断开连接, 总连接次数: {len(self.active_connections)}")
     
     async def send_personal_message(self, message: Dict, websocket: WebSocket):
+        await self._send_text(encode_json(message), websocket)
+    
+    async def _send_text(self, text: str, websocket: WebSocket):
         try:
-            await websocket.send_json(message)
+            await websocket.send_text(text)
         except Exception as e:
             logger.error(f"发送个人信息错误: {e}")
             # 如果发送失败，可能客户端已断开
@@ -37,18 +44,24 @@ class ConnectionManager:
                 self.disconnect(websocket)
     
     async def broadcast(self, message: Dict):
+        # 只序列化一次，所有连接共用同一份文本
+        with metrics.timer("manager.broadcast.encode"):
+            text = encode_json(message)
+        
         # 存储最后发送的数据
         self.last_data = message
+        self.last_text = text
         
         # 创建断开连接的列表
         disconnected = []
         
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                logger.error(f"广播信息错误: {e}")
-                disconnected.append(connection)
+        with metrics.timer("manager.broadcast.send"):
+            for connection in self.active_connections:
+                try:
+                    await connection.send_text(text)
+                except Exception as e:
+                    logger.error(f"广播信息错误: {e}")
+                    disconnected.append(connection)
         
         # 移除断开的连接
         for connection in disconnected:
@@ -59,9 +72,10 @@ class ConnectionManager:
         """发送心跳以保持连接"""
         while True:
             disconnected = []
+            text = encode_json({"type": "heartbeat", "timestamp": time.time()})
             for connection in self.active_connections:
                 try:
-                    await connection.send_json({"type": "heartbeat", "timestamp": time.time()})
+                    await connection.send_text(text)
                 except Exception:
                     disconnected.append(connection)
             
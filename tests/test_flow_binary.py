@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from services.data.flow_binary import HEADER_SIZE, decode_flow_binary, encode_flow_binary
+
+
+def make_columns(n: int = 100):
+    rng = np.random.default_rng(0)
+    flow = rng.integers(200, 3000, size=n)
+    speed = rng.uniform(10, 120, size=n).round(1)
+    congestion = rng.integers(1, 5, size=n).astype(np.uint8)
+    return flow, speed, congestion
+
+
+def test_round_trip_all_roads():
+    flow, speed, congestion = make_columns()
+    data = encode_flow_binary(7, 1700000000, flow, speed, congestion)
+    assert len(data) == HEADER_SIZE + 13 * len(flow)
+
+    frame = decode_flow_binary(data)
+    assert frame.tick == 7
+    assert frame.timestamp == 1700000000
+    np.testing.assert_array_equal(frame.road_index, np.arange(len(flow)))
+    np.testing.assert_array_equal(frame.flow, flow)
+    np.testing.assert_array_equal(frame.speed, speed.astype(np.float32))
+    np.testing.assert_array_equal(frame.congestion, congestion)
+
+
+def test_round_trip_selected_roads():
+    flow, speed, congestion = make_columns()
+    indices = [3, 50, 99, 0]
+    frame = decode_flow_binary(encode_flow_binary(1, 0, flow, speed, congestion, indices))
+    np.testing.assert_array_equal(frame.road_index, indices)
+    np.testing.assert_array_equal(frame.flow, flow[indices])
+    np.testing.assert_array_equal(frame.congestion, congestion[indices])
+
+
+def test_round_trip_empty():
+    flow, speed, congestion = make_columns()
+    frame = decode_flow_binary(encode_flow_binary(1, 0, flow, speed, congestion, []))
+    assert len(frame.road_index) == len(frame.flow) == len(frame.speed) == len(frame.congestion) == 0
+
+
+def test_decode_rejects_malformed_frames():
+    flow, speed, congestion = make_columns(4)
+    data = encode_flow_binary(1, 0, flow, speed, congestion)
+    with pytest.raises(ValueError):
+        decode_flow_binary(data[: HEADER_SIZE - 1])
+    with pytest.raises(ValueError):
+        decode_flow_binary(b"XXXX" + data[4:])
+    with pytest.raises(ValueError):
+        decode_flow_binary(data[:4] + (2).to_bytes(2, "little") + data[6:])
+    with pytest.raises(ValueError):
+        decode_flow_binary(data[:-1])
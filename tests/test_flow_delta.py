@@ -0,0 +1,107 @@
+import json
+
+import numpy as np
+
+from services.data.flow_delta import FlowDeltaTracker
+from services.data.geojson_encoder import FeatureCollectionEncoder
+from services.data.road_state import RoadState
+
+N_ROADS = 50
+
+
+def make_state(seed: int = 0) -> RoadState:
+    ids = [f"r{i}" for i in range(N_ROADS)]
+    geometries = [{"type": "Point", "coordinates": [114.0 + i * 0.001, 22.5]} for i in range(N_ROADS)]
+    rng = np.random.default_rng(seed)
+    return RoadState(
+        ids=ids,
+        names=[f"道路{i}" for i in range(N_ROADS)],
+        geometries=geometries,
+        levels=np.arange(N_ROADS) % 5 + 1,
+        flow=rng.integers(200, 2400, size=N_ROADS),
+        speed=rng.uniform(20, 80, size=N_ROADS).round(1),
+        rng=rng,
+    )
+
+
+def make_tracker(state: RoadState) -> FlowDeltaTracker:
+    encoder = FeatureCollectionEncoder(
+        static_keys=["id"],
+        static_columns=[state.ids],
+        dynamic_keys=["FLOW", "SPEED", "CONGESTION"],
+        geometries=state.geometries,
+    )
+    return FlowDeltaTracker(state, encoder, flow_threshold=200, speed_threshold=5.0)
+
+
+def snapshot_properties(message: str) -> dict:
+    snapshot = json.loads(message)
+    assert snapshot["type"] == "snapshot"
+    return {
+        feature["properties"]["id"]: [
+            feature["properties"]["FLOW"], feature["properties"]["SPEED"], feature["properties"]["CONGESTION"]
+        ]
+        for feature in snapshot["data"]["features"]
+    }
+
+
+def test_delta_only_contains_changes_over_threshold():
+    state = make_state()
+    tracker = make_tracker(state)
+    flow, speed = state.flow.copy(), state.speed.copy()
+
+    state.flow = flow.copy()
+    state.flow[0] += 201  # 超过流量阈值
+    state.flow[1] += 200  # 恰好等于阈值，不推送
+    state.speed = speed.copy()
+    state.speed[2] += 5.5  # 超过速度阈值
+    state.congestion = state.congestion.copy()
+    state.congestion[3] = state.congestion[3] % 4 + 1  # 拥堵等级变化
+
+    message = json.loads(tracker.update(state, 100))
+    assert message["type"] == "delta"
+    assert message["seq"] == 1
+    assert message["timestamp"] == 100
+    assert sorted(message["changes"]) == ["r0", "r2", "r3"]
+    assert message["changes"]["r0"][0] == int(state.flow[0])
+    # 未推送的道路保留旧的基线
+    assert tracker.flow[1] == flow[1]
+
+    # 没有变化时序号仍然递增
+    empty = json.loads(tracker.update(state, 101))
+    assert empty["seq"] == 2
+    assert empty["changes"] == {}
+
+
+def test_snapshot_plus_deltas_matches_tracker_snapshot():
+    state = make_state()
+    tracker = make_tracker(state)
+    client = snapshot_properties(tracker.encode_snapshot(0))
+
+    for tick in range(1, 20):
+        state.update(1.0)
+        delta = json.loads(tracker.update(state, tick))
+        assert delta["seq"] == tick
+        client.update(delta["changes"])
+
+    assert client == snapshot_properties(tracker.encode_snapshot(20))
+
+
+def test_snapshot_cache_invalidated_by_update_and_set_state():
+    state = make_state()
+    tracker = make_tracker(state)
+    first = tracker.encode_snapshot(0)
+    assert tracker.encode_snapshot(0) is first
+
+    state.flow = state.flow + 1000
+    tracker.update(state, 1)
+    second = tracker.encode_snapshot(1)
+    assert json.loads(second)["seq"] == 1
+    assert snapshot_properties(second) != snapshot_properties(first)
+
+    # 以其他进程的状态替换后重新编码
+    other = make_tracker(make_state(seed=1))
+    other.update(state, 1)
+    other.update(state, 2)
+    tracker.set_state(*other.get_state())
+    assert tracker.encode_snapshot(2) == other.encode_snapshot(2)
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.road import simulatieFlow
+from services.road.simulatieFlow import FlowSynthesizer, data_fingerprint, get_synthesizer, simulate_flow
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    n = 3000
+    roadsect = rng.choice([10, 20, 30], size=n)
+    return pd.DataFrame(
+        {
+            "ROADSECT_ID": roadsect,
+            # 各路段的流量分布不同，便于检查分组取样
+            "FLOW": roadsect * 10 + rng.normal(0, 1, size=n),
+            "TIME": np.arange(n),
+        }
+    )
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    simulatieFlow._synthesizers.clear()
+    yield
+    simulatieFlow._synthesizers.clear()
+
+
+def test_zero_bandwidth_samples_observed_values_of_the_same_group(data):
+    synthesizer = FlowSynthesizer(data, bandwidth=0.0, by="ROADSECT_ID")
+    samples = synthesizer.sample(20, random_state=1)
+    assert samples.shape == (20, len(data))
+
+    observed = data.groupby("ROADSECT_ID")["FLOW"].apply(set)
+    for column, roadsect in enumerate(data["ROADSECT_ID"].tolist()[:200]):
+        assert set(samples[:, column].tolist()) <= observed[roadsect]
+
+
+def test_kde_moments(data):
+    bandwidth = 0.5
+    samples = FlowSynthesizer(data, bandwidth=bandwidth).sample(50, random_state=2)
+    flow = data["FLOW"].to_numpy()
+    assert samples.mean() == pytest.approx(flow.mean(), abs=1.0)
+    # 高斯核采样的方差为数据方差加带宽的平方
+    assert samples.var() == pytest.approx(flow.var() + bandwidth**2, rel=0.02)
+
+
+def test_seed_reproducible_and_frames_batched(data):
+    synthesizer = FlowSynthesizer(data)
+    np.testing.assert_array_equal(synthesizer.sample(3, random_state=5), synthesizer.sample(3, random_state=5))
+
+    frames = list(synthesizer.frames(n_ticks=5, batch_ticks=2, random_state=5))
+    assert len(frames) == 5
+    assert all(frame["TIME"].equals(data["TIME"]) for frame in frames)
+    assert not frames[0]["FLOW"].equals(data["FLOW"])
+
+
+def test_fingerprint_depends_only_on_distribution_columns(data):
+    key = data_fingerprint(data)
+    other_columns = data.assign(TIME=data["TIME"] + 1)
+    assert data_fingerprint(other_columns) == key
+
+    changed_flow = data.copy()
+    changed_flow.loc[0, "FLOW"] += 1
+    assert data_fingerprint(changed_flow) != key
+    assert data_fingerprint(data, bandwidth=0.4) != key
+    assert data_fingerprint(data, by="ROADSECT_ID") != key
+
+    changed_group = data.copy()
+    changed_group.loc[0, "ROADSECT_ID"] = 30 if data.loc[0, "ROADSECT_ID"] != 30 else 10
+    assert data_fingerprint(changed_group, by="ROADSECT_ID") != data_fingerprint(data, by="ROADSECT_ID")
+    assert data_fingerprint(changed_group) == key
+
+
+def test_synthesizer_cache_hits_and_evicts(data):
+    synthesizer = get_synthesizer(data)
+    assert get_synthesizer(data.assign(TIME=0)) is synthesizer
+
+    changed = data.copy()
+    changed.loc[0, "FLOW"] += 1
+    assert get_synthesizer(changed) is not synthesizer
+
+    for bandwidth in range(1, simulatieFlow.SYNTHESIZER_CACHE_SIZE + 1):
+        get_synthesizer(data, bandwidth=float(bandwidth))
+    assert len(simulatieFlow._synthesizers) == simulatieFlow.SYNTHESIZER_CACHE_SIZE
+    assert get_synthesizer(data) is not synthesizer
+
+
+def test_simulate_flow_drops_missing_and_keeps_input(data):
+    data.loc[[1, 5], "FLOW"] = np.nan
+    original = data.copy()
+    result = simulate_flow(data, random_state=0)
+
+    pd.testing.assert_frame_equal(data, original)
+    assert len(result) == len(data) - 2
+    assert result["FLOW"].notna().all()
+    assert result["TIME"].tolist() == data["TIME"].drop(index=[1, 5]).tolist()
@@ -0,0 +1,65 @@
+import numpy as np
+
+from services.data.hotspots import HotspotDetector
+
+CELL = 0.01
+
+
+def grid_points(cells, per_cell: int) -> np.ndarray:
+    """在每个网格 (列, 行) 中心附近放置 per_cell 个代表点"""
+    return np.array(
+        [[(x + 0.5) * CELL + 0.001 * k / per_cell, (y + 0.5) * CELL] for x, y in cells for k in range(per_cell)]
+    )
+
+
+def summary(hotspots):
+    return [
+        (hotspot.congested, hotspot.total, round(hotspot.congestion_index, 9), sorted(hotspot.roads.tolist()))
+        for hotspot in hotspots
+    ]
+
+
+def test_adjacent_hot_cells_merge_and_distant_cells_do_not():
+    cells = [(0, 0), (1, 1), (5, 5), (9, 0)]
+    points = grid_points(cells, 4)
+    detector = HotspotDetector(points, np.arange(len(points)), cell_size=CELL, min_roads=3)
+
+    congestion = np.ones(len(points), dtype=np.uint8)
+    congestion[0:4] = 4  # 网格 (0,0)
+    congestion[4:7] = 3  # 网格 (1,1)，与 (0,0) 对角相邻
+    congestion[8:11] = 4  # 网格 (5,5)，不相邻
+    congestion[12:14] = 4  # 网格 (9,0) 只有2条拥堵道路，不是热点
+    hotspots = detector.update(congestion)
+
+    assert [(hotspot.congested, hotspot.total) for hotspot in hotspots] == [(7, 8), (3, 4)]
+    assert sorted(hotspots[0].roads.tolist()) == list(range(7))
+    assert sorted(hotspots[1].roads.tolist()) == [8, 9, 10]
+    assert hotspots[0].previous_congested == 0
+
+
+def test_ratio_threshold():
+    points = grid_points([(0, 0)], 20)
+    detector = HotspotDetector(points, np.arange(20), cell_size=CELL, min_roads=3, min_ratio=0.3)
+    congestion = np.ones(20, dtype=np.uint8)
+    congestion[:5] = 4
+    assert detector.update(congestion) == []
+    congestion[5] = 4
+    assert len(detector.update(congestion)) == 1
+
+
+def test_incremental_updates_match_fresh_detection():
+    rng = np.random.default_rng(0)
+    n = 2000
+    points = rng.uniform(0, 0.2, size=(n, 2))
+    # 没有几何的道路不参与检测
+    road_indices = np.flatnonzero(rng.random(n) > 0.1)
+    incremental = HotspotDetector(points[road_indices], road_indices, cell_size=CELL)
+
+    congestion = np.ones(n, dtype=np.uint8)
+    for _ in range(30):
+        changed = rng.random(n) < 0.2
+        congestion[changed] = rng.integers(1, 5, size=changed.sum())
+        incremental.update(congestion)
+
+        fresh = HotspotDetector(points[road_indices], road_indices, cell_size=CELL)
+        assert summary(incremental.hotspots) == summary(fresh.update(congestion))
@@ -0,0 +1,45 @@
+import numpy as np
+import shapely
+
+from services.data.network_cache import load_network_cache, save_network_cache
+from services.data.road_state import RoadState
+
+
+def line_feature(properties, x: float):
+    return {
+        "type": "Feature",
+        "properties": properties,
+        "geometry": {"type": "LineString", "coordinates": [[x, 0.0], [x + 1.0, 1.0]]},
+    }
+
+
+def test_from_features_normalizes_numeric_ids_and_null_names():
+    features = [
+        line_feature({"id": 101, "name": None, "level": 2}, 0.0),
+        line_feature({"id": "102", "name": "深南大道", "level": 3}, 1.0),
+        line_feature({"id": None, "name": 7, "level": 1}, 2.0),
+    ]
+    state = RoadState.from_features(features, ["模板路"], seed=1)
+
+    assert state.ids[:2] == ["101", "102"]
+    assert all(isinstance(road_id, str) for road_id in state.ids)
+    assert state.names == ["模板路", "深南大道", "7"]
+
+
+def test_cache_round_trip_keeps_string_ids(tmp_path):
+    features = [line_feature({"id": i, "name": None, "level": i % 5 + 1}, float(i)) for i in range(4)]
+    state = RoadState.from_features(features, [], seed=1)
+    path = str(tmp_path / "network.npz")
+    save_network_cache(
+        path,
+        {"ids": state.ids, "names": state.names, "levels": state.level, "shapes": state.shapes},
+        [["{}"] * len(state.ids)],
+        [["{}"]],
+        np.zeros(len(state.ids), dtype=np.int64),
+    )
+
+    cached = load_network_cache(path, 1)
+    assert cached["roads"]["ids"] == state.ids == ["0", "1", "2", "3"]
+    assert cached["roads"]["names"] == ["默认道路名称"] * 4
+    np.testing.assert_array_equal(cached["roads"]["levels"], state.level)
+    assert shapely.equals(cached["roads"]["shapes"], state.shapes).all()
@@ -0,0 +1,117 @@
+import multiprocessing
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from services.road.speed_store import RoadSpeedStore, build_cubes, ingest_csv
+
+
+@pytest.fixture
+def speed_csv(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 400
+    df = pd.DataFrame(
+        {
+            "GOLEN": rng.uniform(100, 5000, size=n),
+            "ROADSECT_ID": rng.choice([1, 2, 3], size=n),
+            "PERIOD": rng.integers(1, 3, size=n),
+            "GOCOUNT": rng.integers(1, 50, size=n),
+            "TIME": pd.Timestamp("2018-04-06") + pd.to_timedelta(rng.integers(0, 2 * 86400, size=n), unit="s"),
+            "GOTIME": rng.uniform(10, 600, size=n),
+        }
+    )
+    df.loc[0, "GOTIME"] = 0  # 无法计算速度的记录被丢弃
+    path = tmp_path / "road_speed.csv"
+    df.to_csv(path)
+    return path
+
+
+@pytest.fixture
+def road_info_csv(tmp_path):
+    path = tmp_path / "road_info.csv"
+    pd.DataFrame(
+        {
+            "ROADSECT_ID": [1, 2, 3],
+            "SECT10_NAME": ["福田", "福田", "南山"],
+            "ROADSECT_FROM": ["深南大道", "北环大道", "滨海大道"],
+            "ROADSECT_TO": ["香蜜湖路", "彩田路", "沙河西路"],
+        }
+    ).to_csv(path, index=False)
+    return path
+
+
+def expected_records(speed_csv):
+    df = pd.read_csv(speed_csv, parse_dates=["TIME"])
+    df = df[df["GOTIME"] > 0]
+    df["hour"] = df["TIME"].dt.hour
+    return df
+
+
+def test_section_cube_matches_raw_aggregation(tmp_path, speed_csv, road_info_csv):
+    store = RoadSpeedStore.open(str(tmp_path / "store"), str(speed_csv), str(road_info_csv))
+    df = expected_records(speed_csv)
+
+    for (roadsect_id, hour, period), group in df.groupby(["ROADSECT_ID", "hour", "PERIOD"]):
+        (cell,) = store.section(roadsect_id, hour=hour, period=period)
+        assert cell["records"] == len(group)
+        assert cell["vehicles"] == group["GOCOUNT"].sum()
+        assert cell["avg_speed"] == pytest.approx(group["GOLEN"].sum() / group["GOTIME"].sum() * 3.6, abs=0.01)
+
+    assert store.section(999) is None
+
+
+def test_district_cube_joins_road_info(tmp_path, speed_csv, road_info_csv):
+    store = RoadSpeedStore.open(str(tmp_path / "store"), str(speed_csv), str(road_info_csv))
+    df = expected_records(speed_csv)
+
+    assert store.district_names == ["南山", "福田"]
+    records = sum(cell["records"] for cell in store.district("福田"))
+    assert records == df["ROADSECT_ID"].isin([1, 2]).sum()
+
+
+def test_ingest_same_csv_twice_is_idempotent(tmp_path, speed_csv, road_info_csv):
+    store_dir = str(tmp_path / "store")
+    count = ingest_csv(str(speed_csv), store_dir)
+    assert ingest_csv(str(speed_csv), store_dir) == count
+    assert pq.read_table(f"{store_dir}/records").num_rows == count
+
+    build_cubes(store_dir, str(road_info_csv))
+    assert sum(cell["records"] for cell in RoadSpeedStore(store_dir).section(1)) == (
+        expected_records(speed_csv)["ROADSECT_ID"] == 1
+    ).sum()
+
+
+def test_hourly_speed_by_id_and_by_name(tmp_path, speed_csv, road_info_csv):
+    store = RoadSpeedStore.open(str(tmp_path / "store"), str(speed_csv), str(road_info_csv))
+
+    by_id = store.hourly_speed([1, "2", "unknown"])
+    assert by_id.shape == (24, 3)
+    assert not np.isnan(by_id[:, :2]).all()
+    assert np.isnan(by_id[:, 2]).all()
+
+    # 道路名称经路段起止道路名称匹配到路段
+    by_name = store.road_hourly_speed(["香蜜湖路", "不存在的路", "彩田路"], str(road_info_csv))
+    np.testing.assert_array_equal(by_name[:, 0], by_id[:, 0])
+    np.testing.assert_array_equal(by_name[:, 2], by_id[:, 1])
+    assert np.isnan(by_name[:, 1]).all()
+
+
+def _open_store(args):
+    store_dir, csv_path, road_info_path = args
+    return sum(cell["records"] for cell in RoadSpeedStore.open(store_dir, csv_path, road_info_path).section(1))
+
+
+def test_concurrent_cold_open_builds_once(tmp_path, speed_csv, road_info_csv):
+    store_dir = str(tmp_path / "store")
+    args = (store_dir, str(speed_csv), str(road_info_csv))
+    with multiprocessing.get_context("spawn").Pool(4) as pool:
+        results = pool.map(_open_store, [args] * 4)
+
+    assert len(set(results)) == 1
+    assert results[0] == (expected_records(speed_csv)["ROADSECT_ID"] == 1).sum()
+    # 只生成一次，没有遗留临时文件
+    assert pq.read_table(f"{store_dir}/records").num_rows == len(expected_records(speed_csv))
+    assert sorted(os.listdir(f"{store_dir}/cubes")) == ["district.parquet", "section.parquet"]
@@ -0,0 +1,89 @@
+import pytest
+
+from services.auth import user_cache as user_cache_module
+from services.auth.user_cache import CachedUser, UserCache
+from services.shared.versions import VersionSlots
+
+ALICE = CachedUser(1, "alice", "hash-1")
+
+
+@pytest.fixture
+def versions_path(tmp_path):
+    return str(tmp_path / "versions")
+
+
+def test_hit_miss_and_negative_caching():
+    cache = UserCache(maxsize=10, ttl=60)
+    assert cache.get("alice") == (False, None)
+
+    cache.put("alice", ALICE, cache.version("alice"))
+    cache.put("nobody", None, cache.version("nobody"))
+    assert cache.get("alice") == (True, ALICE)
+    # 不存在的用户也命中缓存
+    assert cache.get("nobody") == (True, None)
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 1
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(user_cache_module.time, "monotonic", lambda: now[0])
+    cache = UserCache(ttl=60)
+    cache.put("alice", ALICE, 0)
+    now[0] += 59
+    assert cache.get("alice")[0]
+    now[0] += 2
+    assert cache.get("alice") == (False, None)
+    assert len(cache) == 0
+
+
+def test_lru_eviction():
+    cache = UserCache(maxsize=2)
+    cache.put("a", None, 0)
+    cache.put("b", None, 0)
+    cache.get("a")
+    cache.put("c", None, 0)
+    assert cache.get("b")[0] is False
+    assert cache.get("a")[0] and cache.get("c")[0]
+
+
+def test_invalidate_reaches_other_processes(versions_path):
+    # 两个进程各自打开同一个版本号文件
+    cache_a = UserCache(versions=VersionSlots(versions_path, slots=64))
+    cache_b = UserCache(versions=VersionSlots(versions_path, slots=64))
+    cache_a.put("alice", ALICE, cache_a.version("alice"))
+    cache_b.put("alice", ALICE, cache_b.version("alice"))
+
+    cache_a.invalidate("alice")
+    assert cache_a.get("alice") == (False, None)
+    assert cache_b.get("alice") == (False, None)
+
+
+def test_put_with_version_read_before_concurrent_update_is_stale(versions_path):
+    cache = UserCache(versions=VersionSlots(versions_path, slots=64))
+    version = cache.version("alice")
+    # 读取数据库期间其他进程修改了用户
+    cache.invalidate("alice")
+    cache.put("alice", ALICE, version)
+    assert cache.get("alice") == (False, None)
+
+
+def test_invalidate_without_versions_is_local_only():
+    cache = UserCache()
+    cache.put("alice", ALICE, cache.version("alice"))
+    cache.invalidate("alice")
+    assert cache.get("alice") == (False, None)
+
+
+def test_version_slots_shared_and_persistent(versions_path):
+    first = VersionSlots(versions_path, slots=16)
+    assert first.get("alice") == 0
+    first.bump("alice")
+    bumped = first.get("alice")
+    assert bumped != 0
+
+    second = VersionSlots(versions_path, slots=16)
+    assert second.slot("alice") == first.slot("alice")
+    assert second.get("alice") == bumped
+    second.bump("alice")
+    assert first.get("alice") != bumped